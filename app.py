@@ -18,6 +18,7 @@ st.set_page_config(
 from config import Config
 from src.data_collector import ReviewDataCollector
 from src.report_generator import TrendReportGenerator
+from src.review_store import SQLiteReviewStore
 
 def load_css():
     st.markdown("""
@@ -219,10 +220,11 @@ def run_analysis(app_name, app_id, start_date, end_date, batch_size):
         status_text.text("📊 Step 1/4: Collecting review data...")
         progress_bar.progress(0.05)
         
-        collector = ReviewDataCollector()
-        
         # Update config temporarily
         config = Config()
+        store = SQLiteReviewStore() if config.USE_REVIEW_STORE else None
+        collector = ReviewDataCollector(store=store)
+        
         config.TARGET_APP_ID = app_id
         config.APP_NAME = app_name
         collector.config = config
@@ -230,18 +232,17 @@ def run_analysis(app_name, app_id, start_date, end_date, batch_size):
         total_reviews = 0
         collection_results = []
         
-        current = start_date
-        while current <= end_date:
-            date_str = current.strftime("%Y-%m-%d")
-            status_text.text(f"📅 Collecting reviews for {date_str}...")
-            
-            reviews = collector.collect_daily_reviews_gps(app_id, date_str)
+        status_text.text(f"📅 Collecting reviews for {start_date} to {end_date}...")
+        daily_reviews = collector.collect_reviews_range(
+            app_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), lang='en', country='us'
+        )
+        
+        for date_str, reviews in daily_reviews.items():
             if reviews:
-                collector.save_daily_data(reviews, date_str)
+                # Partitioned by app, so reports for any selected app find the files
+                collector.save_daily_data(reviews, date_str, app_id, 'en', 'us')
                 total_reviews += len(reviews)
                 collection_results.append({"date": date_str, "count": len(reviews)})
-            
-            current += timedelta(days=1)
         
         progress_bar.progress(0.2)
         
@@ -255,13 +256,25 @@ def run_analysis(app_name, app_id, start_date, end_date, batch_size):
         status_text.text("🤖 Step 2/4: Running AI analysis...(It will take 4-5min according to data)")
         progress_bar.progress(0.25)
         
-        generator = TrendReportGenerator(batch_size=batch_size)
+        live_topics = st.empty()
+        
+        def on_progress(done, total, topic_counts):
+            # Reviews stream in as each LLM answer is parsed; map them onto 25% → 85%
+            progress_bar.progress(0.25 + 0.6 * min(done / max(total, 1), 1.0))
+            status_text.text(f"🤖 Step 2/4: Analyzed {done}/{total} reviews...")
+            top = ", ".join(f"{topic} ({count})" for topic, count in topic_counts.most_common(5))
+            live_topics.caption(f"🔥 Top topics so far: {top}")
+        
+        generator = TrendReportGenerator(
+            batch_size=batch_size, store=store, app_id=app_id, progress_callback=on_progress
+        )
         
         start_str = start_date.strftime("%Y-%m-%d")
         end_str = end_date.strftime("%Y-%m-%d")
         
         # Run with progress updates
         trend_df = generator.generate_trend_table_range(start_str, end_str)
+        live_topics.empty()
         progress_bar.progress(0.85)
         
         if trend_df.empty:
@@ -519,12 +532,12 @@ Scraper API: {'✅ Configured' if config.SCRAPER_API_KEY else '❌ Missing'}
         # Check for existing data files
         data_dir = Path("data/raw_reviews")
         if data_dir.exists():
-            data_files = list(data_dir.glob("*.json"))
+            data_files = [path for path in data_dir.rglob("*.json*") if path.suffix != ".ids"]
             st.write(f"Found {len(data_files)} data files:")
             
             for file in sorted(data_files)[-10:]:  # Show last 10 files
                 file_size = file.stat().st_size / 1024  # Size in KB
-                st.write(f"📄 {file.name} ({file_size:.1f} KB)")
+                st.write(f"📄 {file.relative_to(data_dir)} ({file_size:.1f} KB)")
         else:
             st.write("No data files found.")
     
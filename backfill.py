@@ -0,0 +1,42 @@
+# backfill.py - Resumable deep backfill of review history
+import argparse
+
+from config import Config
+from src.data_collector import ReviewDataCollector
+from src.review_store import SQLiteReviewStore
+
+def main():
+    cfg = Config()
+    
+    parser = argparse.ArgumentParser(description="Backfill review history down to a target date")
+    parser.add_argument("--since", required=True, help="Oldest date to backfill to (YYYY-MM-DD)")
+    parser.add_argument("--app-id", default=cfg.TARGET_APP_ID, help="Play Store app id")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (defaults to data/checkpoints/)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any existing checkpoint")
+    args = parser.parse_args()
+    
+    print(f"🚀 Backfilling {args.app_id} down to {args.since}")
+    print("=" * 60)
+    
+    store = SQLiteReviewStore() if cfg.USE_REVIEW_STORE else None
+    collector = ReviewDataCollector(store=store)
+    try:
+        checkpoint = collector.backfill_reviews(
+            args.app_id,
+            args.since,
+            checkpoint_path=args.checkpoint,
+            restart=args.restart
+        )
+    finally:
+        if store:
+            store.close()
+    
+    if checkpoint:
+        print(f"\n📈 Pages fetched: {checkpoint['pages']}")
+        print(f"📊 Reviews stored: {checkpoint['reviews_stored']}")
+        print(f"📅 Oldest date reached: {checkpoint['oldest_date']}")
+    else:
+        print("⚠️ No reviews fetched")
+
+if __name__ == "__main__":
+    main()
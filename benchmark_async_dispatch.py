@@ -0,0 +1,89 @@
+# benchmark_async_dispatch.py - Serial vs concurrent LLM dispatch against the fake OpenAI server
+import argparse
+import asyncio
+import time
+
+from benchmark_clean_text import synthetic_reviews
+from config import Config
+from fake_openai_server import start_server
+from src.rate_controller import AdaptiveConcurrencyController
+
+def synthetic_days(days, reviews_per_day):
+    """{date: [preprocessed review]} for a run of consecutive days"""
+    texts = synthetic_reviews(days * reviews_per_day)
+    return {
+        f"2025-01-{day + 1:02d}" if day < 31 else f"2025-02-{day - 30:02d}": [
+            {'reviewId': f"d{day}-{i}", 'cleaned_content': texts[day * reviews_per_day + i].lower(), 'score': 3}
+            for i in range(reviews_per_day)
+        ]
+        for day in range(days)
+    }
+
+def bare_analyzer():
+    """Analyzer with every local shortcut and cache off, so each batch is a real call"""
+    from src.topic_analyzer import AgenticTopicAnalyzer
+    
+    analyzer = AgenticTopicAnalyzer()
+    analyzer.triage = analyzer.fast_classifier = analyzer.collapser = None
+    analyzer.llm_cache = analyzer.analysis_cache = None
+    analyzer.rate_controller = AdaptiveConcurrencyController()
+    return analyzer
+
+def summary(results_by_date):
+    return {
+        date_str: [(a['review_id'], tuple(a['identified_topics'])) for a in results]
+        for date_str, results in results_by_date.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--reviews-per-day", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=Config.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--skip-serial", action="store_true")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="Server-side concurrency cap (429 beyond it)")
+    args = parser.parse_args()
+    
+    server, base_url = start_server(latency=args.latency, jitter=args.jitter, max_concurrent=args.max_concurrent)
+    Config.LLM_INITIAL_CONCURRENCY = Config.LLM_MAX_CONCURRENCY = args.concurrency
+    Config.OPENAI_BASE_URL = base_url
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "fake"
+    
+    days = synthetic_days(args.days, args.reviews_per_day)
+    batches = sum(-(-len(r) // Config.BATCH_SIZE) for r in days.values())
+    print(f"📊 {args.days} days × {args.reviews_per_day} reviews = {batches} LLM calls, "
+          f"{args.latency}s ± {args.jitter}s each")
+    print("-" * 60)
+    
+    serial = None
+    if not args.skip_serial:
+        analyzer = bare_analyzer()
+        start = time.perf_counter()
+        serial = {d: analyzer.process_daily_reviews(d, Config.BATCH_SIZE, reviews=r) for d, r in days.items()}
+        serial_seconds = time.perf_counter() - start
+    
+    runs = []
+    for _ in range(2):
+        analyzer = bare_analyzer()
+        start = time.perf_counter()
+        results = asyncio.run(analyzer.process_range_async(days, Config.BATCH_SIZE))
+        metrics = analyzer.rate_controller.metrics()
+        runs.append((time.perf_counter() - start, summary(results), sorted(analyzer.canonical_topics)))
+    
+    print("-" * 60)
+    if serial is not None:
+        print(f"🐢 Serial:              {serial_seconds:6.2f} s")
+    for seconds, _, _ in runs:
+        print(f"🚀 Async ({args.concurrency:>3} in flight): {seconds:6.2f} s")
+    print(f"⏱️ Lower bound:         {batches / args.concurrency * args.latency:6.2f} s (calls / concurrency × latency)")
+    
+    same = runs[0][1:] == runs[1][1:] and (serial is None or summary(serial) == runs[0][1])
+    print(f"✅ Results identical across runs: {same}")
+    print(f"🚦 Last run: limit {metrics['concurrency_limit']}, {metrics['throttled']} throttled, "
+          f"server rejected {server.limiter.rejected} requests")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
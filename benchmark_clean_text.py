@@ -0,0 +1,101 @@
+# benchmark_clean_text.py - Parity check and timing for batch clean_texts vs the original clean_text
+import random
+import re
+import time
+
+from src.preprocessor import ReviewPreprocessor
+
+def reference_clean_text(text):
+    """Original per-review clean_text implementation, kept verbatim for parity checks"""
+    if not text:
+        return ""
+    
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\$$\$$,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,!?-]', '', text)
+    
+    words = text.split()
+    words = [word for word in words if len(word) > 1]
+    text = ' '.join(words)
+    
+    text = text.strip().lower()
+    
+    if len(text) < 10:
+        return ""
+    
+    return text
+
+WORDS = [
+    "app", "crashes", "delivery", "late", "refund", "payment", "failed", "great", "love", "it",
+    "a", "I", "ok", "worst", "experience", "customer", "service", "prime", "order", "cancelled",
+    "Très", "bien", "naïve", "über", "пример", "很好", "😀", "👍🏽", "don't", "can't", "$20", "100%",
+    "<b>bold</b>", "<br/>", "http://example.com/x?y=1", "https://amzn.to/ABC_12", "e-mail", "re-order"
+]
+SEPARATORS = [" ", " ", " ", "  ", "\n", "\t", "  ", ", ", ". ", "!! ", "?", " - "]
+
+def synthetic_reviews(count, seed=42):
+    """Deterministic synthetic reviews with HTML, URLs, unicode and odd whitespace"""
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(count):
+        if rng.random() < 0.15:
+            # Spammy duplicates like "good app" are common in real feeds
+            reviews.append(rng.choice(["good app", "Nice app!!", "worst app ever 😡", "", "ok"]))
+            continue
+        length = rng.randint(1, 60)
+        parts = []
+        for _ in range(length):
+            parts.append(rng.choice(WORDS))
+            parts.append(rng.choice(SEPARATORS))
+        reviews.append("".join(parts))
+    return reviews
+
+def main(count=100_000):
+    preprocessor = ReviewPreprocessor()
+    texts = synthetic_reviews(count)
+    
+    print(f"📊 {count} synthetic reviews")
+    print("-" * 60)
+    
+    start = time.perf_counter()
+    expected = [reference_clean_text(text) for text in texts]
+    reference_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    single = [preprocessor.clean_text(text) for text in texts]
+    single_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batch = preprocessor.clean_texts(texts)
+    batch_seconds = time.perf_counter() - start
+    
+    mismatches = [i for i, (a, b, c) in enumerate(zip(expected, single, batch)) if not (a == b == c)]
+    if mismatches:
+        i = mismatches[0]
+        print(f"❌ {len(mismatches)} mismatches, first: {texts[i]!r}")
+        print(f"   expected {expected[i]!r}, clean_text {single[i]!r}, clean_texts {batch[i]!r}")
+        raise SystemExit(1)
+    print(f"✅ Parity: all {count} outputs identical")
+    
+    for name, seconds in [
+        ("original clean_text", reference_seconds),
+        ("clean_text (precompiled)", single_seconds),
+        ("clean_texts (batch)", batch_seconds),
+    ]:
+        print(f"{name:<28} {seconds:7.3f} s  {count / seconds:10.0f} reviews/s  x{reference_seconds / seconds:.1f}")
+    
+    try:
+        import pandas as pd
+    except ImportError:
+        return
+    
+    series = pd.Series(texts)
+    start = time.perf_counter()
+    cleaned_series = preprocessor.clean_texts(series)
+    series_seconds = time.perf_counter() - start
+    assert cleaned_series.tolist() == expected
+    print(f"{'clean_texts (pandas Series)':<28} {series_seconds:7.3f} s  {count / series_seconds:10.0f} reviews/s  x{reference_seconds / series_seconds:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmark_pipeline.py - Offline full-pipeline throughput run on the stub or record/replay LLM backend
+#
+#   python benchmark_pipeline.py --days 14 --reviews-per-day 200 --latency 0.5
+#   python benchmark_pipeline.py --record-replay    # record a stub run, replay it, compare the reports
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmark_clean_text import synthetic_reviews
+from config import Config
+from src.llm_backend import RecordReplayBackend, StubBackend
+from src.report_generator import TrendReportGenerator
+from src.review_store import SQLiteReviewStore
+
+def seed_store(store, app_id, start_date, days, reviews_per_day):
+    """Fill the store with deterministic synthetic reviews, one batch per day"""
+    texts = synthetic_reviews(days * reviews_per_day)
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    for day in range(days):
+        date_str = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+        store.upsert_reviews(app_id, [
+            {'reviewId': f"bench-{day}-{i}", 'date': date_str, 'content': texts[day * reviews_per_day + i],
+             'score': 1 + i % 5, 'userName': "bench", 'thumbsUpCount': 0}
+            for i in range(reviews_per_day)
+        ])
+    return (start + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+def run(store, app_id, start_date, end_date, backend):
+    """One full pipeline run; returns (seconds, trend table, first LLM result seconds)"""
+    generator = TrendReportGenerator(batch_size=Config.BATCH_SIZE, store=store, app_id=app_id, backend=backend)
+    start = time.perf_counter()
+    trend_df = generator.generate_trend_table_range(start_date, end_date)
+    return time.perf_counter() - start, trend_df, generator.first_result_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Full pipeline benchmark without network access")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--reviews-per-day", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub seconds per LLM call")
+    parser.add_argument("--serial", action="store_true", help="Dispatch batches one at a time")
+    parser.add_argument("--keep-caches", action="store_true", help="Leave the LLM/analysis caches on")
+    parser.add_argument("--record-replay", action="store_true", help="Record a run, replay it and compare")
+    args = parser.parse_args()
+    
+    Config.LLM_ASYNC_ENABLED = not args.serial
+    if not args.keep_caches:
+        # Otherwise the second run is served from cache and measures nothing
+        Config.LLM_CACHE_ENABLED = Config.ANALYSIS_CACHE_ENABLED = False
+    
+    app_id = "bench.app"
+    start_date = "2025-01-01"
+    
+    # Every relative data/ path (store, caches, label log) lands in a scratch directory
+    workdir = tempfile.mkdtemp(prefix="pipeline-bench-")
+    os.chdir(workdir)
+    store = SQLiteReviewStore("data/reviews.db")
+    end_date = seed_store(store, app_id, start_date, args.days, args.reviews_per_day)
+    total = args.days * args.reviews_per_day
+    
+    print(f"📊 {args.days} days × {args.reviews_per_day} reviews, stub latency {args.latency}s, "
+          f"{'serial' if args.serial else 'async'} dispatch, scratch dir {workdir}")
+    print("-" * 60)
+    
+    if args.record_replay:
+        stub = StubBackend(latency=args.latency)
+        recorder = RecordReplayBackend("data/llm_recordings/bench.jsonl", inner=stub, mode="record")
+        runs = [("record", run(store, app_id, start_date, end_date, recorder))]
+        replayer = RecordReplayBackend("data/llm_recordings/bench.jsonl", mode="replay")
+        runs.append(("replay", run(store, app_id, start_date, end_date, replayer)))
+        calls = stub.calls
+    else:
+        stub = StubBackend(latency=args.latency)
+        runs = [(f"run {i + 1}", run(store, app_id, start_date, end_date, stub)) for i in range(2)]
+        calls = stub.calls // 2
+    
+    print("-" * 60)
+    for label, (seconds, trend_df, first_result) in runs:
+        first = f"{first_result:.2f}s" if first_result is not None else "n/a"
+        print(f"⏱️ {label:<8} {seconds:7.2f} s  {total / seconds:8.0f} reviews/s  "
+              f"{len(trend_df)} topics  first LLM result {first}")
+    print(f"🔌 {calls} LLM calls per run")
+    
+    same = all(trend_df.equals(runs[0][1][1]) for _, (_, trend_df, _) in runs)
+    print(f"✅ Trend tables identical across runs: {same}")
+    if args.record_replay:
+        print(f"📼 {recorder.recorded} answers recorded, {replayer.hits} replayed")
+    store.close()
+
+if __name__ == "__main__":
+    main()
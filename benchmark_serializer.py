@@ -0,0 +1,43 @@
+# benchmark_serializer.py - Compare stdlib json with the fast serializer on raw review files
+import json
+import time
+from pathlib import Path
+
+from src import serializer
+
+def time_it(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+def main(repeat=50):
+    files = sorted(Path("data/raw_reviews").glob("*.json"))
+    if not files:
+        print("⚠️ No files in data/raw_reviews/")
+        return
+    
+    blobs = [path.read_bytes() for path in files]
+    records = [json.loads(blob) for blob in blobs]
+    total_mb = sum(len(blob) for blob in blobs) / 1e6
+    
+    print(f"📊 {len(files)} files, {sum(len(r) for r in records)} reviews, {total_mb:.2f} MB")
+    print(f"🔧 Fast backend: {serializer.BACKEND} (orjson installed: {serializer.orjson is not None})")
+    print("-" * 60)
+    
+    results = {
+        "decode (stdlib json)": time_it(lambda: [json.loads(blob) for blob in blobs], repeat),
+        "decode (serializer.loads)": time_it(lambda: [serializer.loads(blob) for blob in blobs], repeat),
+        "typed decode (decode_reviews)": time_it(lambda: [serializer.decode_reviews(blob) for blob in blobs], repeat),
+        "encode indent=2 (stdlib json)": time_it(lambda: [json.dumps(r, ensure_ascii=False, indent=2) for r in records], repeat),
+        "encode indent=2 (serializer)": time_it(lambda: [serializer.dumps_bytes(r, indent=True) for r in records], repeat),
+    }
+    
+    baseline_decode = results["decode (stdlib json)"]
+    baseline_encode = results["encode indent=2 (stdlib json)"]
+    for name, seconds in results.items():
+        baseline = baseline_encode if name.startswith("encode") else baseline_decode
+        print(f"{name:<36} {seconds * 1000:8.2f} ms  {total_mb / seconds:8.1f} MB/s  x{baseline / seconds:.1f}")
+
+if __name__ == "__main__":
+    main()
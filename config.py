@@ -7,6 +7,7 @@ class Config:
     # ── API KEYS ──────────────────────────────────────────────────────────────
     SCRAPER_API_KEY = os.getenv("SCRAPER_API_KEY")
     OPENAI_API_KEY  = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")   # None = api.openai.com; point at fake_openai_server.py for dev
 
     # ── APP SELECTION ────────────────────────────────────────────────────────
     TARGET_APP_ID = "com.amazon.mShop.android.shopping"   # Amazon Shopping
@@ -26,4 +27,127 @@ class Config:
     ]
 
     # ── LLM BATCH SIZE ───────────────────────────────────────────────────────
-    BATCH_SIZE = 10       
+    BATCH_SIZE = 10                                  # reviews per request when LLM_BATCH_PACKING is off
+
+    # ── LLM PROMPT FORMAT ────────────────────────────────────────────────────
+    LLM_STRUCTURED_OUTPUT = "tools"                  # "tools" (function calling), "json_schema" or "off"
+    LLM_COMPACT_PROMPT = True                        # numbered topic table, review numbers, index-list answers
+    LLM_MAX_PROMPT_TOPICS = 40                       # seed topics + most frequent others sent per request
+    LLM_COMPACT_OUTPUT_TOKENS_PER_REVIEW = 14        # output reserved per review with the compact format
+    LLM_COMPACT_REVIEW_OVERHEAD_TOKENS = 4           # "[N] " framing per review with the compact format
+
+    # ── LLM REQUEST PACKING ──────────────────────────────────────────────────
+    LLM_BATCH_PACKING = True                         # fill requests to a token budget (BATCH_SIZE ignored)
+    LLM_REQUEST_TOKEN_BUDGET = 6000                  # prompt + reserved output tokens per request
+    LLM_MAX_OUTPUT_TOKENS = 2000                     # max_tokens sent with each extraction request
+    LLM_OUTPUT_TOKENS_PER_REVIEW = 40                # output reserved per review in a request
+    LLM_REVIEW_OVERHEAD_TOKENS = 22                  # "Review N (ID: <uuid>)" framing per review
+    LLM_MAX_REVIEW_TOKENS = 256                      # longer reviews are shortened to this
+    LLM_MAX_REVIEWS_PER_BATCH = 40
+
+    # ── LLM BATCH RETRIES ────────────────────────────────────────────────────
+    LLM_BATCH_MAX_RETRIES = 3                        # re-sends of missing reviews before falling back
+    LLM_BATCH_RETRY_BACKOFF = 0.5                    # seconds, doubled per retry
+
+    # ── MODEL CASCADE ────────────────────────────────────────────────────────
+    LLM_CASCADE_ENABLED = False                      # cheap model first, low-confidence reviews re-sent to the strong one
+    LLM_CASCADE_CHEAP_MODEL = "gpt-4o-mini"
+    LLM_CASCADE_STRONG_MODEL = "gpt-4o"
+    LLM_CASCADE_THRESHOLD = 0.75                     # escalate answers below this confidence
+    LLM_MODEL_PRICES = {                             # USD per 1M (input, output) tokens, for cost reports
+        "gpt-3.5-turbo": (0.50, 1.50),
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00)
+    }
+
+    # ── LLM DISPATCH & RATE LIMITS ───────────────────────────────────────────
+    LLM_ASYNC_ENABLED = True                         # dispatch batches across all days concurrently
+    LLM_INITIAL_CONCURRENCY = 8                      # starting in-flight limit; adapts to rate-limit feedback
+    LLM_MIN_CONCURRENCY = 1
+    LLM_MAX_CONCURRENCY = 32                         # ceiling for the adaptive in-flight limit
+    LLM_MAX_RETRIES = 5                              # retries on 429/5xx/connection errors
+    LLM_RATE_LIMIT_LOW_WATERMARK = 0.1               # halve concurrency below this share of remaining quota
+    LLM_STREAMING = True                             # stream answers and hand on each review as it completes
+
+    # ── LLM BACKEND ──────────────────────────────────────────────────────────
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # "openai", "record", "replay" (offline) or "stub" (offline)
+    LLM_MODEL = "gpt-3.5-turbo"                      # topic extraction model (cascade tiers override it)
+    LLM_DEDUP_MODEL = "gpt-3.5-turbo"                # topic merging model
+    LLM_RECORDINGS_PATH = os.getenv("LLM_RECORDINGS_PATH", "data/llm_recordings/recordings.jsonl")
+    LLM_STUB_LATENCY = 0.0                           # seconds the stub backend waits per call
+
+    # ── COLLECTION ───────────────────────────────────────────────────────────
+    REVIEWS_PAGE_SIZE = 200    # reviews per google-play-scraper page
+    INCREMENTAL_COLLECTION = True                    # only fetch reviews newer than the watermark
+    WATERMARK_PATH = "data/watermarks.json"          # per-app newest stored review
+    CHECKPOINT_DIR = "data/checkpoints"              # resumable backfill state
+
+    # ── RAW TIER ─────────────────────────────────────────────────────────────
+    RAW_FORMAT = "json"                              # "json", "jsonl", "jsonl.gz" or "jsonl.zst" (append-only)
+
+    # ── PREPROCESSING ────────────────────────────────────────────────────────
+    USE_CLEAN_TEXT_CACHE = True                      # reuse cleaned text across runs
+    CLEAN_TEXT_CACHE_PATH = "data/cache/clean_text.db"
+    CLEAN_TEXT_CACHE_MAX_ENTRIES = 200000            # least recently used cleaned texts are evicted beyond this
+
+    # ── RULE-BASED TRIAGE ────────────────────────────────────────────────────
+    TRIAGE_ENABLED = True                            # label trivial reviews without the LLM
+    TRIAGE_MAX_WORDS = 6                             # longer reviews always go to the LLM
+    TRIAGE_RULES = [                                 # regexes over cleaned (lowercased) text
+        {"pattern": r"^(?:i )?(?:really )?(?:love|like)(?: (?:it|this|the|amazon|shopping))*(?: app)?[.!]*$",
+         "topic": "App working well", "min_score": 4, "confidence": 0.9},
+        {"pattern": r"^(?:very |so |really )?(?:good|great|nice|excellent|awesome|amazing|superb|best|fine)"
+                    r"(?: (?:app|application|service|experience|shopping))*[.!]*$",
+         "topic": "App working well", "min_score": 4, "confidence": 0.9},
+        {"pattern": r"^(?:very )?(?:bad|worst|poor|useless|pathetic|terrible)(?: (?:app|application|service|experience))*(?: ever)?[.!]*$",
+         "topic": "General feedback", "max_score": 2, "confidence": 0.7},
+    ]
+    TRIAGE_GENERIC_WORDS = [
+        "good", "great", "nice", "excellent", "awesome", "amazing", "superb", "best", "fine", "ok", "okay",
+        "love", "like", "very", "so", "really", "app", "application", "service", "experience", "shopping",
+        "bad", "worst", "poor", "useless", "pathetic", "terrible", "ever", "the", "this", "it", "is", "an",
+        "amazon", "thanks", "thank", "you"
+    ]
+
+    # ── LOCAL FAST-PATH CLASSIFIER ───────────────────────────────────────────
+    FAST_CLASSIFIER_ENABLED = True                   # used once a trained model exists
+    FAST_CLASSIFIER_PATH = "data/models/seed_topic_classifier.npz"
+    FAST_CLASSIFIER_THRESHOLD = 0.85                 # min probability to skip the LLM
+    LLM_LABELS_PATH = "data/labels/llm_labels.jsonl" # per-review LLM results used for training
+
+    # ── LLM RESPONSE CACHE ───────────────────────────────────────────────────
+    LLM_CACHE_ENABLED = True                         # reuse responses to identical prompts across runs
+    LLM_CACHE_PATH = "data/cache/llm_responses.db"
+    LLM_CACHE_TTL_DAYS = 30                          # entries older than this are refetched (0 = never expire)
+    LLM_CACHE_MAX_ENTRIES = 50000                    # least recently used entries are evicted beyond this
+    LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0") == "1"   # force fresh calls (still stored)
+
+    # ── PER-REVIEW ANALYSIS CACHE ────────────────────────────────────────────
+    ANALYSIS_CACHE_ENABLED = True                    # only new or edited reviews go to the LLM
+    ANALYSIS_CACHE_PATH = "data/cache/review_analyses.db"
+
+    # ── NEAR-DUPLICATE COLLAPSING ────────────────────────────────────────────
+    NEAR_DUP_ENABLED = True                          # one LLM slot per near-duplicate cluster
+    NEAR_DUP_THRESHOLD = 0.8                         # min Jaccard similarity of word shingles
+    NEAR_DUP_NUM_PERM = 64                           # MinHash permutations
+    NEAR_DUP_BANDS = 16                              # LSH bands (NUM_PERM / BANDS rows each)
+
+    # ── REVIEW STORE ─────────────────────────────────────────────────────────
+    USE_REVIEW_STORE = True                          # SQLite store instead of per-date JSON files
+    REVIEW_STORE_PATH = "data/reviews.db"
+
+    # ── MULTI-APP SWEEP ──────────────────────────────────────────────────────
+    TRACKED_APPS = [
+        "com.amazon.mShop.android.shopping",   # Amazon Shopping
+        "com.application.zomato",              # Zomato
+        "com.amazon.avod.thirdpartyclient",    # Prime Video
+        "com.amazon.mp3"                       # Amazon Music
+    ]
+    TRACKED_LOCALES = [("en", "us")]                 # (lang, country) pairs
+    COLLECTION_WORKERS = 8                           # concurrent (app, locale) fetches
+    HOST_RATE_LIMITS = {                             # requests/second per upstream host
+        "play.google.com": 2.0,
+        "api.scraperapi.com": 1.0
+    }
+    SCRAPER_API_RETRIES = 3                          # retries on 429/5xx and connection errors
+    SCRAPER_API_BACKOFF = 2.0                        # exponential backoff factor (seconds)
@@ -0,0 +1,270 @@
+# fake_openai_server.py - Local OpenAI-compatible chat completions server for offline runs
+#
+#   python fake_openai_server.py --port 8765 --latency 1.0 --rpm 500 --tpm 200000 --malformed-rate 0.2
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python main.py
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.llm_backend import STREAM_CHUNK_CHARS, answer_for
+
+MALFORMED_KINDS = ["truncated", "prose", "wrong_types", "missing", "refusal"]
+
+def malform(answer, kind, rng):
+    """Damage a JSON answer the way real completions go wrong"""
+    text = json.dumps(answer)
+    if kind == "truncated":
+        return text[:max(1, len(text) // 2)]
+    if kind == "prose":
+        return f"Sure! Here is the analysis:\n```json\n{text}\n```\nLet me know if you need more."
+    if kind == "refusal":
+        return "I'm sorry, but I can't help with that request."
+    
+    entries = answer.get("a") or answer.get("review_analysis") or []
+    if kind == "missing" and entries:
+        keep = sorted(rng.sample(range(len(entries)), len(entries) // 2))
+        entries[:] = [entries[i] for i in keep]
+    elif kind == "wrong_types":
+        for entry in entries:
+            if isinstance(entry, dict) and "r" in entry:
+                entry["r"] = str(entry["r"])
+            elif isinstance(entry, list):
+                entry[0] = str(entry[0])
+            elif isinstance(entry, dict):
+                entry["identified_topics"] = ", ".join(entry["identified_topics"])
+    return json.dumps(answer)
+
+class RateLimiter:
+    """Fixed-window request/token quota plus a concurrency cap, reported like OpenAI does"""
+    
+    def __init__(self, rpm=0, tpm=0, max_concurrent=0, window=60.0):
+        self.rpm, self.tpm, self.max_concurrent, self.window = rpm, tpm, max_concurrent, window
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.requests = 0
+        self.tokens = 0
+        self.in_flight = 0
+        self.rejected = 0
+    
+    def admit(self, tokens):
+        """Return (headers, retry_after); retry_after is None when the request is admitted"""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= self.window:
+                self.window_start, self.requests, self.tokens = now, 0, 0
+            reset = self.window - (now - self.window_start)
+            
+            retry_after = None
+            if self.max_concurrent and self.in_flight >= self.max_concurrent:
+                retry_after = 1.0
+            elif (self.rpm and self.requests + 1 > self.rpm) or (self.tpm and self.tokens + tokens > self.tpm):
+                retry_after = reset
+            else:
+                self.requests += 1
+                self.tokens += tokens
+                self.in_flight += 1
+            
+            if retry_after is not None:
+                self.rejected += 1
+            
+            headers = {}
+            if self.rpm:
+                headers.update({
+                    'x-ratelimit-limit-requests': str(self.rpm),
+                    'x-ratelimit-remaining-requests': str(max(self.rpm - self.requests, 0)),
+                    'x-ratelimit-reset-requests': f"{reset:.3f}s"
+                })
+            if self.tpm:
+                headers.update({
+                    'x-ratelimit-limit-tokens': str(self.tpm),
+                    'x-ratelimit-remaining-tokens': str(max(self.tpm - self.tokens, 0)),
+                    'x-ratelimit-reset-tokens': f"{reset:.3f}s"
+                })
+            if retry_after is not None:
+                headers['retry-after'] = f"{max(retry_after, 0.001):.3f}"
+            return headers, retry_after
+    
+    def done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    jitter = 0.0
+    limiter = RateLimiter()
+    malformed_rate = 0.0
+    malformed_kinds = MALFORMED_KINDS
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+    malformed_count = 0
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = "\n".join(message.get('content', '') for message in body.get('messages', []))
+        
+        # Quota is charged for the prompt plus max_tokens, as the real API does
+        headers, retry_after = self.limiter.admit(len(prompt) // 4 + body.get('max_tokens', 0))
+        if retry_after is not None:
+            error = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+            self._send_json(429, error, headers)
+            return
+        
+        latency = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        try:
+            self._complete(body, prompt, latency, headers)
+        finally:
+            self.limiter.done()
+    
+    def _complete(self, body, prompt, latency, headers):
+        tools = body.get('tools') or []
+        structured = bool(tools) or (body.get('response_format') or {}).get('type') == 'json_schema'
+        answer = answer_for(prompt, structured)
+        
+        with self.rng_lock:
+            kind = self.rng.choice(self.malformed_kinds) if self.rng.random() < self.malformed_rate else None
+            if kind:
+                type(self).malformed_count += 1
+                content = malform(answer, kind, self.rng)
+            else:
+                content = json.dumps(answer)
+        
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4
+        }
+        if body.get('stream'):
+            self._send_stream(body, content, usage, latency, headers)
+            return
+        
+        time.sleep(latency)
+        message = {"role": "assistant", "content": content}
+        if tools:
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": tools[0]["function"]["name"], "arguments": content}
+            }]}
+        
+        payload = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'fake'),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tools else "stop"
+            }],
+            "usage": usage
+        }
+        self._send_json(200, payload, headers)
+    
+    def _send_stream(self, body, content, usage, latency, headers):
+        """Server-sent events: a fifth of the latency before the first token, the rest spread over the answer"""
+        tools = body.get('tools') or []
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get('model', 'fake')}
+        
+        def send(choices, **extra):
+            event = dict(base, choices=choices, **extra)
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        time.sleep(latency * 0.2)
+        for i, piece in enumerate(pieces):
+            if tools:
+                call = {"index": 0, "function": {"arguments": piece}}
+                if i == 0:
+                    call.update({"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function"})
+                    call["function"]["name"] = tools[0]["function"]["name"]
+                delta = {"tool_calls": [call]}
+            else:
+                delta = {"content": piece}
+            if i == 0:
+                delta["role"] = "assistant"
+            send([{"index": 0, "delta": delta, "finish_reason": None}])
+            time.sleep(latency * 0.8 / len(pieces))
+        
+        send([{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tools else "stop"}])
+        if (body.get('stream_options') or {}).get('include_usage'):
+            send([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+    
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_server(port=0, latency=0.5, jitter=0.0, rpm=0, tpm=0, max_concurrent=0, window=60.0,
+                 malformed_rate=0.0, malformed_kinds=None, seed=0):
+    """Start the server on a background thread; returns (server, base_url)
+    
+    rpm/tpm/max_concurrent of 0 mean unlimited; server.limiter holds the counters.
+    A malformed_rate share of answers is damaged (see MALFORMED_KINDS);
+    server.handler.malformed_count counts them.
+    """
+    limiter = RateLimiter(rpm, tpm, max_concurrent, window)
+    handler = type('Handler', (FakeOpenAIHandler,), {
+        'latency': latency, 'jitter': jitter, 'limiter': limiter,
+        'malformed_rate': malformed_rate, 'malformed_kinds': malformed_kinds or MALFORMED_KINDS,
+        'rng': random.Random(seed), 'rng_lock': threading.Lock(), 'malformed_count': 0
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.limiter = limiter
+    server.handler = handler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions endpoint with injected latency")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± random seconds added to the latency")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per window before 429 (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens per window before 429 (0 = unlimited)")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="Concurrent requests before 429 (0 = unlimited)")
+    parser.add_argument("--window", type=float, default=60.0, help="Quota window in seconds")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of answers to damage (0-1)")
+    parser.add_argument("--malformed-kinds", default=",".join(MALFORMED_KINDS), help="Comma-separated damage kinds")
+    args = parser.parse_args()
+    
+    server, base_url = start_server(
+        args.port, args.latency, args.jitter, args.rpm, args.tpm, args.max_concurrent, args.window,
+        args.malformed_rate, args.malformed_kinds.split(",")
+    )
+    print(f"🧪 Fake OpenAI server on {base_url} ({args.latency}s ± {args.jitter}s per request)")
+    print(f"💡 export OPENAI_BASE_URL={base_url} OPENAI_API_KEY=fake")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
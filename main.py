@@ -6,6 +6,7 @@ import os
 from config import Config
 from src.data_collector import ReviewDataCollector
 from src.report_generator import TrendReportGenerator
+from src.review_store import SQLiteReviewStore
 
 def daterange(start: str, end: str):
     """Generate date range between start and end dates"""
@@ -26,7 +27,12 @@ def main():
     print(f"📱 App: {cfg.APP_NAME}")
     print(f"🆔 App ID: {cfg.TARGET_APP_ID}")
     print(f"📅 Date range: {start_date} → {target_date}")
-    print(f"🧠 AI Model: OpenAI GPT-3.5-turbo")
+    if cfg.LLM_CASCADE_ENABLED:
+        print(f"🧠 AI Model: {cfg.LLM_CASCADE_CHEAP_MODEL} → {cfg.LLM_CASCADE_STRONG_MODEL} below {cfg.LLM_CASCADE_THRESHOLD} confidence")
+    else:
+        print(f"🧠 AI Model: {cfg.LLM_MODEL}")
+    if cfg.LLM_BACKEND != "openai":
+        print(f"🔌 LLM backend: {cfg.LLM_BACKEND}")
     print(f"🔄 Batch size: {cfg.BATCH_SIZE}")
     
     Path("output").mkdir(exist_ok=True)
@@ -37,19 +43,31 @@ def main():
     print(f"\n📊 STEP 1: Data Collection")
     print("-" * 40)
     
-    collector = ReviewDataCollector()
+    store = SQLiteReviewStore() if cfg.USE_REVIEW_STORE else None
+    collector = ReviewDataCollector(store=store)
     total_collected = 0
     
-    for date_str in daterange(start_date, target_date):
-        print(f"📅 Collecting reviews for {date_str}...")
-        reviews = collector.collect_daily_reviews_gps(cfg.TARGET_APP_ID, date_str)
+    if cfg.INCREMENTAL_COLLECTION:
+        print(f"📅 Collecting unstored reviews for {start_date} → {target_date}...")
+        collector.collect_incremental(cfg.TARGET_APP_ID, start_date, target_date)
         
-        if reviews:
-            collector.save_daily_data(reviews, date_str)
-            total_collected += len(reviews)
-            print(f"✅ Saved {len(reviews)} reviews")
-        else:
-            print(f"⚠️ No reviews found")
+        for date_str in daterange(start_date, target_date):
+            stored = len(collector.load_daily_data(date_str))
+            total_collected += stored
+            print(f"✅ {stored} reviews stored for {date_str}")
+    else:
+        print(f"📅 Collecting reviews for {start_date} → {target_date} in one pass...")
+        daily_reviews = collector.collect_reviews_range(cfg.TARGET_APP_ID, start_date, target_date)
+        
+        for date_str in daterange(start_date, target_date):
+            reviews = daily_reviews.get(date_str, [])
+            
+            if reviews:
+                collector.save_daily_data(reviews, date_str)
+                total_collected += len(reviews)
+                print(f"✅ Saved {len(reviews)} reviews for {date_str}")
+            else:
+                print(f"⚠️ No reviews found for {date_str}")
     
     print(f"\n📈 Total reviews collected: {total_collected}")
     
@@ -68,7 +86,7 @@ def main():
     print("  • Topic deduplication & consolidation") 
     print("  • Trend analysis calculation")
     
-    generator = TrendReportGenerator(batch_size=cfg.BATCH_SIZE)
+    generator = TrendReportGenerator(batch_size=cfg.BATCH_SIZE, store=store, app_id=cfg.TARGET_APP_ID)
     trend_df = generator.generate_trend_table_range(start_date, target_date)
     
     if trend_df.empty:
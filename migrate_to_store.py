@@ -0,0 +1,57 @@
+# migrate_to_store.py - Import raw review files (every tier) into the review store
+import argparse
+from pathlib import Path
+
+from config import Config
+from src.raw_io import RAW_EXTENSIONS, find_raw_file
+from src.review_store import SQLiteReviewStore
+
+def raw_day_files(directory, include_old=True):
+    """(path, fmt) of the file readers use for each day in a directory
+    
+    When a day exists in several tiers only the newest is taken, as the
+    first append to a new tier copies the older one into it. The .ids
+    sidecars match no raw extension and are skipped.
+    """
+    bases = set()
+    for path in directory.iterdir():
+        for ext in RAW_EXTENSIONS.values():
+            if path.is_file() and path.name.endswith(ext):
+                bases.add(str(path)[:-len(ext)])
+    return [
+        find_raw_file(base) for base in sorted(bases)
+        if include_old or not base.endswith("_old")
+    ]
+
+def main():
+    cfg = Config()
+    
+    parser = argparse.ArgumentParser(description="Import data/raw_reviews files into the SQLite review store")
+    parser.add_argument("--app-id", default=cfg.TARGET_APP_ID, help="App id for the legacy un-partitioned files")
+    parser.add_argument("--raw-dir", default="data/raw_reviews", help="Raw review directory")
+    parser.add_argument("--include-old", action="store_true", help="Also import stray *_old copies")
+    args = parser.parse_args()
+    
+    store = SQLiteReviewStore()
+    raw_dir = Path(args.raw_dir)
+    
+    # Legacy files carry no app id; *_old copies may belong to another run
+    legacy_files = raw_day_files(raw_dir, include_old=args.include_old)
+    imported = store.import_raw_files(args.app_id, legacy_files)
+    print(f"✅ Imported {imported} reviews from {len(legacy_files)} legacy files for {args.app_id}")
+    
+    # Partitioned files: data/raw_reviews/<app_id>/<lang>_<country>/<date>.<tier extension>
+    for locale_dir in sorted(raw_dir.glob("*/*")):
+        if not locale_dir.is_dir():
+            continue
+        app_id = locale_dir.parent.name
+        lang, country = locale_dir.name.split("_", 1)
+        files = raw_day_files(locale_dir)
+        imported = store.import_raw_files(app_id, files, lang, country)
+        print(f"✅ Imported {imported} reviews from {len(files)} files for {app_id} ({lang}-{country})")
+    
+    print(f"📁 Store: {store.path}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# offline_helpers.py - Sample reviews and Config overrides shared by the offline tests
+from contextlib import contextmanager
+
+from config import Config
+
+# Distinct, non-trivial complaints so triage and near-duplicate collapsing leave them for the LLM
+SAMPLE_TEXTS = [
+    "delivery was very late and the courier never called back",
+    "app crashes every time i open the cart page on android",
+    "payment failed but my card was charged twice for one order",
+    "refund still not received after two weeks of waiting",
+    "the delivery partner was rude and asked for extra money",
+    "food arrived cold and the packaging was leaking everywhere",
+]
+
+# Keep the analyzer off disk and away from local shortcuts, and retry without sleeping
+OFFLINE_SETTINGS = {
+    'LLM_CACHE_ENABLED': False,
+    'ANALYSIS_CACHE_ENABLED': False,
+    'FAST_CLASSIFIER_ENABLED': False,
+    'LLM_BATCH_RETRY_BACKOFF': 0.0,
+}
+
+def sample_reviews(count, prefix="r", offset=0):
+    """`count` preprocessed reviews with ids prefix0, prefix1, ...; offset rotates the texts"""
+    return [
+        {
+            'reviewId': f"{prefix}{i}",
+            'cleaned_content': f"{SAMPLE_TEXTS[(offset + i) % len(SAMPLE_TEXTS)]} order {offset * 100 + i}",
+            'score': 2
+        }
+        for i in range(count)
+    ]
+
+@contextmanager
+def config_overrides(**settings):
+    """Set Config attributes for the duration of a block (or decorated test), then restore them"""
+    saved = {name: getattr(Config, name) for name in settings}
+    for name, value in settings.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+def offline_config(**settings):
+    """config_overrides with OFFLINE_SETTINGS plus any extra settings"""
+    return config_overrides(**{**OFFLINE_SETTINGS, **settings})
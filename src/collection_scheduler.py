@@ -0,0 +1,87 @@
+# src/collection_scheduler.py - Concurrent multi-app / multi-locale collection
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import Config
+from src.data_collector import ReviewDataCollector
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                
+                wait = (tokens - self.tokens) / self.rate
+            
+            time.sleep(wait)
+
+class CollectionScheduler:
+    def __init__(self, max_workers=None, host_rate_limits=None, store=None):
+        self.config = Config()
+        self.max_workers = max_workers or self.config.COLLECTION_WORKERS
+        
+        # One limiter per upstream host, shared by every worker thread
+        host_rate_limits = host_rate_limits or self.config.HOST_RATE_LIMITS
+        self.rate_limiters = {
+            host: TokenBucket(rate) for host, rate in host_rate_limits.items()
+        }
+        self.collector = ReviewDataCollector(rate_limiters=self.rate_limiters, store=store)
+    
+    def collect_app_locale(self, app_id, lang, country, start_date, end_date):
+        """Collect and save one (app, locale) partition for a date range"""
+        daily_reviews = self.collector.collect_reviews_range(
+            app_id, start_date, end_date, lang=lang, country=country
+        )
+        
+        counts = {}
+        for date_str, reviews_data in daily_reviews.items():
+            if reviews_data:
+                self.collector.save_daily_data(reviews_data, date_str, app_id, lang, country)
+            counts[date_str] = len(reviews_data)
+        
+        return counts
+    
+    def run(self, start_date, end_date, apps=None, locales=None):
+        """Fetch every (app, locale) pair concurrently
+        
+        Returns {(app_id, lang, country): {date: review_count}}.
+        """
+        apps = apps or self.config.TRACKED_APPS
+        locales = locales or self.config.TRACKED_LOCALES
+        jobs = [(app_id, lang, country) for app_id in apps for lang, country in locales]
+        
+        print(f"🔄 Collecting {len(jobs)} (app, locale) pairs with {self.max_workers} workers...")
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.collect_app_locale, app_id, lang, country, start_date, end_date): (app_id, lang, country)
+                for app_id, lang, country in jobs
+            }
+            
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results[job] = future.result()
+                    print(f"✅ {job[0]} ({job[1]}-{job[2]}): {sum(results[job].values())} reviews")
+                except Exception as e:
+                    print(f"❌ {job[0]} ({job[1]}-{job[2]}) failed: {e}")
+                    results[job] = {}
+        
+        return results
@@ -1,73 +1,494 @@
 # src/data_collector.py - Complete implementation
 import requests
-import json
 import os
+import re
+from importlib import metadata
+from urllib.parse import urlparse
 from datetime import datetime, timedelta
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from google_play_scraper import reviews, Sort
 from config import Config
+from src import serializer
+from src.raw_io import append_jsonl, find_raw_file, iter_raw_file, load_review_ids, raw_path, save_review_ids
+
+# CSS selectors for review cards in the JS-rendered Play Store page
+REVIEW_CARD_SELECTOR = "div.RHo1pe"
+REVIEW_HEADER_SELECTOR = "header[data-review-id]"
+REVIEW_USER_SELECTOR = "div.X5PpBb"
+REVIEW_RATING_SELECTOR = "div[role=img][aria-label]"
+REVIEW_DATE_SELECTOR = "span.bp9Aid"
+REVIEW_CONTENT_SELECTOR = "div.h3YV2d"
+REVIEW_HELPFUL_SELECTOR = "div.AJTPZc"
+
+try:
+    # Private class, only needed to resume a backfill from a saved token. Its
+    # constructor matches google-play-scraper==1.2.7 as pinned in requirements.txt
+    from google_play_scraper.features.reviews import _ContinuationToken
+except ImportError:
+    _ContinuationToken = None
+
+try:
+    GOOGLE_PLAY_SCRAPER_VERSION = metadata.version("google-play-scraper")
+except metadata.PackageNotFoundError:
+    GOOGLE_PLAY_SCRAPER_VERSION = None
 
 class ReviewDataCollector:
-    def __init__(self):
+    def __init__(self, rate_limiters=None, store=None):
         self.config = Config()
+        # Optional ReviewStore; when set it replaces the per-date JSON files
+        self.store = store
         self.scraper_api_base = "http://api.scraperapi.com"
+        self.play_store_host = "play.google.com"
+        self.session = self._build_session()
+        # Optional {host: TokenBucket} shared by every thread using this collector
+        self.rate_limiters = rate_limiters or {}
     
-    def collect_daily_reviews_gps(self, app_id, date_str):
-        """Collect reviews using google-play-scraper for specific date"""
-        try:
-            # Get reviews for the date
+    def _build_session(self):
+        """Pooled keep-alive session with retry/backoff for ScraperAPI calls"""
+        retry = Retry(
+            total=self.config.SCRAPER_API_RETRIES,
+            backoff_factor=self.config.SCRAPER_API_BACKOFF,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.config.COLLECTION_WORKERS, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def _throttle(self, host):
+        """Wait for the host's rate limiter, if one is configured"""
+        limiter = self.rate_limiters.get(host)
+        if limiter is not None:
+            limiter.acquire()
+    
+    def _format_review(self, review, date_str):
+        """Convert a google-play-scraper review into our raw review record"""
+        return {
+            'date': date_str,
+            'content': review['content'],
+            'score': review['score'],
+            'userName': review['userName'],
+            'reviewId': review['reviewId'],
+            'thumbsUpCount': review.get('thumbsUpCount', 0)
+        }
+    
+    def iter_review_pages(self, app_id, continuation_token=None, lang='en', country='us'):
+        """Page through reviews newest-first, yielding (page, continuation_token)"""
+        while True:
+            self._throttle(self.play_store_host)
             result, continuation_token = reviews(
                 app_id,
-                lang='en',
-                country='us',
+                lang=lang,
+                country=country,
                 sort=Sort.NEWEST,
-                count=1000  # Adjust based on volume
+                count=self.config.REVIEWS_PAGE_SIZE,
+                continuation_token=continuation_token
             )
             
-            # Filter reviews by date
-            target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            daily_reviews = []
+            if not result:
+                return
             
-            for review in result:
-                review_date = review['at'].date()
-                if review_date == target_date:
-                    daily_reviews.append({
-                        'date': date_str,
-                        'content': review['content'],
-                        'score': review['score'],
-                        'userName': review['userName'],
-                        'reviewId': review['reviewId'],
-                        'thumbsUpCount': review.get('thumbsUpCount', 0)
-                    })
+            yield result, continuation_token
             
-            return daily_reviews
+            if continuation_token is None or continuation_token.token is None:
+                return
+    
+    def collect_daily_reviews_gps(self, app_id, date_str):
+        """Collect reviews using google-play-scraper for specific date"""
+        return self.collect_reviews_range(app_id, date_str, date_str).get(date_str, [])
+    
+    def collect_reviews_range(self, app_id, start_date, end_date, lang='en', country='us'):
+        """Collect reviews for a date range in a single newest-first pass
+        
+        Pages through the continuation token until a page reaches past
+        start_date and buckets reviews by date, so an N-day range costs one
+        walk over the review feed instead of N identical fetches.
+        """
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        
+        daily_reviews = {}
+        current = start
+        while current <= end:
+            daily_reviews[current.strftime("%Y-%m-%d")] = []
+            current += timedelta(days=1)
+        
+        try:
+            pages = 0
+            for page, _ in self.iter_review_pages(app_id, lang=lang, country=country):
+                pages += 1
+                for review in page:
+                    review_date = review['at'].date()
+                    if start <= review_date <= end:
+                        date_str = review_date.strftime("%Y-%m-%d")
+                        daily_reviews[date_str].append(self._format_review(review, date_str))
+                
+                # Reviews come newest first, so nothing older is left to collect
+                if page[-1]['at'].date() < start:
+                    break
+            
+            print(f"Fetched {pages} pages for {app_id} ({lang}-{country}) {start_date} to {end_date}")
             
         except Exception as e:
-            print(f"Error collecting reviews for {date_str}: {e}")
+            print(f"Error collecting reviews for {app_id} ({lang}-{country}) {start_date} to {end_date}: {e}")
+        
+        return daily_reviews
+    
+    def load_watermarks(self):
+        """Load the per-app high-water marks of already stored reviews"""
+        try:
+            return serializer.load_file(self.config.WATERMARK_PATH)
+        except FileNotFoundError:
+            return {}
+        except serializer.DecodeError as e:
+            print(f"Error parsing watermark file, starting fresh: {e}")
+            return {}
+    
+    def save_watermark(self, app_id, review, since_date):
+        """Persist the newest stored review as the app's high-water mark
+        
+        since_date records how far back stored reviews reach without gaps,
+        so a later run asking for older dates knows it must page past it.
+        """
+        watermarks = self.load_watermarks()
+        watermarks[app_id] = {
+            'at': review['at'].isoformat(),
+            'reviewId': review['reviewId'],
+            'since': since_date
+        }
+        
+        os.makedirs(os.path.dirname(self.config.WATERMARK_PATH), exist_ok=True)
+        serializer.dump_file(watermarks, self.config.WATERMARK_PATH, indent=True)
+    
+    def collect_new_reviews(self, app_id, since_date, until_date=None):
+        """Collect reviews from since_date through until_date that are not stored yet
+        
+        When the app's watermark already covers since_date, paging stops at
+        the first review it covers; otherwise (no watermark, or one written
+        by a run that started later) paging goes back to since_date. Reviews
+        after until_date are skipped and left for a later run. Returns the
+        new reviews bucketed by date, the newest one kept (or None) and the
+        date stored reviews now reach back to without gaps.
+        """
+        watermark = self.load_watermarks().get(app_id)
+        if watermark and not (watermark.get('since') or "9999-12-31") <= since_date <= watermark['at'][:10]:
+            print(f"Watermark for {app_id} does not cover {since_date}, paging back to it")
+            watermark = None
+        watermark_at = datetime.fromisoformat(watermark['at']) if watermark else None
+        since = datetime.strptime(since_date, "%Y-%m-%d").date()
+        until = datetime.strptime(until_date, "%Y-%m-%d").date() if until_date else None
+        
+        daily_reviews = {}
+        newest_review = None
+        
+        try:
+            for page, _ in self.iter_review_pages(app_id):
+                reached_stored = False
+                for review in page:
+                    if watermark and (review['reviewId'] == watermark['reviewId'] or review['at'] < watermark_at):
+                        reached_stored = True
+                        break
+                    if review['at'].date() < since:
+                        reached_stored = True
+                        break
+                    if until is not None and review['at'].date() > until:
+                        continue
+                    
+                    if newest_review is None:
+                        newest_review = review
+                    
+                    date_str = review['at'].strftime("%Y-%m-%d")
+                    daily_reviews.setdefault(date_str, []).append(self._format_review(review, date_str))
+                
+                if reached_stored:
+                    break
+        
+        except Exception as e:
+            print(f"Error collecting new reviews for {app_id}: {e}")
+            # Paging stopped short of since_date/the watermark, so leave the watermark where it was
+            newest_review = None
+        
+        covered_since = watermark['since'] if watermark else since_date
+        return daily_reviews, newest_review, covered_since
+    
+    def collect_incremental(self, app_id, since_date, until_date=None):
+        """Fetch unstored reviews from since_date through until_date, append them and advance the watermark"""
+        daily_reviews, newest_review, covered_since = self.collect_new_reviews(app_id, since_date, until_date)
+        
+        for date_str, reviews_data in sorted(daily_reviews.items()):
+            self.append_daily_data(reviews_data, date_str)
+        
+        # Advance the watermark only once the new reviews are on disk, so a
+        # crash mid-run simply re-fetches the same (deduplicated) reviews
+        if newest_review is not None:
+            self.save_watermark(app_id, newest_review, covered_since)
+        
+        new_count = sum(len(r) for r in daily_reviews.values())
+        print(f"Collected {new_count} new reviews for {app_id}")
+        return daily_reviews
+    
+    def _token_to_dict(self, continuation_token):
+        """Serialize a google-play-scraper continuation token for a checkpoint"""
+        return {
+            'library_version': GOOGLE_PLAY_SCRAPER_VERSION,
+            'token': continuation_token.token,
+            'lang': continuation_token.lang,
+            'country': continuation_token.country,
+            'sort': int(continuation_token.sort),
+            'count': continuation_token.count,
+            'filter_score_with': continuation_token.filter_score_with,
+            'filter_device_with': continuation_token.filter_device_with
+        }
+    
+    def _token_from_dict(self, data):
+        """Rebuild a continuation token saved by _token_to_dict
+        
+        Returns None when the installed google-play-scraper is not the one
+        that wrote the token (or no longer has the private token class).
+        """
+        if _ContinuationToken is None:
+            return None
+        if data.get('library_version', GOOGLE_PLAY_SCRAPER_VERSION) != GOOGLE_PLAY_SCRAPER_VERSION:
+            return None
+        
+        try:
+            return _ContinuationToken(
+                data['token'],
+                data['lang'],
+                data['country'],
+                data['sort'],
+                data['count'],
+                data['filter_score_with'],
+                data['filter_device_with']
+            )
+        except (TypeError, KeyError):
+            return None
+    
+    def load_checkpoint(self, checkpoint_path):
+        """Load a backfill checkpoint, or None if there is none"""
+        try:
+            return serializer.load_file(checkpoint_path)
+        except FileNotFoundError:
+            return None
+        except serializer.DecodeError as e:
+            print(f"Error parsing checkpoint {checkpoint_path}, starting over: {e}")
+            return None
+    
+    def save_checkpoint(self, checkpoint, checkpoint_path):
+        """Atomically write a backfill checkpoint"""
+        os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+        tmp_path = checkpoint_path + ".tmp"
+        
+        serializer.dump_file(checkpoint, tmp_path)
+        os.replace(tmp_path, checkpoint_path)
+    
+    def backfill_reviews(self, app_id, target_date, checkpoint_path=None, restart=False):
+        """Page through the full review history down to target_date
+        
+        Each page is written straight to the daily files, then the
+        continuation token and the page itself are checkpointed, so memory
+        stays at one page and an interrupted backfill resumes where it stopped.
+        """
+        checkpoint_path = checkpoint_path or f"{self.config.CHECKPOINT_DIR}/backfill_{app_id}.json"
+        target = datetime.strptime(target_date, "%Y-%m-%d").date()
+        
+        checkpoint = None if restart else self.load_checkpoint(checkpoint_path)
+        continuation_token = None
+        pages = 0
+        stored = 0
+        
+        if checkpoint:
+            if checkpoint.get('oldest_date') and checkpoint['oldest_date'] < target_date:
+                print(f"Backfill for {app_id} already reached {checkpoint['oldest_date']}")
+                return checkpoint
+            if checkpoint.get('continuation_token') is None:
+                print(f"Backfill for {app_id} already reached the oldest review")
+                return checkpoint
+            
+            continuation_token = self._token_from_dict(checkpoint['continuation_token'])
+            if continuation_token is None:
+                # Pages already stored are skipped by reviewId, so starting over only costs fetches
+                saved_version = checkpoint['continuation_token'].get('library_version')
+                print(f"⚠️ Cannot resume {app_id} with google-play-scraper {GOOGLE_PLAY_SCRAPER_VERSION} "
+                      f"(token saved by {saved_version}; requirements.txt pins 1.2.7), restarting from the newest page")
+            else:
+                pages = checkpoint['pages']
+                stored = checkpoint['reviews_stored']
+                print(f"Resuming backfill for {app_id} after {pages} pages ({checkpoint['oldest_date']})")
+        
+        try:
+            for page, continuation_token in self.iter_review_pages(app_id, continuation_token):
+                last_page = []
+                daily_reviews = {}
+                for review in page:
+                    if review['at'].date() < target:
+                        continue
+                    date_str = review['at'].strftime("%Y-%m-%d")
+                    record = self._format_review(review, date_str)
+                    daily_reviews.setdefault(date_str, []).append(record)
+                    last_page.append(record)
+                
+                for date_str, reviews_data in daily_reviews.items():
+                    self.append_daily_data(reviews_data, date_str)
+                
+                pages += 1
+                stored += len(last_page)
+                oldest_date = page[-1]['at'].strftime("%Y-%m-%d")
+                has_more = continuation_token is not None and continuation_token.token is not None
+                
+                checkpoint = {
+                    'app_id': app_id,
+                    'target_date': target_date,
+                    'pages': pages,
+                    'reviews_stored': stored,
+                    'oldest_date': oldest_date,
+                    'continuation_token': self._token_to_dict(continuation_token) if has_more else None,
+                    'last_page': last_page
+                }
+                self.save_checkpoint(checkpoint, checkpoint_path)
+                print(f"Backfill page {pages}: {len(last_page)} reviews, reached {oldest_date}")
+                
+                if page[-1]['at'].date() < target:
+                    break
+        
+        except Exception as e:
+            print(f"Backfill for {app_id} interrupted after {pages} pages: {e}")
+            print(f"Rerun to resume from {checkpoint_path}")
+        
+        return checkpoint
+    
+    def daily_data_base(self, date_str, app_id=None, lang=None, country=None):
+        """Extension-less path of a date's raw reviews, partitioned by app and locale when given"""
+        if app_id is None:
+            return f"data/raw_reviews/{date_str}"
+        return f"data/raw_reviews/{app_id}/{lang}_{country}/{date_str}"
+    
+    def daily_data_path(self, date_str, app_id=None, lang=None, country=None, fmt=None):
+        """Path of a date's raw review file in the given (or configured) format"""
+        return raw_path(self.daily_data_base(date_str, app_id, lang, country), fmt or self.config.RAW_FORMAT)
+    
+    def load_daily_data(self, date_str, app_id=None, lang=None, country=None):
+        """Load the raw reviews already stored for a date"""
+        if self.store is not None:
+            return self.store.load_day(app_id or self.config.TARGET_APP_ID, date_str, lang, country)
+        
+        filename, fmt = find_raw_file(self.daily_data_base(date_str, app_id, lang, country))
+        if filename is None:
             return []
+        return list(iter_raw_file(filename, fmt))
+    
+    def append_daily_data(self, reviews_data, date_str, app_id=None, lang=None, country=None):
+        """Append reviews to a date's file, skipping reviewIds already stored"""
+        if self.store is not None:
+            return self.save_daily_data(reviews_data, date_str, app_id, lang, country)
+        
+        filename = self.daily_data_path(date_str, app_id, lang, country)
+        
+        if self.config.RAW_FORMAT != "json":
+            # save_daily_data already appends only unseen reviewIds for JSONL tiers
+            return self.save_daily_data(reviews_data, date_str, app_id, lang, country)
+        
+        existing = self.load_daily_data(date_str, app_id, lang, country)
+        seen_ids = {review['reviewId'] for review in existing}
+        new_reviews = [review for review in reviews_data if review['reviewId'] not in seen_ids]
+        
+        if not new_reviews and existing:
+            return filename
+        
+        return self.save_daily_data(new_reviews + existing, date_str, app_id, lang, country)
     
-    def save_daily_data(self, reviews_data, date_str):
-        """Save daily reviews to JSON file - THIS WAS MISSING"""
-        filename = f"data/raw_reviews/{date_str}.json"
+    def save_daily_data(self, reviews_data, date_str, app_id=None, lang=None, country=None):
+        """Save daily reviews to JSON file - THIS WAS MISSING
+        
+        With Config.RAW_FORMAT set to a JSONL tier, reviews whose reviewId is
+        not already in the day's file are appended instead of rewriting it.
+        The first append for a day copies any older-tier file (e.g. the legacy
+        .json) into the new tier, since readers only open the newest one.
+        """
+        if self.store is not None:
+            self.store.upsert_reviews(app_id or self.config.TARGET_APP_ID, reviews_data, lang or 'en', country or 'us')
+            print(f"Stored {len(reviews_data)} reviews for {date_str}")
+            return self.store.path
+        
+        fmt = self.config.RAW_FORMAT
+        filename = self.daily_data_path(date_str, app_id, lang, country, fmt)
+        
+        if fmt != "json":
+            if not os.path.exists(filename):
+                legacy_file, legacy_fmt = find_raw_file(self.daily_data_base(date_str, app_id, lang, country))
+                if legacy_file is not None:
+                    migrated = append_jsonl(filename, list(iter_raw_file(legacy_file, legacy_fmt)), fmt)
+                    print(f"Migrated {migrated} reviews from {legacy_file} to {filename}")
+            
+            seen_ids = load_review_ids(filename, fmt)
+            new_reviews = [review for review in reviews_data if review['reviewId'] not in seen_ids]
+            
+            append_jsonl(filename, new_reviews, fmt)
+            if os.path.exists(filename):
+                save_review_ids(filename, seen_ids | {review['reviewId'] for review in new_reviews})
+            print(f"Appended {len(new_reviews)} new reviews for {date_str}")
+            return filename
+        
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(reviews_data, f, ensure_ascii=False, indent=2)
+        serializer.dump_file(reviews_data, filename, indent=True)
         
         print(f"Saved {len(reviews_data)} reviews for {date_str}")
         return filename
     
     def collect_historical_data(self, start_date, end_date):
         """Collect data for date range"""
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
+        print(f"Collecting data for {start_date} to {end_date}...")
+        daily_reviews = self.collect_reviews_range(self.config.TARGET_APP_ID, start_date, end_date)
         
-        current = start
-        while current <= end:
-            date_str = current.strftime("%Y-%m-%d")
-            print(f"Collecting data for {date_str}...")
-            reviews = self.collect_daily_reviews_gps(self.config.TARGET_APP_ID, date_str)
+        for date_str, reviews in daily_reviews.items():
             self.save_daily_data(reviews, date_str)
-            current += timedelta(days=1)
+        
+        return daily_reviews
+    
+    def parse_reviews_html(self, html, date_str):
+        """Extract the reviews for date_str from a rendered Play Store page"""
+        soup = BeautifulSoup(html, 'html.parser')
+        target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        daily_reviews = []
+        
+        for card in soup.select(REVIEW_CARD_SELECTOR):
+            header = card.select_one(REVIEW_HEADER_SELECTOR)
+            date_tag = card.select_one(REVIEW_DATE_SELECTOR)
+            content_tag = card.select_one(REVIEW_CONTENT_SELECTOR)
+            if header is None or date_tag is None or content_tag is None:
+                continue
+            
+            try:
+                review_date = datetime.strptime(date_tag.get_text(strip=True), "%B %d, %Y").date()
+            except ValueError:
+                continue
+            if review_date != target_date:
+                continue
+            
+            user_tag = card.select_one(REVIEW_USER_SELECTOR)
+            rating_tag = card.select_one(REVIEW_RATING_SELECTOR)
+            helpful_tag = card.select_one(REVIEW_HELPFUL_SELECTOR)
+            
+            rating_match = re.search(r'(\d)', rating_tag['aria-label']) if rating_tag else None
+            helpful_match = re.search(r'([\d,]+)', helpful_tag.get_text()) if helpful_tag else None
+            
+            daily_reviews.append({
+                'date': date_str,
+                'content': content_tag.get_text(strip=True),
+                'score': int(rating_match.group(1)) if rating_match else 0,
+                'userName': user_tag.get_text(strip=True) if user_tag else '',
+                'reviewId': header['data-review-id'],
+                'thumbsUpCount': int(helpful_match.group(1).replace(',', '')) if helpful_match else 0
+            })
+        
+        return daily_reviews
     
     def collect_reviews_with_scraper_api(self, app_id, date_str):
         """Alternative method using ScraperAPI for Google Play Store"""
@@ -84,12 +505,13 @@ class ReviewDataCollector:
         }
         
         try:
-            response = requests.get(self.scraper_api_base, params=params, timeout=75)
+            self._throttle(urlparse(self.scraper_api_base).hostname)
+            response = self.session.get(self.scraper_api_base, params=params, timeout=75)
             
             if response.status_code == 200:
-                # For now, using google-play-scraper as primary method
-                print(f"ScraperAPI response received for {date_str}")
-                return self.collect_daily_reviews_gps(app_id, date_str)
+                daily_reviews = self.parse_reviews_html(response.text, date_str)
+                print(f"ScraperAPI: parsed {len(daily_reviews)} reviews for {date_str}")
+                return daily_reviews
             else:
                 print(f"ScraperAPI Error: {response.status_code}")
                 return []
@@ -1,15 +1,18 @@
 # src/deduplicator_optimized.py - Fast version
-import json
-from openai import OpenAI
 from collections import defaultdict
 from config import Config
-import time
+from src import serializer
+from src.llm_backend import create_backend
+from src.llm_cache import LLMResponseCache
+from src.rate_controller import estimate_tokens, shared_controller
 
 class OptimizedTopicDeduplicator:
-    def __init__(self):
+    def __init__(self, backend=None):
         self.config = Config()
-        self.client = OpenAI(api_key=self.config.OPENAI_API_KEY)
+        self.backend = backend or create_backend()
+        self.rate_controller = shared_controller()
         self.topic_taxonomy = {}
+        self.llm_cache = LLMResponseCache() if self.config.LLM_CACHE_ENABLED else None
     
     def batch_merge_topics(self, topics_list):
         """Batch process multiple topics at once to reduce API calls"""
@@ -52,18 +55,25 @@ Respond with JSON only:
 }}
 """
         
+        model = self.config.LLM_DEDUP_MODEL
+        messages = [
+            {"role": "system", "content": "You are an expert at semantic grouping. Respond only with valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+        params = {"temperature": 0.1, "max_tokens": 1000}
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert at semantic grouping. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=1000
-            )
+            raw_content = self.llm_cache.get(model, messages, **params) if self.llm_cache else None
+            fresh = raw_content is None
+            
+            if fresh:
+                response = self.rate_controller.call(
+                    lambda: self.backend.create(model=model, messages=messages, **params),
+                    tokens=estimate_tokens(messages, params['max_tokens'])
+                )
+                raw_content = response.choices[0].message.content
             
-            content = response.choices[0].message.content.strip()
+            content = raw_content.strip()
             
             # Clean response
             if content.startswith('```json'):
@@ -75,7 +85,11 @@ Respond with JSON only:
                 
             content = content.strip()
             
-            result = json.loads(content)
+            result = serializer.loads(content)
+            
+            # Only answers that parsed are cached, so a bad one is retried next run
+            if fresh and self.llm_cache:
+                self.llm_cache.put(model, messages, raw_content, **params)
             
             # Convert to taxonomy mapping
             taxonomy = {}
@@ -97,7 +111,8 @@ Respond with JSON only:
     def build_topic_taxonomy(self, all_topics):
         """Build taxonomy using batch processing - MUCH FASTER"""
         
-        topic_list = list(all_topics)
+        # Sorted so batches (and their cached responses) are stable between runs
+        topic_list = sorted(all_topics)
         print(f"🔄 Batch deduplicating {len(topic_list)} topics...")
         
         if len(topic_list) <= 5:
@@ -114,9 +129,6 @@ Respond with JSON only:
             
             batch_taxonomy = self.batch_merge_topics(batch)
             consolidated_taxonomy.update(batch_taxonomy)
-            
-            # Small delay to avoid rate limiting
-            time.sleep(0.5)
         
         merges = len([k for k, v in consolidated_taxonomy.items() if k != v])
         print(f"📊 Batch deduplication complete: {merges} topics merged")
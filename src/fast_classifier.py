@@ -0,0 +1,198 @@
+# src/fast_classifier.py - In-process seed topic classifier trained from past LLM labels
+import os
+import re
+import zlib
+import numpy as np
+from config import Config
+from src.raw_io import append_jsonl, iter_jsonl
+
+OTHER_LABEL = "__other__"   # reviews whose LLM topics are not seed topics
+TOKEN_RE = re.compile(r"[\w']+")
+
+class SeedTopicClassifier:
+    """Hashing-trick TF-IDF features with a softmax linear model over Config.SEED_TOPICS
+    
+    High-confidence predictions are labelled locally; everything else (and
+    anything predicted as a non-seed topic) is left for the LLM.
+    """
+    
+    def __init__(self, topics=None, n_features=2 ** 18):
+        self.topics = list(topics or Config.SEED_TOPICS)
+        self.labels = self.topics + [OTHER_LABEL]
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        self.idf = np.ones(n_features, dtype=np.float32)
+        self.trained = False
+    
+    def _hashed_terms(self, text):
+        """Unigram and bigram feature indices for one text"""
+        tokens = TOKEN_RE.findall(text.lower())
+        terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(term.encode('utf-8')) % self.n_features for term in terms]
+    
+    def featurize(self, texts):
+        """Sparse rows as (indptr, indices, values), log-TF × IDF, L2-normalised"""
+        indptr = [0]
+        indices = []
+        values = []
+        
+        for text in texts:
+            counts = {}
+            for index in self._hashed_terms(text or ""):
+                counts[index] = counts.get(index, 0) + 1
+            
+            row_indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            row_values = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[row_indices]
+            norm = np.sqrt(np.dot(row_values, row_values))
+            if norm > 0:
+                row_values /= norm
+            
+            indices.append(row_indices)
+            values.append(row_values.astype(np.float32))
+            indptr.append(indptr[-1] + len(counts))
+        
+        if not indices:
+            return np.array(indptr), np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        return np.array(indptr), np.concatenate(indices), np.concatenate(values)
+    
+    def _scores(self, indptr, indices, values):
+        """Linear scores for every row: sum of value × weight row, plus bias"""
+        n_rows = len(indptr) - 1
+        if len(indices) == 0:
+            return np.tile(self.bias, (n_rows, 1))
+        
+        contributions = self.weights[indices] * values[:, None]
+        row_ids = np.repeat(np.arange(n_rows), np.diff(indptr))
+        scores = np.zeros((n_rows, len(self.labels)), dtype=np.float32)
+        np.add.at(scores, row_ids, contributions)
+        return scores + self.bias
+    
+    def _softmax(self, scores):
+        scores = scores - scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+    
+    def fit(self, texts, labels, epochs=30, learning_rate=20.0, l2=1e-6, batch_size=256, seed=0):
+        """Train with mini-batch gradient descent on the softmax cross-entropy"""
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        y = np.array([label_index.get(label, label_index[OTHER_LABEL]) for label in labels])
+        
+        # Document frequencies in hashed space give the IDF weights
+        doc_freq = np.zeros(self.n_features, dtype=np.float32)
+        for text in texts:
+            doc_freq[list(set(self._hashed_terms(text or "")))] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype(np.float32)
+        
+        indptr, indices, values = self.featurize(texts)
+        self.weights[:] = 0
+        self.bias[:] = 0
+        rng = np.random.default_rng(seed)
+        
+        for _ in range(epochs):
+            order = rng.permutation(len(texts))
+            for start in range(0, len(order), batch_size):
+                rows = order[start:start + batch_size]
+                starts, ends = indptr[rows], indptr[rows + 1]
+                lengths = ends - starts
+                take = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if len(rows) else np.array([], dtype=np.int64)
+                batch_indptr = np.concatenate([[0], np.cumsum(lengths)])
+                batch_indices, batch_values = indices[take], values[take]
+                
+                probs = self._softmax(self._scores(batch_indptr, batch_indices, batch_values))
+                probs[np.arange(len(rows)), y[rows]] -= 1.0
+                probs /= len(rows)
+                
+                row_ids = np.repeat(np.arange(len(rows)), lengths)
+                gradient = batch_values[:, None] * probs[row_ids]
+                np.add.at(self.weights, batch_indices, -learning_rate * gradient)
+                self.weights *= (1 - learning_rate * l2)
+                self.bias -= learning_rate * probs.sum(axis=0)
+        
+        self.trained = True
+        return self
+    
+    def predict(self, texts):
+        """Return [(label, confidence)] for each text"""
+        if not texts:
+            return []
+        probs = self._softmax(self._scores(*self.featurize(texts)))
+        best = probs.argmax(axis=1)
+        return [(self.labels[i], float(probs[row, i])) for row, i in enumerate(best)]
+    
+    def split(self, reviews, threshold=None):
+        """Return (local_results, llm_reviews): confident seed-topic predictions stay local"""
+        threshold = threshold or Config.FAST_CLASSIFIER_THRESHOLD
+        if not self.trained or not reviews:
+            return [], list(reviews)
+        
+        local_results = []
+        llm_reviews = []
+        predictions = self.predict([review['cleaned_content'] for review in reviews])
+        
+        for review, (label, confidence) in zip(reviews, predictions):
+            if label != OTHER_LABEL and confidence >= threshold:
+                local_results.append({
+                    'review_id': review['reviewId'],
+                    'identified_topics': [label],
+                    'confidence': round(confidence, 3),
+                    'source': 'fast_classifier'
+                })
+            else:
+                llm_reviews.append(review)
+        
+        return local_results, llm_reviews
+    
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            idf=self.idf,
+            labels=np.array(self.labels),
+            n_features=self.n_features
+        )
+    
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        labels = [str(label) for label in data['labels']]
+        model = cls(topics=labels[:-1], n_features=int(data['n_features']))
+        model.weights = data['weights']
+        model.bias = data['bias']
+        model.idf = data['idf']
+        model.trained = True
+        return model
+
+def record_llm_labels(analyses, reviews_by_id, path=None):
+    """Append LLM per-review results with their text to the training label log"""
+    path = path or Config.LLM_LABELS_PATH
+    records = [
+        {
+            'review_id': analysis['review_id'],
+            'text': reviews_by_id[analysis['review_id']]['cleaned_content'],
+            'topics': analysis.get('identified_topics', [])
+        }
+        for analysis in analyses
+        if analysis.get('review_id') in reviews_by_id
+    ]
+    append_jsonl(path, records, "jsonl")
+
+def load_training_data(path=None, topics=None):
+    """Read the label log into (texts, labels); the first seed topic wins, else OTHER_LABEL"""
+    path = path or Config.LLM_LABELS_PATH
+    topics = set(topics or Config.SEED_TOPICS)
+    latest = {}
+    
+    # Later entries for the same review replace earlier ones
+    for record in iter_jsonl(path):
+        latest[record['review_id']] = record
+    
+    texts = []
+    labels = []
+    for record in latest.values():
+        seed_topics = [topic for topic in record['topics'] if topic in topics]
+        texts.append(record['text'])
+        labels.append(seed_topics[0] if seed_topics else OTHER_LABEL)
+    return texts, labels
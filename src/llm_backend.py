@@ -0,0 +1,420 @@
+# src/llm_backend.py - Pluggable chat-completion backends: OpenAI, record/replay and a local stub
+import asyncio
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from config import Config
+from src.llm_cache import LLMResponseCache
+from src.raw_io import append_jsonl, iter_jsonl
+from src.rate_controller import estimate_tokens
+from src.token_budget import count_tokens
+
+STREAM_PARAMS = ("stream", "stream_options")
+STREAM_CHUNK_CHARS = 24   # characters per synthesized stream delta
+
+class RawResponse:
+    """What with_raw_response.create() gives back: headers plus parse()"""
+    
+    def __init__(self, parsed, headers=None):
+        self.parsed = parsed
+        self.headers = headers or {}
+    
+    def parse(self):
+        return self.parsed
+
+class _AsyncChunks:
+    """Async iterator over already-built stream chunks"""
+    
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+def answer_text(completion):
+    """(text, tool name) of a non-streamed completion"""
+    message = completion.choices[0].message
+    if getattr(message, 'tool_calls', None):
+        return message.tool_calls[0].function.arguments, message.tool_calls[0].function.name
+    return message.content or "", None
+
+def build_completion(model, content, tool_name=None, usage=None):
+    """ChatCompletion carrying content, or a single tool call when tool_name is set"""
+    message = {"role": "assistant", "content": content}
+    if tool_name:
+        message = {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": tool_name, "arguments": content}
+        }]}
+    return ChatCompletion.model_validate({
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_name else "stop"}],
+        "usage": usage
+    })
+
+def build_chunks(model, content, tool_name=None, usage=None):
+    """The same answer as a list of ChatCompletionChunk deltas (usage last, if given)"""
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": model}
+    pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+    
+    chunks = []
+    for i, piece in enumerate(pieces):
+        if tool_name:
+            call = {"index": 0, "function": {"arguments": piece}}
+            if i == 0:
+                call.update({"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function"})
+                call["function"]["name"] = tool_name
+            delta = {"tool_calls": [call]}
+        else:
+            delta = {"content": piece}
+        if i == 0:
+            delta["role"] = "assistant"
+        chunks.append(dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+    
+    chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tool_name else "stop"}]))
+    if usage:
+        chunks.append(dict(base, choices=[], usage=usage))
+    return [ChatCompletionChunk.model_validate(chunk) for chunk in chunks]
+
+def build_response(model, content, tool_name=None, usage=None, stream=False, is_async=False, headers=None):
+    """RawResponse holding a completion, or chunks when the request asked for a stream"""
+    if not stream:
+        return RawResponse(build_completion(model, content, tool_name, usage), headers)
+    chunks = build_chunks(model, content, tool_name, usage)
+    return RawResponse(_AsyncChunks(chunks) if is_async else iter(chunks), headers)
+
+class LLMBackend(ABC):
+    """Chat-completion backend shared by the analyzer and the deduplicator
+    
+    create() mirrors client.chat.completions.with_raw_response.create(), so
+    calls run unchanged under AdaptiveConcurrencyController.call(). For
+    async dispatch, `async with backend.session() as client` yields an
+    object whose create() is awaitable; one session per event loop.
+    """
+    
+    name = "base"
+    
+    @abstractmethod
+    def create(self, model, messages, **params):
+        """Send one chat completion request and return a RawResponse-like object"""
+    
+    async def create_async(self, model, messages, **params):
+        return self.create(model=model, messages=messages, **params)
+    
+    @contextlib.asynccontextmanager
+    async def session(self):
+        yield _BackendSession(self)
+    
+    def close(self):
+        pass
+
+class _BackendSession:
+    def __init__(self, backend):
+        self.backend = backend
+    
+    async def create(self, model, messages, **params):
+        return await self.backend.create_async(model=model, messages=messages, **params)
+
+class OpenAIBackend(LLMBackend):
+    """The OpenAI API (or any compatible server at Config.OPENAI_BASE_URL)"""
+    
+    name = "openai"
+    
+    def __init__(self, api_key=None, base_url=None):
+        self.api_key = api_key or Config.OPENAI_API_KEY
+        self.base_url = base_url or Config.OPENAI_BASE_URL
+        # Retries are left to the rate controller, which also adapts concurrency
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+    
+    def create(self, model, messages, **params):
+        return self.client.chat.completions.with_raw_response.create(model=model, messages=messages, **params)
+    
+    @contextlib.asynccontextmanager
+    async def session(self):
+        # AsyncOpenAI is bound to the event loop it first runs on
+        async with AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0) as client:
+            yield _OpenAISession(client)
+    
+    def close(self):
+        self.client.close()
+
+class _OpenAISession:
+    def __init__(self, client):
+        self.client = client
+    
+    async def create(self, model, messages, **params):
+        return await self.client.chat.completions.with_raw_response.create(model=model, messages=messages, **params)
+
+# ── Deterministic stub answers ──────────────────────────────────────────────
+
+REVIEW_RE = re.compile(r'Review \d+ \(ID: ([^)]+)\): "(.*)"')
+COMPACT_REVIEW_RE = re.compile(r'^\[(\d+)\] (.*)$', re.MULTILINE)
+TOPIC_ROW_RE = re.compile(r'^(\d+)\. (.+)$', re.MULTILINE)
+
+# Keyword → topic, enough to give the report some shape
+KEYWORD_TOPICS = [
+    (("deliver", "courier", "shipping"), "Delivery issue"),
+    (("late", "delay"), "Late delivery"),
+    (("crash", "freez", "hang"), "App crashes frequently"),
+    (("payment", "card", "upi", "charged"), "Payment issues"),
+    (("refund", "money back"), "Refund issues"),
+    (("search",), "Search not working"),
+    (("login", "password", "otp"), "Account login issues"),
+    (("prime",), "Prime membership issues"),
+    (("wrong item", "different product"), "Wrong item delivered"),
+    (("customer service", "customer care", "support"), "Customer service poor"),
+    (("quality", "fake", "damaged"), "Product quality poor"),
+    (("good", "great", "love", "nice", "excellent"), "App working well"),
+]
+
+def confidence_for(topic):
+    """Vague reviews come back less certain, so cascades have something to escalate"""
+    return 0.6 if topic == "General feedback" else 0.9
+
+def topic_for(text):
+    text = text.lower()
+    for keywords, topic in KEYWORD_TOPICS:
+        if any(keyword in text for keyword in keywords):
+            return topic
+    return "General feedback"
+
+def answer_for(prompt, structured=False):
+    """Build a plausible JSON answer for a topic-extraction or topic-merge prompt"""
+    compact_reviews = COMPACT_REVIEW_RE.findall(prompt)
+    if compact_reviews and "TOPICS:" in prompt:
+        table = {name: int(number) for number, name in TOPIC_ROW_RE.findall(prompt.split("REVIEWS:")[0])}
+        if structured:
+            entries = []
+            for number, text in compact_reviews:
+                topic = topic_for(text)
+                known = topic in table
+                entries.append({"r": int(number), "t": [table[topic]] if known else [],
+                                "n": [] if known else [topic], "c": confidence_for(topic)})
+            return {"a": entries}
+        return {"a": [
+            [int(number), [table.get(topic_for(text), topic_for(text))], confidence_for(topic_for(text))]
+            for number, text in compact_reviews
+        ]}
+    
+    reviews = REVIEW_RE.findall(prompt)
+    if reviews:
+        return {
+            "review_analysis": [
+                {"review_id": review_id, "identified_topics": [topic_for(text)], "confidence": confidence_for(topic_for(text))}
+                for review_id, text in reviews
+            ],
+            "new_canonical_topics": [],
+            "topic_mappings": {}
+        }
+    return {"groups": []}
+
+class StubBackend(LLMBackend):
+    """Deterministic local answers from keyword rules; no network, no API key
+    
+    The same prompt always gets the same answer, so whole pipeline runs are
+    reproducible. latency (seconds per call) lets throughput benchmarks
+    model a real endpoint.
+    """
+    
+    name = "stub"
+    
+    def __init__(self, latency=None):
+        self.latency = Config.LLM_STUB_LATENCY if latency is None else latency
+        self.calls = 0
+    
+    def _respond(self, model, messages, params, is_async):
+        self.calls += 1
+        prompt = "\n".join(message.get('content', '') for message in messages)
+        tools = params.get('tools') or []
+        structured = bool(tools) or (params.get('response_format') or {}).get('type') == 'json_schema'
+        content = json.dumps(self.answer(model, prompt, structured))
+        
+        prompt_tokens = estimate_tokens(messages)
+        completion_tokens = count_tokens(content)
+        usage = None
+        if not params.get('stream') or (params.get('stream_options') or {}).get('include_usage'):
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+        tool_name = tools[0]["function"]["name"] if tools else None
+        return build_response(model, content, tool_name, usage, params.get('stream', False), is_async)
+    
+    def answer(self, model, prompt, structured):
+        """The JSON answer for a prompt; override to script other behaviour"""
+        return answer_for(prompt, structured)
+    
+    def create(self, model, messages, **params):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(model, messages, params, is_async=False)
+    
+    async def create_async(self, model, messages, **params):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(model, messages, params, is_async=True)
+
+# ── Record / replay ─────────────────────────────────────────────────────────
+
+class ReplayMissError(LookupError):
+    """A replay-only backend was asked for a request that was never recorded"""
+
+class RecordReplayBackend(LLMBackend):
+    """Serve recorded answers from a JSONL file of request/response pairs
+    
+    mode="replay" only serves recordings and raises ReplayMissError for
+    anything else. mode="record" serves recordings too, but forwards misses
+    to `inner` (OpenAI by default) and appends the answer. Requests are
+    keyed like LLMResponseCache, without the stream flags, so an answer
+    recorded as a stream replays fine without one and vice versa.
+    """
+    
+    name = "replay"
+    
+    def __init__(self, path=None, inner=None, mode="replay"):
+        self.path = path or Config.LLM_RECORDINGS_PATH
+        self.mode = mode
+        self.inner = inner if inner is not None else (OpenAIBackend() if mode == "record" else None)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.recorded = 0
+        self.recordings = {}
+        
+        if os.path.exists(self.path):
+            for record in iter_jsonl(self.path):
+                self.recordings[record['key']] = record
+    
+    def _key(self, model, messages, params):
+        return LLMResponseCache.make_key(
+            model, messages, **{name: value for name, value in params.items() if name not in STREAM_PARAMS}
+        )
+    
+    def _replay(self, key, model, params, is_async):
+        record = self.recordings.get(key)
+        if record is None:
+            if self.mode != "record":
+                raise ReplayMissError(f"No recording for {model} request {key[:12]} in {self.path}")
+            return None
+        
+        self.hits += 1
+        usage = record.get('usage')
+        if params.get('stream') and not (params.get('stream_options') or {}).get('include_usage'):
+            usage = None
+        return build_response(model, record['content'], record.get('tool_name'), usage,
+                              params.get('stream', False), is_async)
+    
+    def _save(self, key, model, messages, params, content, tool_name, usage):
+        record = {
+            'key': key,
+            'model': model,
+            'messages': messages,
+            'params': {name: value for name, value in params.items() if name not in STREAM_PARAMS},
+            'content': content,
+            'tool_name': tool_name,
+            'usage': usage.model_dump() if hasattr(usage, 'model_dump') else usage,
+            'recorded_at': time.time()
+        }
+        with self.lock:
+            self.recordings[key] = record
+            append_jsonl(self.path, [record], "jsonl")
+            self.recorded += 1
+    
+    def _recorded_chunks(self, chunks, save):
+        """Pass stream chunks through, saving the assembled answer once the stream ends"""
+        parts, tool_name, usage = [], None, None
+        for chunk in chunks:
+            tool_name, usage = self._collect(chunk, parts, tool_name, usage)
+            yield chunk
+        save("".join(parts), tool_name, usage)
+    
+    async def _recorded_chunks_async(self, chunks, save):
+        parts, tool_name, usage = [], None, None
+        async for chunk in chunks:
+            tool_name, usage = self._collect(chunk, parts, tool_name, usage)
+            yield chunk
+        save("".join(parts), tool_name, usage)
+    
+    def _collect(self, chunk, parts, tool_name, usage):
+        usage = getattr(chunk, 'usage', None) or usage
+        if chunk.choices:
+            delta = chunk.choices[0].delta
+            if getattr(delta, 'tool_calls', None):
+                function = delta.tool_calls[0].function
+                tool_name = tool_name or function.name
+                parts.append(function.arguments or "")
+            elif delta.content:
+                parts.append(delta.content)
+        return tool_name, usage
+    
+    def _record(self, raw, key, model, messages, params, is_async):
+        def save(content, tool_name, usage):
+            self._save(key, model, messages, params, content, tool_name, usage)
+        
+        parsed = raw.parse()
+        if params.get('stream'):
+            recorder = self._recorded_chunks_async if is_async else self._recorded_chunks
+            return RawResponse(recorder(parsed, save), raw.headers)
+        
+        content, tool_name = answer_text(parsed)
+        save(content, tool_name, parsed.usage)
+        return RawResponse(parsed, raw.headers)
+    
+    def create(self, model, messages, **params):
+        key = self._key(model, messages, params)
+        response = self._replay(key, model, params, is_async=False)
+        if response is not None:
+            return response
+        raw = self.inner.create(model=model, messages=messages, **params)
+        return self._record(raw, key, model, messages, params, is_async=False)
+    
+    @contextlib.asynccontextmanager
+    async def session(self):
+        if self.inner is None:
+            yield _RecordingSession(self, None)
+            return
+        async with self.inner.session() as inner_session:
+            yield _RecordingSession(self, inner_session)
+    
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+class _RecordingSession:
+    def __init__(self, backend, inner_session):
+        self.backend = backend
+        self.inner_session = inner_session
+    
+    async def create(self, model, messages, **params):
+        key = self.backend._key(model, messages, params)
+        response = self.backend._replay(key, model, params, is_async=True)
+        if response is not None:
+            return response
+        raw = await self.inner_session.create(model=model, messages=messages, **params)
+        return self.backend._record(raw, key, model, messages, params, is_async=True)
+
+def create_backend(name=None):
+    """Backend named by Config.LLM_BACKEND: "openai", "record", "replay" or "stub" """
+    name = (name or Config.LLM_BACKEND).lower()
+    if name == "openai":
+        return OpenAIBackend()
+    if name in ("record", "replay"):
+        return RecordReplayBackend(mode=name)
+    if name == "stub":
+        return StubBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,233 @@
+# src/llm_cache.py - Persistent cache for LLM chat completion responses
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import Config
+from src import serializer
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+class LLMResponseCache:
+    """SQLite-backed cache of completion text keyed by model, parameters and prompt"""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key         TEXT PRIMARY KEY,
+        model       TEXT NOT NULL,
+        content     TEXT NOT NULL,
+        created_at  REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);
+    """
+    
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None, bypass=None):
+        self.path = path or Config.LLM_CACHE_PATH
+        self.ttl_seconds = Config.LLM_CACHE_TTL_DAYS * 86400 if ttl_seconds is None else ttl_seconds
+        self.max_entries = Config.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        # Bypass skips lookups but still stores fresh responses
+        self.bypass = Config.LLM_CACHE_BYPASS if bypass is None else bypass
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+    
+    @staticmethod
+    def make_key(model, messages, **params):
+        """Hash of model, sorted parameters and whitespace-normalized messages"""
+        normalized = [
+            {"role": message["role"], "content": WHITESPACE_RE.sub(" ", message["content"]).strip()}
+            for message in messages
+        ]
+        payload = {"model": model, "params": dict(sorted(params.items())), "messages": normalized}
+        return hashlib.blake2b(serializer.dumps_bytes(payload), digest_size=20).hexdigest()
+    
+    def get(self, model, messages, **params):
+        """Return cached completion text, or None on a miss (or when bypassed)"""
+        if self.bypass:
+            self.misses += 1
+            return None
+        
+        key = self.make_key(model, messages, **params)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        
+        self.hits += 1
+        return row[0]
+    
+    def put(self, model, messages, content, **params):
+        """Store completion text for this request"""
+        if not content:
+            return
+        
+        key = self.make_key(model, messages, **params)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now)
+            )
+            self.conn.commit()
+            self._writes += 1
+        
+        # Evicting on every write would scan the table each call
+        if self._writes % 100 == 1:
+            self.evict()
+    
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        removed = 0
+        with self.lock:
+            if self.ttl_seconds:
+                cursor = self.conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                )
+                removed += cursor.rowcount
+            
+            if self.max_entries:
+                cursor = self.conn.execute(
+                    """DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,)
+                )
+                removed += cursor.rowcount
+            
+            self.conn.commit()
+        return removed
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+    
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class ReviewAnalysisCache:
+    """Per-review LLM analyses keyed by reviewId, cleaned-content hash and prompt version"""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS analyses (
+        review_id    TEXT NOT NULL,
+        version      TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        analysis     TEXT NOT NULL,
+        created_at   REAL NOT NULL,
+        PRIMARY KEY (review_id, version)
+    );
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or Config.ANALYSIS_CACHE_PATH
+        self.hits = 0
+        self.misses = 0
+        
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+    
+    @staticmethod
+    def version_key(*parts):
+        """Short hash identifying the prompt, model and taxonomy an analysis came from"""
+        return hashlib.blake2b(serializer.dumps_bytes(list(parts)), digest_size=8).hexdigest()
+    
+    @staticmethod
+    def content_hash(review):
+        return hashlib.blake2b((review.get('cleaned_content') or '').encode('utf-8'), digest_size=16).hexdigest()
+    
+    def split(self, reviews, version):
+        """Return (cached_results, pending_reviews): only new or edited reviews are pending"""
+        reviews = list(reviews)
+        if not reviews:
+            return [], []
+        
+        stored = {}
+        ids = [review['reviewId'] for review in reviews]
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT review_id, content_hash, analysis FROM analyses "
+                    f"WHERE version = ? AND review_id IN ({','.join('?' * len(chunk))})",
+                    [version] + chunk
+                )
+                stored.update((review_id, (content_hash, analysis)) for review_id, content_hash, analysis in rows)
+        
+        cached_results, pending = [], []
+        for review in reviews:
+            entry = stored.get(review['reviewId'])
+            if entry is not None and entry[0] == self.content_hash(review):
+                analysis = serializer.loads(entry[1])
+                analysis['review_id'] = review['reviewId']
+                analysis['source'] = 'analysis_cache'
+                cached_results.append(analysis)
+            else:
+                pending.append(review)
+        
+        self.hits += len(cached_results)
+        self.misses += len(pending)
+        return cached_results, pending
+    
+    def store(self, analyses, reviews_by_id, version):
+        """Save LLM analyses for the reviews they belong to"""
+        now = time.time()
+        rows = []
+        for analysis in analyses:
+            review = reviews_by_id.get(analysis.get('review_id'))
+            if review is None or analysis.get('source') != 'llm':
+                continue
+            
+            kept = {key: analysis[key] for key in ('identified_topics', 'confidence') if key in analysis}
+            rows.append((review['reviewId'], version, self.content_hash(review), serializer.dumps(kept), now))
+        
+        if not rows:
+            return 0
+        
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO analyses (review_id, version, content_hash, analysis, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+        return len(rows)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,120 @@
+# src/near_duplicates.py - MinHash/LSH near-duplicate collapsing before LLM analysis
+import hashlib
+import random
+from config import Config
+
+# Mersenne prime for the universal hash family used by the MinHash permutations
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+class NearDuplicateCollapser:
+    """Cluster near-identical cleaned review texts so each cluster costs one LLM slot"""
+    
+    def __init__(self, threshold=None, num_perm=None, bands=None, shingle_size=3, seed=1):
+        config = Config()
+        self.threshold = threshold or config.NEAR_DUP_THRESHOLD
+        self.num_perm = num_perm or config.NEAR_DUP_NUM_PERM
+        self.bands = bands or config.NEAR_DUP_BANDS
+        self.rows = self.num_perm // self.bands
+        self.shingle_size = shingle_size
+        
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1))
+            for _ in range(self.num_perm)
+        ]
+    
+    def shingles(self, text):
+        """Word n-gram shingles; short texts fall back to fewer words per shingle"""
+        words = text.split()
+        if not words:
+            return set()
+        
+        size = min(self.shingle_size, len(words))
+        return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    
+    def signature(self, shingles):
+        """MinHash signature of a shingle set"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+            for shingle in shingles
+        ]
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        )
+    
+    def cluster(self, texts):
+        """Group text indices into near-duplicate clusters, in first-seen order"""
+        parent = list(range(len(texts)))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        def union(i, j):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                # Keep the earliest review as the root so representatives are stable
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        
+        shingle_sets = [self.shingles(text) for text in texts]
+        exact = {}
+        buckets = {}
+        
+        for i, (text, shingles) in enumerate(zip(texts, shingle_sets)):
+            # Exact duplicates need no hashing at all
+            if text in exact:
+                union(exact[text], i)
+                continue
+            exact[text] = i
+            if not shingles:
+                continue
+            
+            signature = self.signature(shingles)
+            for band in range(self.bands):
+                key = (band, signature[band * self.rows:(band + 1) * self.rows])
+                for j in buckets.setdefault(key, []):
+                    if find(i) != find(j) and self.jaccard(shingles, shingle_sets[j]) >= self.threshold:
+                        union(i, j)
+                buckets[key].append(i)
+        
+        clusters = {}
+        for i in range(len(texts)):
+            clusters.setdefault(find(i), []).append(i)
+        return list(clusters.values())
+    
+    def jaccard(self, a, b):
+        if not a and not b:
+            return 1.0
+        return len(a & b) / len(a | b)
+    
+    def collapse(self, reviews):
+        """Return (representatives, members) where members maps a representative
+        reviewId to the other reviews in its cluster"""
+        clusters = self.cluster([review['cleaned_content'] for review in reviews])
+        
+        representatives = []
+        members = {}
+        for cluster in clusters:
+            representative = reviews[cluster[0]]
+            representatives.append(representative)
+            if len(cluster) > 1:
+                members[representative['reviewId']] = [reviews[i] for i in cluster[1:]]
+        
+        return representatives, members
+    
+    def fan_out(self, results, members):
+        """Copy each representative's analysis to every member of its cluster"""
+        expanded = []
+        for analysis in results:
+            expanded.append(analysis)
+            for member in members.get(analysis.get('review_id'), []):
+                copied = dict(analysis)
+                copied['identified_topics'] = list(analysis.get('identified_topics', []))
+                copied['review_id'] = member['reviewId']
+                copied['duplicate_of'] = analysis['review_id']
+                expanded.append(copied)
+        return expanded
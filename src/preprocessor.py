@@ -1,74 +1,369 @@
 # src/preprocessor.py - Enhanced version
 import re
-import json
-from datetime import datetime
+import os
+import hashlib
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from config import Config
+from src import serializer
+from src.raw_io import find_raw_file, iter_raw_file
+
+# Patterns are compiled once at import instead of looked up on every call
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+# Same language as the original http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\$$\$$,]|(?:%..))+
+# pattern: every alternative is a single character from this class (and %XX is
+# three of them), so one character class avoids per-character alternation.
+URL_RE = re.compile(r'http[s]?://[!$-_a-z]+')
+SPECIAL_CHARS_RE = re.compile(r'[^\w\s.,!?-]')
+
+# For pure-ASCII text, deleting these characters is what SPECIAL_CHARS_RE does
+ASCII_SPECIAL_CHARS = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128))
+    if not (c.isalnum() or c == '_' or c.isspace() or c in '.,!?-')
+))
+
+def _clean_one(text):
+    """clean_text pipeline with precompiled patterns and cheap pre-checks
+    
+    The whitespace-collapse step is folded into the split/join below, which
+    already splits on exactly the characters matched by \\s.
+    """
+    if not text:
+        return ""
+    
+    # Remove HTML tags
+    if '<' in text:
+        text = HTML_TAG_RE.sub('', text)
+    
+    # Remove URLs
+    if 'http' in text:
+        text = URL_RE.sub('', text)
+    
+    # Remove special characters but keep punctuation
+    if text.isascii():
+        text = text.translate(ASCII_SPECIAL_CHARS)
+    else:
+        text = SPECIAL_CHARS_RE.sub('', text)
+    
+    # Remove very short words (likely noise) and excessive whitespace
+    text = ' '.join([word for word in text.split() if len(word) > 1])
+    
+    # Basic normalization
+    text = text.strip().lower()
+    
+    # Remove if text is too short to be meaningful
+    if len(text) < 10:
+        return ""
+    
+    return text
+
+# Bump whenever _clean_one changes output so persisted cleaned text is invalidated
+CLEAN_TEXT_VERSION = 1
+
+class CleanTextCache:
+    """SQLite-backed map from a raw text's content hash to its cleaned text
+    
+    Lookups hit the database one key at a time; newly cleaned texts and
+    recency updates are buffered and written in one transaction by save(),
+    which then evicts the least recently used rows beyond max_entries.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS clean_texts (
+        key         TEXT PRIMARY KEY,
+        version     INTEGER NOT NULL,
+        cleaned     TEXT NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_clean_texts_accessed ON clean_texts (accessed_at);
+    """
+    
+    # Flush early so a long range never buffers more than this many new texts
+    FLUSH_EVERY = 10000
+    
+    def __init__(self, path, max_entries=None):
+        self.path = path
+        self.max_entries = Config.CLEAN_TEXT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.pending = {}
+        self.touched = {}
+        self.hits = 0
+        self.misses = 0
+        
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+    
+    def key(self, text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def save(self):
+        """Write buffered entries and access times, then evict beyond max_entries"""
+        if not self.pending and not self.touched:
+            return
+        
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO clean_texts (key, version, cleaned, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, CLEAN_TEXT_VERSION, cleaned, accessed_at) for key, (cleaned, accessed_at) in self.pending.items()]
+            )
+            self.conn.executemany(
+                "UPDATE clean_texts SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self.touched.items()]
+            )
+        self.pending.clear()
+        self.touched.clear()
+        self.evict()
+    
+    def evict(self):
+        """Drop rows from older cleaning versions, then the least recently used beyond max_entries"""
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM clean_texts WHERE version != ?", (CLEAN_TEXT_VERSION,))
+            removed = cursor.rowcount
+            if self.max_entries:
+                cursor = self.conn.execute(
+                    """DELETE FROM clean_texts WHERE key IN (
+                        SELECT key FROM clean_texts ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,)
+                )
+                removed += cursor.rowcount
+        return removed
+    
+    def lookup(self, text):
+        """Return the remembered cleaned text, or None on a miss"""
+        key = self.key(text)
+        if key in self.pending:
+            cleaned = self.pending[key][0]
+        else:
+            row = self.conn.execute(
+                "SELECT cleaned FROM clean_texts WHERE key = ? AND version = ?", (key, CLEAN_TEXT_VERSION)
+            ).fetchone()
+            if row is None:
+                return None
+            cleaned = row[0]
+            self.touched[key] = time.time()
+        self.hits += 1
+        return cleaned
+    
+    def add(self, text, cleaned):
+        """Remember a cleaned text until the next save()"""
+        self.misses += 1
+        self.pending[self.key(text)] = (cleaned, time.time())
+        if len(self.pending) >= self.FLUSH_EVERY:
+            self.save()
+    
+    def close(self):
+        self.save()
+        self.conn.close()
+    
+    def clean(self, text):
+        """Return the cleaned text, computing and remembering it on a miss"""
+        if not text:
+            return ""
+        
+        cleaned = self.lookup(text)
+        if cleaned is None:
+            cleaned = _clean_one(text)
+            self.add(text, cleaned)
+        return cleaned
 
 class ReviewPreprocessor:
-    def __init__(self):
-        pass
+    def __init__(self, store=None, app_id=None, raw_dir="data/raw_reviews", cache_path=None):
+        # Optional ReviewStore to read from instead of data/raw_reviews/*.json
+        self.store = store
+        self.app_id = app_id
+        self.raw_dir = raw_dir
+        # Optional cleaned-text cache that persists across runs
+        self.cache = CleanTextCache(cache_path) if cache_path else None
     
     def clean_text(self, text):
         """Clean and normalize review text for LLM processing"""
-        if not text:
-            return ""
+        if self.cache is not None:
+            return self.cache.clean(text)
+        return _clean_one(text)
+    
+    def save_cache(self):
+        """Persist newly cleaned texts, if a cache is configured"""
+        if self.cache is not None:
+            self.cache.save()
+    
+    def clean_texts(self, texts):
+        """Clean a batch of texts (list or pandas Series) in one pass
+        
+        Output is identical to calling clean_text on each element. Repeated
+        texts, common in spammy review feeds, are only cleaned once. A pandas
+        Series comes back as a Series with the same index.
+        """
+        cache = {}
+        cleaned = []
+        for text in texts:
+            result = cache.get(text)
+            if result is None:
+                result = self.clean_text(text)
+                if isinstance(text, str):
+                    cache[text] = result
+            cleaned.append(result)
+        
+        if hasattr(texts, 'index') and hasattr(texts, 'to_numpy'):
+            return type(texts)(cleaned, index=texts.index, name=texts.name, dtype=object)
+        return cleaned
+    
+    def preprocess_review(self, review):
+        """Clean one raw review record, or return None if nothing usable is left"""
+        cleaned_content = self.clean_text(review['content'])
         
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
+        # Skip reviews with empty content after cleaning
+        if not cleaned_content:
+            return None
         
-        # Remove URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\$$\$$,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+        return self._processed_record(review, cleaned_content)
+    
+    def _processed_record(self, review, cleaned_content):
+        return {
+            'date': review['date'],
+            'original_content': review['content'],
+            'cleaned_content': cleaned_content,
+            'score': review['score'],
+            'reviewId': review['reviewId']
+        }
+    
+    def preprocess_reviews(self, raw_reviews):
+        """Clean raw review records, dropping ones with no usable content"""
+        raw_reviews = list(raw_reviews)
+        cleaned_texts = self.clean_texts([review['content'] for review in raw_reviews])
         
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        processed_reviews = []
+        for review, cleaned_content in zip(raw_reviews, cleaned_texts):
+            # Skip reviews with empty content after cleaning
+            if not cleaned_content:
+                continue
+            
+            processed_reviews.append(self._processed_record(review, cleaned_content))
         
-        # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s.,!?-]', '', text)
+        return processed_reviews
+    
+    def raw_day_files(self, date_str):
+        """(path, fmt) of every raw file holding reviews of app_id for a date
         
-        # Remove very short words (likely noise)
-        words = text.split()
-        words = [word for word in words if len(word) > 1]
-        text = ' '.join(words)
+        sweep.py and app.py write data/raw_reviews/<app_id>/<lang>_<country>/<date>
+        partitions, one per locale, and all of them are read. The flat
+        data/raw_reviews/<date> files carry no app id: they are read for
+        Config.TARGET_APP_ID (or when no app_id is set), and for any other
+        app only on dates it has no partition for.
+        """
+        files = []
+        app_dir = f"{self.raw_dir}/{self.app_id}" if self.app_id else None
+        if app_dir and os.path.isdir(app_dir):
+            for locale in sorted(os.listdir(app_dir)):
+                files.append(find_raw_file(f"{app_dir}/{locale}/{date_str}"))
+        files = [(path, fmt) for path, fmt in files if path is not None]
         
-        # Basic normalization
-        text = text.strip().lower()
+        if self.app_id is None or self.app_id == Config.TARGET_APP_ID or not files:
+            flat_file = find_raw_file(f"{self.raw_dir}/{date_str}")
+            if flat_file[0] is not None:
+                files.insert(0, flat_file)
         
-        # Remove if text is too short to be meaningful
-        if len(text) < 10:
-            return ""
+        return files
+    
+    def iter_raw_reviews(self, date_str):
+        """Yield a day's raw reviews from the store or the newest raw file tier"""
+        if self.store is not None:
+            yield from self.store.iter_reviews(self.app_id, date_str, date_str)
+            return
         
-        return text
+        files = self.raw_day_files(date_str)
+        if not files:
+            raise FileNotFoundError(f"No raw review file for {date_str}")
+        if len(files) == 1:
+            yield from iter_raw_file(*files[0])
+            return
+        
+        # The same review is often listed under several locales
+        seen_ids = set()
+        for filename, fmt in files:
+            for review in iter_raw_file(filename, fmt):
+                if review['reviewId'] not in seen_ids:
+                    seen_ids.add(review['reviewId'])
+                    yield review
+    
+    def iter_daily_reviews(self, date_str):
+        """Stream preprocessed reviews for a day without loading the file whole"""
+        for review in self.iter_raw_reviews(date_str):
+            processed_review = self.preprocess_review(review)
+            if processed_review is not None:
+                yield processed_review
     
     def load_daily_reviews(self, date_str):
         """Load and preprocess daily reviews"""
-        filename = f"data/raw_reviews/{date_str}.json"
+        raw_count = 0
+        processed_reviews = []
         
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                raw_reviews = json.load(f)
-            
-            processed_reviews = []
-            for review in raw_reviews:
-                cleaned_content = self.clean_text(review['content'])
-                
-                # Skip reviews with empty content after cleaning
-                if not cleaned_content:
-                    continue
-                
-                processed_review = {
-                    'date': review['date'],
-                    'original_content': review['content'],
-                    'cleaned_content': cleaned_content,
-                    'score': review['score'],
-                    'reviewId': review['reviewId']
-                }
-                processed_reviews.append(processed_review)
-            
-            print(f"📊 Preprocessed {len(processed_reviews)} valid reviews from {len(raw_reviews)} total")
-            return processed_reviews
+            for review in self.iter_raw_reviews(date_str):
+                raw_count += 1
+                processed_review = self.preprocess_review(review)
+                if processed_review is not None:
+                    processed_reviews.append(processed_review)
             
         except FileNotFoundError:
             print(f"No data file found for {date_str}")
             return []
-        except json.JSONDecodeError as e:
+        except serializer.DecodeError as e:
             print(f"Error parsing JSON file for {date_str}: {e}")
             return []
+        
+        if raw_count == 0:
+            print(f"No reviews found for {date_str}")
+            return []
+        
+        self.save_cache()
+        print(f"📊 Preprocessed {len(processed_reviews)} valid reviews from {raw_count} total")
+        return processed_reviews
+    
+    def iter_range_reviews(self, start_date, end_date):
+        """Stream preprocessed reviews for a date range in date order
+        
+        Holds at most one review in memory at a time, so long reprocessing
+        runs stay flat. With a store this is one indexed range query.
+        """
+        for review in self._iter_range_raw(start_date, end_date):
+            processed_review = self.preprocess_review(review)
+            if processed_review is not None:
+                yield processed_review
+    
+    def _iter_range_raw(self, start_date, end_date):
+        """Yield a range's raw reviews: one range query with a store, else day file by day file"""
+        if self.store is not None:
+            yield from self.store.iter_reviews(self.app_id, start_date, end_date)
+            return
+        
+        for date_str in self._date_range(start_date, end_date):
+            try:
+                yield from self.iter_raw_reviews(date_str)
+            except FileNotFoundError:
+                continue
+            except serializer.DecodeError as e:
+                print(f"Error parsing JSON file for {date_str}: {e}")
+    
+    def load_range_reviews(self, start_date, end_date):
+        """Load and preprocess a date range, returning {date: reviews}"""
+        range_reviews = {date_str: [] for date_str in self._date_range(start_date, end_date)}
+        for review in self.iter_range_reviews(start_date, end_date):
+            range_reviews.setdefault(review['date'], []).append(review)
+        
+        self.save_cache()
+        valid_count = sum(len(r) for r in range_reviews.values())
+        print(f"📊 Preprocessed {valid_count} valid reviews ({start_date} to {end_date})")
+        return range_reviews
+    
+    def _date_range(self, start_date, end_date):
+        current = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        while current <= end:
+            yield current.strftime("%Y-%m-%d")
+            current += timedelta(days=1)
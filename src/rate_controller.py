@@ -0,0 +1,253 @@
+# src/rate_controller.py - Adaptive (AIMD) concurrency control for LLM calls
+import asyncio
+import re
+import threading
+import time
+import openai
+from config import Config
+from src.token_budget import count_tokens
+
+DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+def parse_duration(value):
+    """Parse OpenAI reset durations like '20ms', '1.5s' or '6m0s' into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = DURATION_RE.findall(value)
+        return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+def _header_number(headers, name):
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveConcurrencyController:
+    """Limits in-flight LLM requests and tokens, adapting to rate-limit feedback
+    
+    The in-flight limit grows by 1/limit per successful call and halves on a
+    429 or when the x-ratelimit-remaining-* headers run low (AIMD). Token
+    reservations are checked against the remaining-tokens budget until its
+    reset time. Works from threads and from asyncio tasks.
+    """
+    
+    def __init__(self, initial=None, min_limit=None, max_limit=None, max_retries=None):
+        self.min_limit = min_limit or Config.LLM_MIN_CONCURRENCY
+        self.max_limit = max_limit or Config.LLM_MAX_CONCURRENCY
+        self.limit = float(min(max(initial or Config.LLM_INITIAL_CONCURRENCY, self.min_limit), self.max_limit))
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.low_watermark = Config.LLM_RATE_LIMIT_LOW_WATERMARK
+        
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.reserved_tokens = 0
+        self.blocked_until = 0.0
+        
+        # Latest view of the server-side budget (None until a response reports it)
+        self.limit_requests = None
+        self.remaining_requests = None
+        self.limit_tokens = None
+        self.remaining_tokens = None
+        self.tokens_reset_at = 0.0
+        
+        self.successes = 0
+        self.throttled = 0
+        self.retries = 0
+        self.errors = 0
+        self.tokens_used = 0
+        self.started = time.monotonic()
+    
+    # ── admission ────────────────────────────────────────────────────────────
+    
+    def _try_acquire(self, tokens):
+        """Take a slot if allowed; otherwise return how long to wait"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            
+            if self.remaining_tokens is not None and now >= self.tokens_reset_at:
+                self.remaining_tokens = None
+            
+            if self.in_flight >= int(self.limit):
+                return 0.05
+            
+            if (self.remaining_tokens is not None and self.in_flight > 0
+                    and self.reserved_tokens + tokens > self.remaining_tokens):
+                return min(max(self.tokens_reset_at - now, 0.05), 1.0)
+            
+            self.in_flight += 1
+            self.reserved_tokens += tokens
+            return None
+    
+    def acquire(self, tokens=0):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait is None:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self, tokens=0):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait is None:
+                return
+            await asyncio.sleep(wait)
+    
+    # ── feedback ─────────────────────────────────────────────────────────────
+    
+    def _release(self, tokens):
+        self.in_flight -= 1
+        self.reserved_tokens -= tokens
+    
+    def on_success(self, headers, tokens=0, used_tokens=None):
+        """Release a slot and apply additive increase, or back off if the budget runs low"""
+        headers = headers or {}
+        with self.lock:
+            self._release(tokens)
+            self.successes += 1
+            self.tokens_used += used_tokens if used_tokens is not None else tokens
+            
+            self.limit_requests = _header_number(headers, 'x-ratelimit-limit-requests') or self.limit_requests
+            self.limit_tokens = _header_number(headers, 'x-ratelimit-limit-tokens') or self.limit_tokens
+            remaining_requests = _header_number(headers, 'x-ratelimit-remaining-requests')
+            remaining_tokens = _header_number(headers, 'x-ratelimit-remaining-tokens')
+            
+            if remaining_requests is not None:
+                self.remaining_requests = remaining_requests
+            if remaining_tokens is not None:
+                self.remaining_tokens = remaining_tokens
+                reset = parse_duration(headers.get('x-ratelimit-reset-tokens'))
+                self.tokens_reset_at = time.monotonic() + (reset if reset is not None else 60.0)
+            
+            running_low = (
+                (remaining_requests is not None and self.limit_requests
+                 and remaining_requests < self.limit_requests * self.low_watermark)
+                or (remaining_tokens is not None and self.limit_tokens
+                    and remaining_tokens < self.limit_tokens * self.low_watermark)
+            )
+            if running_low:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+    
+    def on_throttle(self, headers, tokens=0, attempt=0):
+        """Release a slot after a 429/5xx, halve the limit and pause all callers"""
+        headers = headers or {}
+        with self.lock:
+            self._release(tokens)
+            self.throttled += 1
+            self.limit = max(self.min_limit, self.limit / 2)
+            
+            retry_after = _header_number(headers, 'retry-after-ms')
+            retry_after = retry_after / 1000 if retry_after is not None else _header_number(headers, 'retry-after')
+            if retry_after is None:
+                retry_after = parse_duration(headers.get('x-ratelimit-reset-requests')) or min(2 ** attempt, 30)
+            
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+    
+    def on_error(self, tokens=0):
+        """Release a slot after a failure that is not a throttle"""
+        with self.lock:
+            self._release(tokens)
+            self.errors += 1
+    
+    # ── call wrappers ────────────────────────────────────────────────────────
+    
+    def call(self, create, tokens=0, consume=None):
+        """Run create() (a with_raw_response call) under the controller, retrying throttles
+        
+        consume(response), if given, runs while the slot is still held, so a
+        streamed answer counts as in flight until its last chunk arrives.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            try:
+                raw = create()
+            except RETRYABLE_ERRORS as e:
+                self.on_throttle(getattr(getattr(e, 'response', None), 'headers', None), tokens, attempt)
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                continue
+            except Exception:
+                self.on_error(tokens)
+                raise
+            
+            try:
+                response = raw.parse()
+                if consume is not None:
+                    response = consume(response)
+            except Exception:
+                # The request went through, but the slot must still be given back
+                self.on_error(tokens)
+                raise
+            self.on_success(raw.headers, tokens, getattr(getattr(response, 'usage', None), 'total_tokens', None))
+            return response
+    
+    async def call_async(self, create, tokens=0, consume=None):
+        """Async variant of call(); create() and consume() return awaitables"""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(tokens)
+            try:
+                raw = await create()
+            except RETRYABLE_ERRORS as e:
+                self.on_throttle(getattr(getattr(e, 'response', None), 'headers', None), tokens, attempt)
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                continue
+            except Exception:
+                self.on_error(tokens)
+                raise
+            
+            try:
+                response = raw.parse()
+                if consume is not None:
+                    response = await consume(response)
+            except Exception:
+                # The request went through, but the slot must still be given back
+                self.on_error(tokens)
+                raise
+            self.on_success(raw.headers, tokens, getattr(getattr(response, 'usage', None), 'total_tokens', None))
+            return response
+    
+    def metrics(self):
+        """Current limits and counters"""
+        with self.lock:
+            minutes = max((time.monotonic() - self.started) / 60, 1e-9)
+            return {
+                'concurrency_limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'remaining_requests': self.remaining_requests,
+                'remaining_tokens': self.remaining_tokens,
+                'limit_requests': self.limit_requests,
+                'limit_tokens': self.limit_tokens,
+                'tokens_per_minute': round(self.tokens_used / minutes),
+                'successes': self.successes,
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'errors': self.errors
+            }
+
+_shared_controller = None
+_shared_lock = threading.Lock()
+
+def shared_controller():
+    """Process-wide controller so the analyzer and deduplicator share one budget"""
+    global _shared_controller
+    with _shared_lock:
+        if _shared_controller is None:
+            _shared_controller = AdaptiveConcurrencyController()
+        return _shared_controller
+
+def estimate_tokens(messages, max_tokens=0):
+    """Prompt + completion tokens a request may be charged for"""
+    return sum(count_tokens(message['content']) + 4 for message in messages) + max_tokens
@@ -0,0 +1,123 @@
+# src/raw_io.py - Raw review file formats: pretty JSON and append-only JSONL tiers
+import gzip
+import io
+import os
+from src import serializer
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, only needed for jsonl.zst
+    zstandard = None
+
+RAW_EXTENSIONS = {
+    "json": ".json",
+    "jsonl": ".jsonl",
+    "jsonl.gz": ".jsonl.gz",
+    "jsonl.zst": ".jsonl.zst"
+}
+
+REVIEW_IDS_SUFFIX = ".ids"
+
+# Newer, append-only tiers win when several formats exist for the same day
+READ_ORDER = ["jsonl.zst", "jsonl.gz", "jsonl", "json"]
+
+def raw_path(base_path, fmt):
+    """Raw file path for a base path (no extension) in the given format"""
+    if fmt not in RAW_EXTENSIONS:
+        raise ValueError(f"Unknown raw format: {fmt}")
+    return base_path + RAW_EXTENSIONS[fmt]
+
+def find_raw_file(base_path):
+    """Return (path, fmt) of the existing raw file for a base path, or (None, None)"""
+    for fmt in READ_ORDER:
+        path = raw_path(base_path, fmt)
+        if os.path.exists(path):
+            return path, fmt
+    return None, None
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError("jsonl.zst raw format requires the 'zstandard' package")
+
+def append_jsonl(path, records, fmt):
+    """Append records as newline-delimited JSON, compressed per format
+    
+    gzip members and zstd frames can be concatenated, so each append adds a
+    new member/frame and never rewrites what is already on disk.
+    """
+    if not records:
+        return 0
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = b"".join(serializer.dumps_bytes(record) + b"\n" for record in records)
+    
+    if fmt == "jsonl.gz":
+        with gzip.open(path, "ab") as f:
+            f.write(payload)
+    elif fmt == "jsonl.zst":
+        _require_zstandard()
+        with open(path, "ab") as raw:
+            raw.write(zstandard.ZstdCompressor().compress(payload))
+    else:
+        with open(path, "ab") as f:
+            f.write(payload)
+    
+    return len(records)
+
+def _open_binary(path, fmt):
+    if fmt == "jsonl.gz":
+        return gzip.open(path, "rb")
+    if fmt == "jsonl.zst":
+        _require_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader)
+    return open(path, "rb")
+
+def iter_raw_file(path, fmt):
+    """Yield review records from a raw file without loading JSONL tiers whole"""
+    if fmt == "json":
+        with open(path, "rb") as f:
+            yield from serializer.decode_reviews(f.read())
+        return
+    
+    yield from iter_jsonl(path, fmt, decode=serializer.decode_review)
+
+def review_ids_path(path):
+    """Sidecar index (JSON body) of the reviewIds in a raw JSONL file
+    
+    Not named *.json so the raw-file globs never mistake it for a day file.
+    """
+    return path + REVIEW_IDS_SUFFIX
+
+def save_review_ids(path, ids):
+    """Write the sidecar index, stamped with the data file's current size"""
+    serializer.dump_file({'size': os.path.getsize(path), 'ids': sorted(ids)}, review_ids_path(path))
+
+def load_review_ids(path, fmt):
+    """reviewIds stored in a raw JSONL file, from its sidecar when that is current
+    
+    The sidecar records the size of the file it indexes, so an append it
+    missed (or a crash between the two writes) is noticed and the index is
+    rebuilt from the file once instead of on every append.
+    """
+    if not os.path.exists(path):
+        return set()
+    
+    try:
+        index = serializer.load_file(review_ids_path(path))
+        if index.get('size') == os.path.getsize(path):
+            return set(index['ids'])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    
+    ids = {review['reviewId'] for review in iter_raw_file(path, fmt)}
+    save_review_ids(path, ids)
+    return ids
+
+def iter_jsonl(path, fmt="jsonl", decode=serializer.loads):
+    """Yield one decoded record per line of a (possibly compressed) JSONL file"""
+    with _open_binary(path, fmt) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield decode(line)
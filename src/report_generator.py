@@ -1,24 +1,44 @@
 # src/report_generator.py - Fix the import
+import asyncio
+import time
 import pandas as pd
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
 import os
 
 class TrendReportGenerator:
-    def __init__(self, batch_size=10):
+    def __init__(self, batch_size=10, store=None, app_id=None, progress_callback=None, backend=None):
         from config import Config
         self.batch_size = batch_size or Config.BATCH_SIZE
+        # Optional ReviewStore to stream reviews from instead of JSON files
+        self.store = store
+        self.app_id = app_id or Config.TARGET_APP_ID
         self.topic_frequency = defaultdict(lambda: defaultdict(int))
+        # progress_callback(done, total, live_topic_counts) runs as each review is analyzed
+        self.progress_callback = progress_callback
+        # Optional LLMBackend shared by analysis and deduplication (default: Config.LLM_BACKEND)
+        self.backend = backend
+        self.live_topic_counts = Counter()
+        # Raw (pre-taxonomy) topic → date → count, kept current from the analyzer's result stream
+        self.raw_topic_frequency = defaultdict(lambda: defaultdict(int))
+        self.first_result_seconds = None
 
     def aggregate_topic_data_range(self, start_date: str, end_date: str):
         """Complete pipeline: preprocessing → topic analysis → deduplication"""
         from src.preprocessor import ReviewPreprocessor
         from src.topic_analyzer import AgenticTopicAnalyzer
         from src.deduplicator import OptimizedTopicDeduplicator  # ✅ FIXED IMPORT
+        from src.llm_backend import RecordReplayBackend, create_backend
+        from config import Config
         
-        preprocessor = ReviewPreprocessor()
-        analyzer = AgenticTopicAnalyzer()
-        deduplicator = OptimizedTopicDeduplicator()  # ✅ FIXED CLASS NAME
+        preprocessor = ReviewPreprocessor(
+            store=self.store,
+            app_id=self.app_id,
+            cache_path=Config.CLEAN_TEXT_CACHE_PATH if Config.USE_CLEAN_TEXT_CACHE else None
+        )
+        backend = self.backend or create_backend()
+        analyzer = AgenticTopicAnalyzer(backend=backend)
+        deduplicator = OptimizedTopicDeduplicator(backend=backend)  # ✅ FIXED CLASS NAME
         
         all_topics = set()
         daily_results = {}
@@ -30,35 +50,87 @@ class TrendReportGenerator:
         
         print(f"📅 Processing {total_days} days of data...")
         
-        # Step 1: Process each day with AI analysis
-        current = start_obj
-        day_count = 0
+        reviews_by_date = preprocessor.load_range_reviews(start_date, end_date)
         
-        while current <= end_obj:
-            date_str = current.strftime("%Y-%m-%d")
-            day_count += 1
-            
-            print(f"🔄 Processing {date_str} ({day_count}/{total_days})...")
-            
-            # STEP 1: Load and preprocess reviews
-            processed_reviews = preprocessor.load_daily_reviews(date_str)
-            if not processed_reviews:
-                print(f"⚠️ No reviews found for {date_str}")
-                current += timedelta(days=1)
-                continue
-            
-            print(f"📊 Preprocessed {len(processed_reviews)} reviews")
+        # Hand each review analysis on as soon as it is known (streamed, cached or local)
+        total_reviews = sum(len(reviews) for reviews in reviews_by_date.values())
+        analyzed_ids = set()
+        self.raw_topic_frequency.clear()
+        self.live_topic_counts = Counter()
+        started = time.perf_counter()
+        
+        def on_result(date_str, analysis, previous_topics):
+            # Local and cached results carry a source tag; LLM answers get theirs later
+            if self.first_result_seconds is None and 'source' not in analysis:
+                self.first_result_seconds = time.perf_counter() - started
             
-            # STEP 2: AI topic analysis
-            daily_analysis = analyzer.process_daily_reviews(date_str, batch_size=self.batch_size)
-            daily_results[date_str] = daily_analysis
+            # A re-emitted review replaces its earlier (preview) topics
+            for topic in previous_topics or []:
+                self.raw_topic_frequency[topic][date_str] -= 1
+                self.live_topic_counts[topic] -= 1
+            for topic in analysis.get('identified_topics', []):
+                self.raw_topic_frequency[topic][date_str] += 1
+                self.live_topic_counts[topic] += 1
+            self.live_topic_counts = +self.live_topic_counts
             
-            # Collect all topics for deduplication
-            for analysis in daily_analysis:
-                all_topics.update(analysis.get('identified_topics', []))
+            analyzed_ids.add(analysis.get('review_id'))
+            if self.progress_callback:
+                self.progress_callback(len(analyzed_ids), total_reviews, self.live_topic_counts)
+        
+        analyzer.on_result = on_result
+        
+        # Step 1: Process each day with AI analysis
+        if Config.LLM_ASYNC_ENABLED:
+            # Batches from every day share one bounded pool of in-flight requests
+            day_reviews = {
+                date_str: reviews for date_str, reviews in sorted(reviews_by_date.items()) if reviews
+            }
+            print(f"📊 Preprocessed {sum(len(r) for r in day_reviews.values())} reviews across {len(day_reviews)} days")
+            daily_results = asyncio.run(
+                analyzer.process_range_async(day_reviews, batch_size=self.batch_size)
+            )
+            for daily_analysis in daily_results.values():
+                for analysis in daily_analysis:
+                    all_topics.update(analysis.get('identified_topics', []))
+            print(f"✅ Analyzed {sum(len(r) for r in daily_results.values())} reviews, found {len(all_topics)} unique topics")
+        else:
+            current = start_obj
+            day_count = 0
             
-            print(f"✅ Analyzed {len(daily_analysis)} reviews, found {len(all_topics)} unique topics so far")
-            current += timedelta(days=1)
+            while current <= end_obj:
+                date_str = current.strftime("%Y-%m-%d")
+                day_count += 1
+                
+                print(f"🔄 Processing {date_str} ({day_count}/{total_days})...")
+                
+                # STEP 1: Load and preprocess reviews
+                processed_reviews = reviews_by_date.get(date_str, [])
+                if not processed_reviews:
+                    print(f"⚠️ No reviews found for {date_str}")
+                    current += timedelta(days=1)
+                    continue
+                
+                print(f"📊 Preprocessed {len(processed_reviews)} reviews")
+                
+                # STEP 2: AI topic analysis
+                daily_analysis = analyzer.process_daily_reviews(date_str, batch_size=self.batch_size, reviews=processed_reviews)
+                daily_results[date_str] = daily_analysis
+                
+                # Collect all topics for deduplication
+                for analysis in daily_analysis:
+                    all_topics.update(analysis.get('identified_topics', []))
+                
+                print(f"✅ Analyzed {len(daily_analysis)} reviews, found {len(all_topics)} unique topics so far")
+                current += timedelta(days=1)
+        
+        if self.first_result_seconds is not None:
+            print(f"⏱️ First LLM result after {self.first_result_seconds:.2f}s, "
+                  f"all {len(analyzed_ids)} after {time.perf_counter() - started:.2f}s")
+        
+        if analyzer.triage_stats:
+            triaged = sum(stats['local'] for stats in analyzer.triage_stats.values())
+            total = sum(stats['reviews'] for stats in analyzer.triage_stats.values())
+            print(f"⚡ Triage handled {triaged}/{total} reviews locally ({triaged / max(total, 1):.0%})")
         
         if not all_topics:
             print("❌ No topics found across all dates!")
@@ -69,13 +141,52 @@ class TrendReportGenerator:
         topic_taxonomy = deduplicator.build_topic_taxonomy(all_topics)
         print(f"📋 Created taxonomy with {len(topic_taxonomy)} mappings")
         
+        if analyzer.analysis_cache_stats:
+            cached = sum(stats['cached'] for stats in analyzer.analysis_cache_stats.values())
+            pending = sum(stats['pending'] for stats in analyzer.analysis_cache_stats.values())
+            print(f"💾 Per-review cache reused {cached}/{cached + pending} analyses")
+        
+        if analyzer.packing_stats:
+            requests = sum(stats['requests'] for stats in analyzer.packing_stats.values())
+            packed = sum(stats['reviews'] for stats in analyzer.packing_stats.values())
+            prompt_tokens = sum(stats['prompt_tokens'] for stats in analyzer.packing_stats.values())
+            print(f"📦 Batch packing: {requests / len(analyzer.packing_stats):.1f} requests/day, "
+                  f"~{prompt_tokens / max(packed, 1):.0f} prompt tokens/review")
+        
+        if analyzer.batch_validity:
+            validity = analyzer.validity_summary()
+            print(f"🧾 LLM answers: {validity['valid_batches']}/{validity['batches']} batches schema-valid, "
+                  f"{validity['returned']}/{validity['reviews']} reviews answered")
+        
+        if analyzer.retry_stats:
+            stats = analyzer.retry_stats
+            print(f"🔁 Batch retries: {stats['retries']} ({stats['splits']} splits), "
+                  f"{stats['requeued_reviews']} reviews re-sent, {stats['fallback_reviews']} left as fallback")
+        
+        for model, tier in analyzer.tier_summary().items():
+            print(f"🏷️ {model}: {tier['reviews']} reviews, {tier['requests']} requests, "
+                  f"{tier['mean_latency']:.2f}s mean latency, ~${tier['cost']:.4f}")
+        
+        metrics = analyzer.rate_controller.metrics()
+        print(f"🚦 LLM rate control: limit {metrics['concurrency_limit']} in flight, "
+              f"{metrics['tokens_per_minute']} tokens/min, {metrics['throttled']} throttled, {metrics['retries']} retries")
+        
+        for name, cache in (("Topic extraction", analyzer.llm_cache), ("Deduplication", deduplicator.llm_cache)):
+            if cache is not None:
+                stats = cache.stats()
+                print(f"💾 {name} LLM cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%})")
+        
+        if isinstance(backend, RecordReplayBackend):
+            print(f"📼 LLM {backend.mode}: {backend.hits} replayed, {backend.recorded} recorded to {backend.path}")
+        
         # Step 3: Aggregate frequencies with canonical topics
-        for date_str, analyses in daily_results.items():
-            for analysis in analyses:
-                for topic in analysis.get('identified_topics', []):
-                    # Map to canonical topic
-                    canonical_topic = topic_taxonomy.get(topic, topic)
-                    self.topic_frequency[canonical_topic][date_str] += 1
+        # The per-day counts were built from the result stream while the analysis ran
+        for topic, date_counts in self.raw_topic_frequency.items():
+            # Map to canonical topic
+            canonical_topic = topic_taxonomy.get(topic, topic)
+            for date_str, count in date_counts.items():
+                if count > 0:
+                    self.topic_frequency[canonical_topic][date_str] += count
         
         print(f"📈 Final analysis: {len(self.topic_frequency)} canonical topics")
 
@@ -0,0 +1,181 @@
+# src/review_store.py - Review storage backends
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from config import Config
+from src.raw_io import iter_raw_file
+
+class ReviewStore(ABC):
+    """Storage interface for raw reviews, keyed by (app_id, reviewId)
+    
+    The same review is often listed under several locales; it is stored
+    once per app and every locale it was collected from is remembered.
+    """
+    
+    @abstractmethod
+    def upsert_reviews(self, app_id, reviews_data, lang='en', country='us'):
+        """Insert or update reviews seen in one locale, returning how many were written"""
+    
+    @abstractmethod
+    def iter_reviews(self, app_id, start_date, end_date, lang=None, country=None):
+        """Yield raw review records for app_id between two dates, in date order
+        
+        With lang/country only reviews collected from that locale are returned.
+        """
+    
+    def load_day(self, app_id, date_str, lang=None, country=None):
+        """Load all raw reviews for a single date"""
+        return list(self.iter_reviews(app_id, date_str, date_str, lang, country))
+    
+    def close(self):
+        pass
+
+class SQLiteReviewStore(ReviewStore):
+    """SQLite-backed store with an (app_id, date) index and (app_id, reviewId) upserts"""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reviews (
+        app_id          TEXT NOT NULL,
+        review_id       TEXT NOT NULL,
+        date            TEXT NOT NULL,
+        content         TEXT,
+        score           INTEGER,
+        user_name       TEXT,
+        thumbs_up_count INTEGER DEFAULT 0,
+        PRIMARY KEY (app_id, review_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_reviews_app_date ON reviews (app_id, date);
+    CREATE TABLE IF NOT EXISTS review_locales (
+        app_id          TEXT NOT NULL,
+        review_id       TEXT NOT NULL,
+        lang            TEXT NOT NULL,
+        country         TEXT NOT NULL,
+        PRIMARY KEY (app_id, review_id, lang, country)
+    );
+    CREATE INDEX IF NOT EXISTS idx_review_locales_locale ON review_locales (app_id, lang, country);
+    """
+    
+    UPSERT = """
+    INSERT INTO reviews (app_id, review_id, date, content, score, user_name, thumbs_up_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(app_id, review_id) DO UPDATE SET
+        content = excluded.content,
+        score = excluded.score,
+        user_name = excluded.user_name,
+        thumbs_up_count = excluded.thumbs_up_count
+    """
+    
+    ADD_LOCALE = """
+    INSERT OR IGNORE INTO review_locales (app_id, review_id, lang, country) VALUES (?, ?, ?, ?)
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or Config.REVIEW_STORE_PATH
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        
+        # Shared across collection threads, so serialize access ourselves
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        
+        self.conn.executescript(self.SCHEMA)
+    
+    def upsert_reviews(self, app_id, reviews_data, lang='en', country='us'):
+        """Bulk upsert reviews and record the locale they were seen in, in a single transaction"""
+        rows = [
+            (
+                app_id,
+                review['reviewId'],
+                review['date'],
+                review['content'],
+                review['score'],
+                review.get('userName', ''),
+                review.get('thumbsUpCount', 0)
+            )
+            for review in reviews_data
+        ]
+        
+        with self.lock, self.conn:
+            self.conn.executemany(self.UPSERT, rows)
+            self.conn.executemany(self.ADD_LOCALE, [(app_id, row[1], lang, country) for row in rows])
+        
+        return len(rows)
+    
+    def _locale_filter(self, lang, country):
+        """Extra WHERE clause and parameters restricting reviews to one locale, if given"""
+        if lang is None and country is None:
+            return "", ()
+        return (
+            """
+            AND EXISTS (
+                SELECT 1 FROM review_locales AS locale
+                WHERE locale.app_id = reviews.app_id AND locale.review_id = reviews.review_id
+                AND locale.lang = ? AND locale.country = ?
+            )
+            """,
+            (lang or 'en', country or 'us')
+        )
+    
+    def iter_reviews(self, app_id, start_date, end_date, lang=None, country=None):
+        """Stream reviews for a date range with one indexed query"""
+        locale_sql, locale_params = self._locale_filter(lang, country)
+        
+        # A separate connection lets readers stream while writers hold the lock
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(
+                f"""
+                SELECT date, content, score, user_name, review_id, thumbs_up_count
+                FROM reviews
+                WHERE app_id = ? AND date BETWEEN ? AND ? {locale_sql}
+                ORDER BY date, review_id
+                """,
+                (app_id, start_date, end_date, *locale_params)
+            )
+            
+            for date_str, content, score, user_name, review_id, thumbs_up_count in cursor:
+                yield {
+                    'date': date_str,
+                    'content': content,
+                    'score': score,
+                    'userName': user_name,
+                    'reviewId': review_id,
+                    'thumbsUpCount': thumbs_up_count
+                }
+        finally:
+            conn.close()
+    
+    def count_reviews(self, app_id, start_date, end_date, lang=None, country=None):
+        """Count stored reviews per date for a range, optionally for one locale"""
+        locale_sql, locale_params = self._locale_filter(lang, country)
+        with self.lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT date, COUNT(*) FROM reviews
+                WHERE app_id = ? AND date BETWEEN ? AND ? {locale_sql}
+                GROUP BY date
+                """,
+                (app_id, start_date, end_date, *locale_params)
+            ).fetchall()
+        return dict(rows)
+    
+    def import_raw_files(self, app_id, raw_files, lang='en', country='us', chunk_size=5000):
+        """Import (path, fmt) raw day files of any tier; duplicate reviewIds collapse on upsert"""
+        total = 0
+        for path, fmt in raw_files:
+            chunk = []
+            for review in iter_raw_file(path, fmt):
+                chunk.append(review)
+                if len(chunk) >= chunk_size:
+                    total += self.upsert_reviews(app_id, chunk, lang, country)
+                    chunk = []
+            if chunk:
+                total += self.upsert_reviews(app_id, chunk, lang, country)
+        return total
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
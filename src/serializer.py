@@ -0,0 +1,150 @@
+# src/serializer.py - Fast JSON encode/decode with stdlib fallback
+import json
+from typing import Dict, List, Optional, TypedDict
+
+try:
+    import msgspec
+except ImportError:  # optional, fastest typed decoding
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional, fast untyped encode/decode
+    orjson = None
+
+if msgspec is not None:
+    BACKEND = "msgspec"
+elif orjson is not None:
+    BACKEND = "orjson"
+else:
+    BACKEND = "json"
+
+# json.JSONDecodeError, orjson.JSONDecodeError and msgspec errors all subclass ValueError
+DecodeError = ValueError
+
+class RawReview(TypedDict):
+    """Schema of a raw review record as saved by ReviewDataCollector"""
+    date: str
+    content: Optional[str]
+    score: int
+    userName: Optional[str]
+    reviewId: str
+    thumbsUpCount: int
+
+class _CompactEntryRequired(TypedDict):
+    r: int
+    t: List[int]
+
+class CompactEntry(_CompactEntryRequired, total=False):
+    """One review in a structured compact answer: number, topic numbers, new names, confidence"""
+    n: List[str]
+    c: float
+
+class CompactAnswer(TypedDict):
+    a: List[CompactEntry]
+
+class _ReviewAnalysisRequired(TypedDict):
+    review_id: str
+    identified_topics: List[str]
+
+class ReviewAnalysis(_ReviewAnalysisRequired, total=False):
+    confidence: float
+
+class _ExtractionAnswerRequired(TypedDict):
+    review_analysis: List[ReviewAnalysis]
+
+class ExtractionAnswer(_ExtractionAnswerRequired, total=False):
+    """Verbose topic-extraction answer keyed by reviewId"""
+    new_canonical_topics: List[str]
+    topic_mappings: Dict[str, str]
+
+if msgspec is not None:
+    _compact_answer_decoder = msgspec.json.Decoder(CompactAnswer)
+    _extraction_answer_decoder = msgspec.json.Decoder(ExtractionAnswer)
+    _review_list_decoder = msgspec.json.Decoder(List[RawReview])
+    _review_decoder = msgspec.json.Decoder(RawReview)
+    _encoder = msgspec.json.Encoder()
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+def dumps_bytes(obj, indent=False):
+    """Encode obj as UTF-8 JSON bytes (non-ASCII kept as-is)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if msgspec is not None:
+        data = _encoder.encode(obj)
+        return msgspec.json.format(data, indent=2) if indent else data
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+def dumps(obj, indent=False):
+    """Encode obj as a JSON string"""
+    return dumps_bytes(obj, indent).decode('utf-8')
+
+def decode_reviews(data):
+    """Decode a JSON array of raw reviews, validating the record schema when msgspec is available"""
+    if msgspec is not None:
+        return _review_list_decoder.decode(data)
+    return loads(data)
+
+def decode_review(data):
+    """Decode a single raw review record (one JSONL line)"""
+    if msgspec is not None:
+        return _review_decoder.decode(data)
+    return loads(data)
+
+def _check(condition, message):
+    if not condition:
+        raise DecodeError(message)
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def decode_compact_answer(data):
+    """Decode and validate a structured compact answer, raising DecodeError on schema mismatch"""
+    if msgspec is not None:
+        return _compact_answer_decoder.decode(data)
+    
+    answer = loads(data)
+    _check(isinstance(answer, dict) and isinstance(answer.get('a'), list), "Expected object with array `a`")
+    for i, entry in enumerate(answer['a']):
+        _check(isinstance(entry, dict), f"Expected object at `$.a[{i}]`")
+        _check(isinstance(entry.get('r'), int), f"Expected `int` at `$.a[{i}].r`")
+        _check(isinstance(entry.get('t'), list) and all(isinstance(t, int) for t in entry['t']),
+               f"Expected array of `int` at `$.a[{i}].t`")
+        _check(all(isinstance(n, str) for n in entry.get('n', [])), f"Expected array of `str` at `$.a[{i}].n`")
+        _check('c' not in entry or _is_number(entry['c']), f"Expected `float` at `$.a[{i}].c`")
+    return answer
+
+def decode_extraction_answer(data):
+    """Decode and validate a verbose extraction answer, raising DecodeError on schema mismatch"""
+    if msgspec is not None:
+        return _extraction_answer_decoder.decode(data)
+    
+    answer = loads(data)
+    _check(isinstance(answer, dict) and isinstance(answer.get('review_analysis'), list),
+           "Expected object with array `review_analysis`")
+    for i, entry in enumerate(answer['review_analysis']):
+        _check(isinstance(entry, dict) and isinstance(entry.get('review_id'), str),
+               f"Expected `str` at `$.review_analysis[{i}].review_id`")
+        _check(isinstance(entry.get('identified_topics'), list)
+               and all(isinstance(t, str) for t in entry['identified_topics']),
+               f"Expected array of `str` at `$.review_analysis[{i}].identified_topics`")
+        _check('confidence' not in entry or _is_number(entry['confidence']),
+               f"Expected `float` at `$.review_analysis[{i}].confidence`")
+    return answer
+
+def load_file(path):
+    """Read and decode a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+def dump_file(obj, path, indent=False):
+    """Encode obj and write it to a JSON file"""
+    with open(path, 'wb') as f:
+        f.write(dumps_bytes(obj, indent))
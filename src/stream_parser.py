@@ -0,0 +1,77 @@
+# src/stream_parser.py - Incremental JSON parsing for streamed LLM answers
+import json
+import re
+from typing import NamedTuple
+
+class StreamedCompletion(NamedTuple):
+    """Full text of a streamed answer plus the usage block, if the server sent one"""
+    text: str
+    usage: object = None
+
+class IncrementalArrayParser:
+    """Yield the elements of one JSON array while the document is still arriving
+    
+    feed() takes the next text fragment and returns every element of the
+    array under one of `keys` ("review_analysis" or the compact "a") that
+    has been closed since the last call. Only brackets outside strings are
+    counted, so topic names with braces or escaped quotes are safe.
+    Elements that fail to decode are skipped; the caller still parses the
+    full text once the stream ends.
+    """
+    
+    def __init__(self, keys=("review_analysis", "a")):
+        self.key_re = re.compile(r'"(?:%s)"\s*:\s*\[' % "|".join(re.escape(key) for key in keys))
+        self.buffer = ""
+        self.position = None   # next character to scan, once the array has been found
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.element_start = None
+        self.done = False
+    
+    def feed(self, text):
+        self.buffer += text
+        if self.done:
+            return []
+        
+        if self.position is None:
+            match = self.key_re.search(self.buffer)
+            if not match:
+                return []
+            self.position = match.end()
+        
+        elements = []
+        buffer = self.buffer
+        i = self.position
+        while i < len(buffer):
+            char = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0:
+                    self.element_start = i
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0:
+                    # End of the array itself
+                    self.done = True
+                    i += 1
+                    break
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        elements.append(json.loads(buffer[self.element_start:i + 1]))
+                    except ValueError:
+                        pass
+                    self.element_start = None
+            i += 1
+        
+        self.position = i
+        return elements
@@ -0,0 +1,80 @@
+# src/token_budget.py - Local token estimates and token-budget batch packing
+import re
+from config import Config
+
+# Words, single punctuation marks and non-ASCII characters roughly track BPE tokens
+WORD_RE = re.compile(r"[A-Za-z0-9']+|[^\sA-Za-z0-9']")
+
+def _piece_tokens(piece):
+    if piece.isascii():
+        return 1 + len(piece) // 8
+    return len(piece.encode('utf-8')) // 2 or 1
+
+def count_tokens(text):
+    """Estimate GPT (cl100k-style) tokens without a tokenizer download
+    
+    Common English words are one token, long words a few more; punctuation
+    and non-ASCII characters (emoji, Devanagari, ...) count about one each.
+    """
+    if not text:
+        return 0
+    return sum(_piece_tokens(piece) for piece in WORD_RE.findall(text))
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text at a word boundary so it fits in roughly max_tokens"""
+    if not text or count_tokens(text) <= max_tokens:
+        return text
+    
+    used = 0
+    for match in WORD_RE.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+class TokenBudgetPacker:
+    """Pack reviews into requests that fill a token budget
+    
+    Each request holds the fixed prompt overhead plus as many reviews as fit
+    in request_budget once expected output tokens are reserved for them.
+    Reviews longer than max_review_tokens are shortened to that length.
+    """
+    
+    def __init__(self, request_budget=None, max_output_tokens=None, output_tokens_per_review=None,
+                 review_overhead_tokens=None, max_review_tokens=None, max_reviews=None):
+        self.request_budget = request_budget or Config.LLM_REQUEST_TOKEN_BUDGET
+        self.max_output_tokens = max_output_tokens or Config.LLM_MAX_OUTPUT_TOKENS
+        self.output_tokens_per_review = output_tokens_per_review or Config.LLM_OUTPUT_TOKENS_PER_REVIEW
+        self.review_overhead_tokens = review_overhead_tokens or Config.LLM_REVIEW_OVERHEAD_TOKENS
+        self.max_review_tokens = max_review_tokens or Config.LLM_MAX_REVIEW_TOKENS
+        self.max_reviews = max_reviews or Config.LLM_MAX_REVIEWS_PER_BATCH
+    
+    def review_text(self, review):
+        """The (possibly shortened) text sent for a review"""
+        return truncate_to_tokens(review.get('cleaned_content') or "", self.max_review_tokens)
+    
+    def review_cost(self, review):
+        """Prompt tokens a review adds to a request"""
+        return count_tokens(self.review_text(review)) + self.review_overhead_tokens
+    
+    def pack(self, reviews, overhead_tokens=0):
+        """Yield (batch, prompt_tokens) lists from a list or iterator of reviews"""
+        batch, prompt_tokens = [], overhead_tokens
+        
+        for review in reviews:
+            cost = self.review_cost(review)
+            output = (len(batch) + 1) * self.output_tokens_per_review
+            fits = (
+                prompt_tokens + cost + output <= self.request_budget
+                and output <= self.max_output_tokens
+                and len(batch) < self.max_reviews
+            )
+            if batch and not fits:
+                yield batch, prompt_tokens
+                batch, prompt_tokens = [], overhead_tokens
+            
+            batch.append(review)
+            prompt_tokens += cost
+        
+        if batch:
+            yield batch, prompt_tokens
@@ -1,23 +1,131 @@
 # src/topic_analyzer.py - Updated for OpenAI v1.0+
-import json
 import re
 import os
-from openai import OpenAI
+import json
+import time
+import asyncio
+from collections import Counter
+from itertools import islice
 from config import Config
+from src import serializer
+from src.near_duplicates import NearDuplicateCollapser
+from src.triage import ReviewTriage
+from src.fast_classifier import SeedTopicClassifier, record_llm_labels
+from src.llm_backend import create_backend
+from src.llm_cache import LLMResponseCache, ReviewAnalysisCache
+from src.rate_controller import estimate_tokens, shared_controller
+from src.stream_parser import IncrementalArrayParser, StreamedCompletion
+from src.token_budget import TokenBudgetPacker, count_tokens
 
 class AgenticTopicAnalyzer:
-    def __init__(self):
+    PROMPT_VERSION = 2   # bump when the extraction prompt changes to invalidate cached analyses
+    ALWAYS_OFFERED_TOPICS = ["General feedback", "App working well"]
+    
+    def __init__(self, backend=None):
         self.config = Config()
-        # Initialize OpenAI client with new API
-        self.client = OpenAI(
-            api_key=self.config.OPENAI_API_KEY
-        )
+        # OpenAI, record/replay or the offline stub (Config.LLM_BACKEND)
+        self.backend = backend or create_backend()
+        self.model = self.config.LLM_MODEL
+        self.rate_controller = shared_controller()
         self.canonical_topics = set(self.config.SEED_TOPICS)
+        self.topic_counts = Counter()
+        self.compact_prompt = self.config.LLM_COMPACT_PROMPT
+        self.structured_output = self.config.LLM_STRUCTURED_OUTPUT
+        self.streaming = self.config.LLM_STREAMING
+        self.on_result = None   # on_result(date_str, analysis, previous_topics), see emit_result
+        self.emitted = {}       # review_id -> topics last handed to on_result
+        self.review_dates = {}  # review_id -> date_str for the current run
+        self.batch_validity = []
+        self.retry_stats = Counter()
+        self.cascade = self.config.LLM_CASCADE_ENABLED
+        self.tier_stats = {}
+        self.collapser = NearDuplicateCollapser() if self.config.NEAR_DUP_ENABLED else None
+        self.dedup_stats = {}
+        self.triage = ReviewTriage() if self.config.TRIAGE_ENABLED else None
+        self.triage_stats = {}
+        self.fast_classifier = None
+        if self.config.FAST_CLASSIFIER_ENABLED and os.path.exists(self.config.FAST_CLASSIFIER_PATH):
+            self.fast_classifier = SeedTopicClassifier.load(self.config.FAST_CLASSIFIER_PATH)
+        self.llm_cache = LLMResponseCache() if self.config.LLM_CACHE_ENABLED else None
+        self.analysis_cache = ReviewAnalysisCache() if self.config.ANALYSIS_CACHE_ENABLED else None
+        models = (
+            [self.config.LLM_CASCADE_CHEAP_MODEL, self.config.LLM_CASCADE_STRONG_MODEL, self.config.LLM_CASCADE_THRESHOLD]
+            if self.config.LLM_CASCADE_ENABLED else self.model
+        )
+        # Everything that changes the prompt or answer format invalidates cached analyses
+        self.analysis_version = ReviewAnalysisCache.version_key(
+            self.PROMPT_VERSION, models, sorted(self.config.SEED_TOPICS), self.compact_prompt,
+            self.structured_output, self.config.LLM_MAX_PROMPT_TOPICS
+        )
+        self.analysis_cache_stats = {}
+        self.packer = None
+        if self.config.LLM_BATCH_PACKING and self.compact_prompt:
+            self.packer = TokenBudgetPacker(
+                output_tokens_per_review=self.config.LLM_COMPACT_OUTPUT_TOKENS_PER_REVIEW,
+                review_overhead_tokens=self.config.LLM_COMPACT_REVIEW_OVERHEAD_TOKENS
+            )
+        elif self.config.LLM_BATCH_PACKING:
+            self.packer = TokenBudgetPacker()
+        self.packing_stats = {}
+    
+    def prompt_topics(self, existing_topics):
+        """Topic list sent with a request
+        
+        The compact prompt sends seed topics first, then the most frequent
+        other topics seen so far, capped at LLM_MAX_PROMPT_TOPICS.
+        """
+        if not self.compact_prompt:
+            return sorted(existing_topics)
+        
+        seeds = list(self.config.SEED_TOPICS) + [t for t in self.ALWAYS_OFFERED_TOPICS if t not in self.config.SEED_TOPICS]
+        seed_set = set(seeds)
+        others = sorted(
+            (topic for topic in existing_topics if topic not in seed_set),
+            key=lambda topic: (-self.topic_counts[topic], topic)
+        )
+        return (seeds + others)[:max(self.config.LLM_MAX_PROMPT_TOPICS, len(seeds))]
+    
+    def _review_text(self, review):
+        if self.packer is not None:
+            return self.packer.review_text(review) or "No content"
+        return review['cleaned_content'][:200] if review['cleaned_content'] else "No content"
+    
+    def create_compact_prompt(self, reviews_batch, topic_table):
+        """Numbered topic table and batch-local review numbers; answers are index lists"""
+        topics_str = "\n".join(f"{i}. {topic}" for i, topic in enumerate(topic_table, start=1))
+        reviews_str = "\n".join(f"[{i}] {self._review_text(review)}" for i, review in enumerate(reviews_batch, start=1))
+        
+        return f"""Tag each app review with the topics it raises (issues, requests or praise).
+
+TOPICS:
+{topics_str}
+
+{self._compact_rules()}
+
+REVIEWS:
+{reviews_str}"""
+    
+    def _compact_rules(self):
+        if self.structured_output != "off":
+            return """RULES:
+- Every review gets at least one topic; use "General feedback" when nothing specific applies.
+- Answer once per review: r = review number, t = topic numbers from the table,
+  n = short new topic names (only if no table topic fits, else []), c = confidence 0-1.
+
+Example: {"a": [{"r": 1, "t": [3], "n": [], "c": 0.9}, {"r": 2, "t": [5], "n": ["Seller fraud"], "c": 0.7}]}"""
+        
+        return """RULES:
+- Every review gets at least one topic; use "General feedback" when nothing specific applies.
+- Use topic numbers from the table. Only if none fits, write a short new topic name as a string.
+- Answer once per review: [review number, [topics], confidence 0-1].
+
+Respond ONLY with JSON like {"a": [[1, [3], 0.9], [2, [5, "Seller fraud"], 0.7]]}"""
     
     def create_topic_extraction_prompt(self, reviews_batch, existing_topics):
         """Create improved prompt for LLM to extract and categorize topics"""
         
-        existing_topics_str = "\n".join([f"- {topic}" for topic in existing_topics])
+        # Sorted so the same topics always give the same prompt (and cache key)
+        existing_topics_str = "\n".join([f"- {topic}" for topic in sorted(existing_topics)])
         
         prompt = f"""
 You are an expert AI agent analyzing Zomato food delivery app reviews to identify issues, requests, and feedback topics.
@@ -51,68 +159,393 @@ REVIEWS TO ANALYZE:
 """
         
         for i, review in enumerate(reviews_batch):
-            content = review['cleaned_content'][:200] if review['cleaned_content'] else "No content"
+            content = self._review_text(review)
             prompt += f"\nReview {i+1} (ID: {review['reviewId']}): \"{content}\"\n"
         
         return prompt
     
-    def extract_json_from_response(self, response_text):
-        """Extract JSON from response with better error handling"""
+    def extract_json_from_response(self, response_text, reviews_batch=None, topic_table=None):
+        """Extract JSON from response with better error handling
+        
+        Compact answers ({"a": [[review_no, [topic_no or name], confidence]]})
+        are mapped back to reviewIds and topic names when the batch and
+        topic table they were sent with are given.
+        """
         try:
             # Clean the response text
             response_text = response_text.strip()
-            return json.loads(response_text)
-        except json.JSONDecodeError:
-            # Try to find JSON within the response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                try:
-                    json_str = json_match.group().strip()
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    pass
-            
-            print(f"Could not parse JSON. Raw response: {response_text[:500]}")
+            result = serializer.loads(response_text)
+        except serializer.DecodeError:
+            result = self._find_json_object(response_text)
+            
+            if result is None:
+                print(f"Could not parse JSON. Raw response: {response_text[:500]}")
+                return {
+                    "review_analysis": [],
+                    "new_canonical_topics": [],
+                    "topic_mappings": {}
+                }
+        
+        if isinstance(result, dict) and 'a' in result and reviews_batch is not None:
+            return self._expand_compact_result(result, reviews_batch, topic_table or [])
+        return result
+    
+    def _find_json_object(self, text):
+        """First complete JSON object embedded in text (e.g. wrapped in prose or code fences)"""
+        decoder = json.JSONDecoder()
+        for match in re.finditer(r'\{', text):
+            try:
+                obj, _ = decoder.raw_decode(text, match.start())
+            except ValueError:
+                continue
+            if isinstance(obj, dict):
+                return obj
+        return None
+    
+    def _expand_compact_result(self, result, reviews_batch, topic_table):
+        """Map review numbers and topic numbers in a compact answer back to ids and names"""
+        expanded = {"review_analysis": [], "new_canonical_topics": [], "topic_mappings": {}}
+        seen = set()
+        
+        for entry in result.get('a') or []:
+            if isinstance(entry, dict):
+                # Structured-output form {"r", "t", "n", "c"}
+                entry = [entry.get('r'), list(entry.get('t') or []) + list(entry.get('n') or []), entry.get('c')]
+            if not isinstance(entry, list) or len(entry) < 2:
+                continue
+            try:
+                review_no = int(entry[0])
+            except (TypeError, ValueError):
+                continue
+            if not 1 <= review_no <= len(reviews_batch) or review_no in seen:
+                continue
+            seen.add(review_no)
+            
+            topics = []
+            for topic in entry[1] if isinstance(entry[1], list) else [entry[1]]:
+                if isinstance(topic, str) and not topic.strip().isdigit():
+                    name = topic.strip()
+                    if name and name not in topic_table and name not in expanded["new_canonical_topics"]:
+                        expanded["new_canonical_topics"].append(name)
+                else:
+                    try:
+                        index = int(topic)
+                    except (TypeError, ValueError):
+                        continue
+                    name = topic_table[index - 1] if 1 <= index <= len(topic_table) else None
+                if name and name not in topics:
+                    topics.append(name)
+            
+            analysis = {"review_id": reviews_batch[review_no - 1]['reviewId'], "identified_topics": topics}
+            if len(entry) > 2 and isinstance(entry[2], (int, float)) and not isinstance(entry[2], bool):
+                analysis["confidence"] = float(entry[2])
+            expanded["review_analysis"].append(analysis)
+        
+        return expanded
+    
+    def _build_messages(self, reviews_batch, topic_table):
+        if self.compact_prompt:
+            prompt = self.create_compact_prompt(reviews_batch, topic_table)
+        else:
+            prompt = self.create_topic_extraction_prompt(reviews_batch, topic_table)
+        return [
+            {"role": "system", "content": "You are an expert at analyzing app reviews. Always identify at least one topic per review. Respond only with valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _output_schema(self):
+        """JSON schema of the expected answer, for structured-output requests"""
+        if self.compact_prompt:
+            entry = {
+                "type": "object",
+                "properties": {
+                    "r": {"type": "integer"},
+                    "t": {"type": "array", "items": {"type": "integer"}},
+                    "n": {"type": "array", "items": {"type": "string"}},
+                    "c": {"type": "number"}
+                },
+                "required": ["r", "t", "n", "c"],
+                "additionalProperties": False
+            }
             return {
-                "review_analysis": [],
-                "new_canonical_topics": [],
-                "topic_mappings": {}
+                "type": "object",
+                "properties": {"a": {"type": "array", "items": entry}},
+                "required": ["a"],
+                "additionalProperties": False
+            }
+        
+        entry = {
+            "type": "object",
+            "properties": {
+                "review_id": {"type": "string"},
+                "identified_topics": {"type": "array", "items": {"type": "string"}},
+                "confidence": {"type": "number"}
+            },
+            "required": ["review_id", "identified_topics", "confidence"],
+            "additionalProperties": False
+        }
+        return {
+            "type": "object",
+            "properties": {
+                "review_analysis": {"type": "array", "items": entry},
+                "new_canonical_topics": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["review_analysis", "new_canonical_topics"],
+            "additionalProperties": False
+        }
+    
+    def _request_params(self):
+        """Sampling parameters plus the structured-output request, if enabled"""
+        params = {"temperature": 0.2, "max_tokens": self.config.LLM_MAX_OUTPUT_TOKENS}
+        
+        if self.structured_output == "json_schema":
+            params["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "record_topics", "strict": True, "schema": self._output_schema()}
             }
+        elif self.structured_output == "tools":
+            params["tools"] = [{
+                "type": "function",
+                "function": {
+                    "name": "record_topics",
+                    "description": "Record the topics identified for each review",
+                    "parameters": self._output_schema()
+                }
+            }]
+            params["tool_choice"] = {"type": "function", "function": {"name": "record_topics"}}
+        
+        return params
+    
+    def _stream_params(self):
+        """Extra request parameters for a streamed answer (not part of the cache key)"""
+        if not self.streaming:
+            return {}
+        return {"stream": True, "stream_options": {"include_usage": True}}
+    
+    def _response_text(self, response):
+        """Message content, or the function arguments for a tool-call answer"""
+        if isinstance(response, StreamedCompletion):
+            return response.text
+        message = response.choices[0].message
+        if getattr(message, 'tool_calls', None):
+            return message.tool_calls[0].function.arguments
+        return message.content or ""
+    
+    def _chunk_text(self, chunk):
+        """Text carried by one stream chunk: content, or a tool-call argument fragment"""
+        if not chunk.choices:
+            return ""
+        delta = chunk.choices[0].delta
+        if getattr(delta, 'tool_calls', None):
+            return delta.tool_calls[0].function.arguments or ""
+        return delta.content or ""
+    
+    def _stream_feeder(self, reviews_batch, topic_table):
+        """Return feed(text), which emits every review analysis a fragment completes"""
+        parser = IncrementalArrayParser()
+        review_ids = {review['reviewId'] for review in reviews_batch}
+        
+        def feed(text):
+            for entry in parser.feed(text):
+                if self.compact_prompt:
+                    analyses = self._expand_compact_result({'a': [entry]}, reviews_batch, topic_table)['review_analysis']
+                else:
+                    analyses = [entry] if isinstance(entry, dict) and entry.get('review_id') in review_ids else []
+                for analysis in analyses:
+                    # Empty answers wait for the 'General feedback' fix-up in _parse_llm_result
+                    if analysis.get('identified_topics'):
+                        self.emit_result(analysis)
+        return feed
+    
+    def _consume_stream(self, stream, reviews_batch, topic_table):
+        """Read a streamed answer, emitting reviews as their entries close"""
+        feed = self._stream_feeder(reviews_batch, topic_table)
+        parts, usage = [], None
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None) or usage
+            text = self._chunk_text(chunk)
+            if text:
+                parts.append(text)
+                feed(text)
+        return StreamedCompletion("".join(parts), usage)
     
-    def extract_topics_with_llm(self, reviews_batch):
+    async def _consume_stream_async(self, stream, reviews_batch, topic_table):
+        feed = self._stream_feeder(reviews_batch, topic_table)
+        parts, usage = [], None
+        async for chunk in stream:
+            usage = getattr(chunk, 'usage', None) or usage
+            text = self._chunk_text(chunk)
+            if text:
+                parts.append(text)
+                feed(text)
+        return StreamedCompletion("".join(parts), usage)
+    
+    def reset_stream(self):
+        """Forget what was emitted, so a new run reports every review again"""
+        self.emitted = {}
+        self.review_dates = {}
+    
+    def emit_result(self, analysis):
+        """Hand a review analysis to on_result(date_str, analysis, previous_topics)
+        
+        Streamed entries are previews: the batch is still validated, retried
+        and possibly escalated afterwards. Whenever a later result for the
+        same review has different topics it is emitted again, with the
+        topics emitted before as previous_topics (None the first time), so
+        consumers can take the preview back out of their counts. Once a run
+        returns, what was emitted matches its final results.
+        """
+        review_id = analysis.get('review_id')
+        topics = list(analysis.get('identified_topics') or [])
+        if self.on_result is None or self.emitted.get(review_id) == topics:
+            return
+        previous_topics = self.emitted.get(review_id)
+        self.emitted[review_id] = topics
+        try:
+            self.on_result(self.review_dates.get(review_id), analysis, previous_topics)
+        except Exception as e:
+            print(f"⚠️ Result callback failed: {e}")
+    
+    def _parse_llm_result(self, response_content, reviews_batch=None, topic_table=None):
+        """Parse a raw completion and make sure every review has at least one topic"""
+        print(f"Raw LLM Response: {response_content[:200]}...")
+        
+        result, error = None, None
+        if self.structured_output != "off":
+            # Typed validation first; anything off-schema falls back to lenient parsing
+            try:
+                if self.compact_prompt:
+                    answer = serializer.decode_compact_answer(response_content)
+                    result = self._expand_compact_result(answer, reviews_batch or [], topic_table or [])
+                else:
+                    result = dict(serializer.decode_extraction_answer(response_content))
+            except serializer.DecodeError as e:
+                error = str(e)
+        else:
+            try:
+                serializer.loads(response_content.strip())
+            except serializer.DecodeError as e:
+                error = str(e)
+        
+        # Parse the JSON response
+        if result is None:
+            result = self.extract_json_from_response(response_content, reviews_batch, topic_table)
+        
+        if reviews_batch:
+            returned = {analysis.get('review_id') for analysis in result.get('review_analysis') or []}
+            self.batch_validity.append({
+                'reviews': len(reviews_batch),
+                'returned': sum(review['reviewId'] in returned for review in reviews_batch),
+                'valid': error is None,
+                'error': error
+            })
+        
+        # Validate and fix empty topics
+        if result.get('review_analysis'):
+            for analysis in result['review_analysis']:
+                if not analysis.get('identified_topics') or len(analysis['identified_topics']) == 0:
+                    analysis['identified_topics'] = ['General feedback']
+                    analysis['confidence'] = 0.5
+        
+        return result
+    
+    def validity_summary(self):
+        """Totals over batch_validity: schema-valid batches and reviews answered"""
+        return {
+            'batches': len(self.batch_validity),
+            'valid_batches': sum(stats['valid'] for stats in self.batch_validity),
+            'reviews': sum(stats['reviews'] for stats in self.batch_validity),
+            'returned': sum(stats['returned'] for stats in self.batch_validity)
+        }
+    
+    def _fallback_result(self, reviews_batch, request_failed=False):
+        """Structured 'General feedback' result used when the LLM call fails"""
+        fallback_result = {
+            "review_analysis": [],
+            "new_canonical_topics": [],
+            "topic_mappings": {}
+        }
+        if request_failed:
+            fallback_result["request_failed"] = True
+        
+        for review in reviews_batch:
+            fallback_result["review_analysis"].append({
+                "review_id": review['reviewId'],
+                "identified_topics": ["General feedback"],
+                "confidence": 0.5,
+                "source": "fallback"
+            })
+        
+        return fallback_result
+    
+    def _first_model(self):
+        """Model for the first pass: the cheap cascade tier, or self.model"""
+        return self.config.LLM_CASCADE_CHEAP_MODEL if self.cascade else self.model
+    
+    def _record_call(self, model, seconds, response, messages, response_content):
+        """Per-model request count, latency and token usage (estimated when not reported)"""
+        stats = self.tier_stats.setdefault(model, {
+            'requests': 0, 'reviews': 0, 'seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0
+        })
+        usage = getattr(response, 'usage', None)
+        stats['requests'] += 1
+        stats['seconds'] += seconds
+        stats['prompt_tokens'] += getattr(usage, 'prompt_tokens', None) or estimate_tokens(messages)
+        stats['completion_tokens'] += getattr(usage, 'completion_tokens', None) or count_tokens(response_content)
+    
+    def tier_summary(self):
+        """Per-tier reviews, requests, mean latency and estimated cost (USD)"""
+        summary = {}
+        for model, stats in self.tier_stats.items():
+            input_price, output_price = self.config.LLM_MODEL_PRICES.get(model, (0.0, 0.0))
+            summary[model] = {
+                'reviews': stats['reviews'],
+                'requests': stats['requests'],
+                'mean_latency': stats['seconds'] / max(stats['requests'], 1),
+                'cost': (stats['prompt_tokens'] * input_price + stats['completion_tokens'] * output_price) / 1e6
+            }
+        return summary
+    
+    def extract_topics_with_llm(self, reviews_batch, model=None):
         """Use LLM to extract topics from reviews batch - NEW OpenAI API"""
         
         if not reviews_batch:
             return {"review_analysis": [], "new_canonical_topics": [], "topic_mappings": {}}
         
-        prompt = self.create_topic_extraction_prompt(reviews_batch, self.canonical_topics)
+        model = model or self._first_model()
+        topic_table = self.prompt_topics(self.canonical_topics)
+        messages = self._build_messages(reviews_batch, topic_table)
+        params = self._request_params()
         
         try:
-            # NEW OpenAI v1.0+ API usage
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert at analyzing app reviews. Always identify at least one topic per review. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=2000
-            )
+            response_content = self.llm_cache.get(model, messages, **params) if self.llm_cache else None
             
-            # NEW: Access response content using pydantic model attributes
-            response_content = response.choices[0].message.content
+            if response_content is None:
+                started = time.perf_counter()
+                # NEW OpenAI v1.0+ API usage
+                response = self.rate_controller.call(
+                    lambda: self.backend.create(
+                        model=model, messages=messages, **params, **self._stream_params()
+                    ),
+                    tokens=estimate_tokens(messages, params['max_tokens']),
+                    consume=(lambda stream: self._consume_stream(stream, reviews_batch, topic_table)) if self.streaming else None
+                )
+                
+                # NEW: Access response content using pydantic model attributes
+                response_content = self._response_text(response)
+                self._record_call(model, time.perf_counter() - started, response, messages, response_content)
+                fresh = True
+            else:
+                fresh = False
             
-            print(f"Raw LLM Response: {response_content[:200]}...")
+            result = self._parse_llm_result(response_content, reviews_batch, topic_table)
             
-            # Parse the JSON response
-            result = self.extract_json_from_response(response_content)
+            # Only complete answers are cached, so a retry never replays a bad one
+            if fresh and self.llm_cache and not self._missing_reviews(reviews_batch, result):
+                self.llm_cache.put(model, messages, response_content, **params)
             
-            # Validate and fix empty topics
-            if result.get('review_analysis'):
-                for analysis in result['review_analysis']:
-                    if not analysis.get('identified_topics') or len(analysis['identified_topics']) == 0:
-                        analysis['identified_topics'] = ['General feedback']
-                        analysis['confidence'] = 0.5
+            for analysis in result.get('review_analysis') or []:
+                self.emit_result(analysis)
             
             # Update canonical topics
             if result.get('new_canonical_topics'):
@@ -122,40 +555,332 @@ REVIEWS TO ANALYZE:
         
         except Exception as e:
             print(f"Error in LLM topic extraction: {e}")
-            # Return structured fallback
-            fallback_result = {
-                "review_analysis": [],
-                "new_canonical_topics": [],
-                "topic_mappings": {}
-            }
+            # Return structured fallback, marked so the retry planner does not bisect it
+            return self._fallback_result(reviews_batch, request_failed=True)
+    
+    async def extract_topics_with_llm_async(self, client, reviews_batch, topic_table, model=None):
+        """Async variant for concurrent dispatch; leaves canonical_topics for the caller to merge"""
+        
+        if not reviews_batch:
+            return {"review_analysis": [], "new_canonical_topics": [], "topic_mappings": {}}
+        
+        model = model or self._first_model()
+        messages = self._build_messages(reviews_batch, topic_table)
+        params = self._request_params()
+        
+        try:
+            response_content = self.llm_cache.get(model, messages, **params) if self.llm_cache else None
+            
+            if response_content is None:
+                started = time.perf_counter()
+                response = await self.rate_controller.call_async(
+                    lambda: client.create(
+                        model=model, messages=messages, **params, **self._stream_params()
+                    ),
+                    tokens=estimate_tokens(messages, params['max_tokens']),
+                    consume=(lambda stream: self._consume_stream_async(stream, reviews_batch, topic_table)) if self.streaming else None
+                )
+                response_content = self._response_text(response)
+                self._record_call(model, time.perf_counter() - started, response, messages, response_content)
+                fresh = True
+            else:
+                fresh = False
+            
+            result = self._parse_llm_result(response_content, reviews_batch, topic_table)
             
-            for i, review in enumerate(reviews_batch):
-                fallback_result["review_analysis"].append({
-                    "review_id": review['reviewId'],
-                    "identified_topics": ["General feedback"],
-                    "confidence": 0.5
-                })
+            if fresh and self.llm_cache and not self._missing_reviews(reviews_batch, result):
+                self.llm_cache.put(model, messages, response_content, **params)
             
-            return fallback_result
+            for analysis in result.get('review_analysis') or []:
+                self.emit_result(analysis)
+            
+            return result
+        
+        except Exception as e:
+            print(f"Error in LLM topic extraction: {e}")
+            return self._fallback_result(reviews_batch, request_failed=True)
+    
+    def _missing_reviews(self, reviews_batch, result):
+        """Reviews in the batch with no real (non-fallback) analysis in result"""
+        answered = {
+            analysis.get('review_id') for analysis in result.get('review_analysis') or []
+            if analysis.get('source') != 'fallback'
+        }
+        return [review for review in reviews_batch if review['reviewId'] not in answered]
+    
+    def _plan_retry(self, reviews_batch, result, attempt, failures):
+        """Decide what to resend after an answer: returns (answered_result, [(batch, attempt, failures)])
+        
+        Missing reviews are re-queued on their own. A batch whose answer fails
+        outright is retried once as-is, then split in half (halves that fail
+        outright split again straight away). Every re-send and every split
+        counts as an attempt, and after LLM_BATCH_MAX_RETRIES of them the
+        remaining reviews get fallback analyses, so one batch costs at most
+        2 ** (LLM_BATCH_MAX_RETRIES + 1) - 1 calls.
+        
+        Requests that raised (network errors, 5xx, replay misses) are not
+        re-sent: the rate controller has already retried them, and splitting
+        an outage only multiplies the traffic.
+        """
+        missing = self._missing_reviews(reviews_batch, result)
+        missing_ids = {review['reviewId'] for review in missing}
+        answered = {
+            "review_analysis": [
+                analysis for analysis in result.get('review_analysis') or []
+                if analysis.get('review_id') not in missing_ids
+            ],
+            "new_canonical_topics": list(result.get('new_canonical_topics') or []),
+            "topic_mappings": dict(result.get('topic_mappings') or {})
+        }
+        
+        if not missing:
+            return answered, []
+        
+        if result.get('request_failed') or attempt >= self.config.LLM_BATCH_MAX_RETRIES:
+            self.retry_stats['fallback_reviews'] += len(missing)
+            answered["review_analysis"].extend(self._fallback_result(missing)["review_analysis"])
+            return answered, []
+        
+        outright = len(missing) == len(reviews_batch)
+        if outright and failures >= 1 and len(missing) > 1:
+            # Repeated outright failure: bisect to isolate the review that trips the model
+            self.retry_stats['splits'] += 1
+            self.retry_stats['requeued_reviews'] += len(missing)
+            middle = len(missing) // 2
+            return answered, [(missing[:middle], attempt + 1, 1), (missing[middle:], attempt + 1, 1)]
+        
+        # Resend the missing reviews (all of them after an outright failure)
+        self.retry_stats['retries'] += 1
+        self.retry_stats['requeued_reviews'] += len(missing)
+        return answered, [(missing, attempt + 1, failures + 1 if outright else 0)]
     
-    def process_daily_reviews(self, date_str, batch_size=10):
-        """Process all reviews for a specific date"""
+    def _merge_results(self, result, other):
+        result["review_analysis"].extend(other.get("review_analysis") or [])
+        for topic in other.get("new_canonical_topics") or []:
+            if topic not in result["new_canonical_topics"]:
+                result["new_canonical_topics"].append(topic)
+        result["topic_mappings"].update(other.get("topic_mappings") or {})
+        return result
+    
+    def extract_topics_with_retry(self, reviews_batch, attempt=0, failures=0, model=None):
+        """extract_topics_with_llm, re-sending missing reviews with backoff and bisection"""
+        result = self.extract_topics_with_llm(reviews_batch, model)
+        answered, retries = self._plan_retry(reviews_batch, result, attempt, failures)
+        
+        if retries:
+            time.sleep(self.config.LLM_BATCH_RETRY_BACKOFF * 2 ** attempt)
+        for batch, next_attempt, next_failures in retries:
+            self._merge_results(answered, self.extract_topics_with_retry(batch, next_attempt, next_failures, model))
+        return answered
+    
+    async def extract_topics_with_retry_async(self, client, reviews_batch, topic_table, attempt=0, failures=0, model=None):
+        """Async variant of extract_topics_with_retry; split halves are resent concurrently"""
+        result = await self.extract_topics_with_llm_async(client, reviews_batch, topic_table, model)
+        answered, retries = self._plan_retry(reviews_batch, result, attempt, failures)
+        
+        if retries:
+            await asyncio.sleep(self.config.LLM_BATCH_RETRY_BACKOFF * 2 ** attempt)
+            retried = await asyncio.gather(*[
+                self.extract_topics_with_retry_async(client, batch, topic_table, next_attempt, next_failures, model)
+                for batch, next_attempt, next_failures in retries
+            ])
+            for other in retried:
+                self._merge_results(answered, other)
+        return answered
+    
+    def _tier(self, model):
+        return self.tier_stats.setdefault(model, {
+            'requests': 0, 'reviews': 0, 'seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0
+        })
+    
+    def _low_confidence(self, llm_results, sent_reviews):
+        """Reviews whose first-pass answer is below LLM_CASCADE_THRESHOLD (or has no confidence)"""
+        threshold = self.config.LLM_CASCADE_THRESHOLD
+        hard, seen = [], set()
+        for analysis in llm_results:
+            review_id = analysis.get('review_id')
+            confidence = analysis.get('confidence')
+            if review_id in sent_reviews and review_id not in seen and (confidence is None or confidence < threshold):
+                seen.add(review_id)
+                hard.append(sent_reviews[review_id])
+        return hard
+    
+    def _escalation_batches(self, reviews, topic_table):
+        if self.packer is None:
+            return list(self._iter_batches(reviews, self.config.BATCH_SIZE))
+        overhead = sum(count_tokens(m['content']) for m in self._build_messages([], topic_table))
+        return [batch for batch, _ in self.packer.pack(reviews, overhead)]
+    
+    def _apply_escalation(self, llm_results, strong_results):
+        """Swap in strong-tier answers; keep the cheap one where the strong tier failed"""
+        cheap_model = self.config.LLM_CASCADE_CHEAP_MODEL
+        strong_model = self.config.LLM_CASCADE_STRONG_MODEL
+        strong = {
+            analysis['review_id']: analysis for analysis in strong_results
+            if analysis.get('source') != 'fallback'
+        }
+        
+        merged = []
+        for analysis in llm_results:
+            replacement = strong.pop(analysis.get('review_id'), None)
+            if replacement is not None:
+                replacement['tier'] = strong_model
+                merged.append(replacement)
+            else:
+                analysis['tier'] = cheap_model
+                merged.append(analysis)
+        
+        escalated = sum(analysis['tier'] == strong_model for analysis in merged)
+        self._tier(cheap_model)['reviews'] += len(merged) - escalated
+        self._tier(strong_model)['reviews'] += escalated
+        return merged
+    
+    def _escalate(self, date_str, llm_results, sent_reviews):
+        """Cascade: re-send low-confidence reviews to the strong model"""
+        hard = self._low_confidence(llm_results, sent_reviews)
+        strong_results = []
+        if hard:
+            print(f"⬆️ Escalating {len(hard)}/{len(llm_results)} low-confidence reviews to "
+                  f"{self.config.LLM_CASCADE_STRONG_MODEL} for {date_str}")
+            for batch in self._escalation_batches(hard, self.prompt_topics(self.canonical_topics)):
+                result = self.extract_topics_with_retry(batch, model=self.config.LLM_CASCADE_STRONG_MODEL)
+                strong_results.extend(result.get('review_analysis', []))
+        return self._apply_escalation(llm_results, strong_results)
+    
+    def _iter_batches(self, reviews, batch_size):
+        """Chunk a list or iterator of reviews into batches without materializing it"""
+        iterator = iter(reviews)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def _batches(self, date_str, reviews, batch_size, topic_table):
+        """Fixed-size batches, or token-budget packed ones when packing is enabled"""
+        if self.packer is None:
+            yield from self._iter_batches(reviews, batch_size)
+            return
+        
+        # Prompt overhead: system message plus the instructions and topic list
+        overhead = sum(count_tokens(m['content']) for m in self._build_messages([], topic_table))
+        stats = self.packing_stats.setdefault(date_str, {'requests': 0, 'reviews': 0, 'prompt_tokens': 0})
+        for batch, prompt_tokens in self.packer.pack(reviews, overhead):
+            stats['requests'] += 1
+            stats['reviews'] += len(batch)
+            stats['prompt_tokens'] += prompt_tokens
+            yield batch
+        
+        if stats['reviews']:
+            print(f"📦 Packed {stats['reviews']} reviews into {stats['requests']} requests for {date_str} "
+                  f"(~{stats['prompt_tokens'] / stats['reviews']:.0f} prompt tokens/review)")
+    
+    def _load_reviews(self, date_str, preprocessor=None):
         from src.preprocessor import ReviewPreprocessor
         
-        preprocessor = ReviewPreprocessor()
-        reviews = preprocessor.load_daily_reviews(date_str)
+        preprocessor = preprocessor or ReviewPreprocessor()
+        return preprocessor.load_daily_reviews(date_str)
+    
+    def prepare_daily_reviews(self, date_str, reviews):
+        """Run the local stages and return (local_results, llm_reviews, context)
+        
+        Triage, the fast classifier and the analysis cache label what they
+        can; near-duplicates are collapsed so only representatives remain.
+        """
+        reviews = list(reviews)
+        self.review_dates.update((review['reviewId'], date_str) for review in reviews)
+        
+        local_results = []
+        if self.triage is not None:
+            reviews = list(reviews)
+            local_results, reviews = self.triage.split(reviews)
+            total = len(local_results) + len(reviews)
+            self.triage_stats[date_str] = {'reviews': total, 'local': len(local_results)}
+            print(f"⚡ Triage labelled {len(local_results)}/{total} reviews locally ({len(local_results) / total if total else 0:.0%}) for {date_str}")
+        
+        if self.fast_classifier is not None:
+            reviews = list(reviews)
+            classified, reviews = self.fast_classifier.split(reviews)
+            local_results.extend(classified)
+            print(f"⚡ Fast classifier labelled {len(classified)} reviews locally for {date_str}")
+        
+        pending_reviews = {}
+        if self.analysis_cache is not None:
+            cached, reviews = self.analysis_cache.split(reviews, self.analysis_version)
+            local_results.extend(cached)
+            pending_reviews = {review['reviewId']: review for review in reviews}
+            self.analysis_cache_stats[date_str] = {'cached': len(cached), 'pending': len(reviews)}
+            print(f"💾 Reused {len(cached)} cached analyses, {len(reviews)} new or edited reviews for {date_str}")
+        
+        members = {}
+        if self.collapser is not None:
+            reviews = list(reviews)
+            representatives, members = self.collapser.collapse(reviews)
+            self.dedup_stats[date_str] = {
+                'reviews': len(reviews),
+                'llm_reviews': len(representatives)
+            }
+            if len(representatives) < len(reviews):
+                saved = 1 - len(representatives) / len(reviews)
+                print(f"🧹 Collapsed {len(reviews)} reviews into {len(representatives)} near-duplicate clusters ({saved:.0%} fewer LLM slots)")
+            reviews = representatives
+        
+        for analysis in local_results:
+            self.emit_result(analysis)
+        
+        context = {'members': members, 'pending_reviews': pending_reviews, 'sent_reviews': {}}
+        return local_results, reviews, context
+    
+    def finalize_daily_results(self, date_str, local_results, llm_results, context):
+        """Tag, record, fan out and cache LLM results, then prepend the local ones"""
+        for analysis in llm_results:
+            analysis.setdefault('source', 'llm')
+        
+        if self.config.FAST_CLASSIFIER_ENABLED and llm_results:
+            # Keep LLM labels so the fast classifier can be (re)trained on them
+            record_llm_labels([a for a in llm_results if a['source'] == 'llm'], context['sent_reviews'])
+        
+        if context['members']:
+            # Every cluster member counts in topic_frequency, not just the representative
+            llm_results = self.collapser.fan_out(llm_results, context['members'])
+        
+        if self.analysis_cache is not None:
+            self.analysis_cache.store(llm_results, context['pending_reviews'], self.analysis_version)
+        
+        all_results = local_results + llm_results
+        for analysis in all_results:
+            self.topic_counts.update(analysis.get('identified_topics', []))
+            self.emit_result(analysis)
+        
+        print(f"Completed processing {len(all_results)} reviews for {date_str}")
+        return all_results
+    
+    def process_daily_reviews(self, date_str, batch_size=10, reviews=None, preprocessor=None):
+        """Process all reviews for a specific date
+        
+        Pass already-preprocessed reviews (a list or an iterator) to avoid
+        reloading and re-cleaning the day; otherwise they are loaded here.
+        """
+        if reviews is None:
+            reviews = self._load_reviews(date_str, preprocessor)
         
+        reviews = list(reviews)
         if not reviews:
             print(f"No reviews found for {date_str}")
             return []
         
+        self.reset_stream()
+        
+        local_results, reviews, context = self.prepare_daily_reviews(date_str, reviews)
+        
         all_results = []
         
         # Process in smaller batches for efficiency and cost management
-        for i in range(0, len(reviews), batch_size):
-            batch = reviews[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1} ({len(batch)} reviews) for {date_str}...")
-            batch_result = self.extract_topics_with_llm(batch)
+        topic_table = self.prompt_topics(self.canonical_topics)
+        for batch_number, batch in enumerate(self._batches(date_str, reviews, batch_size, topic_table), start=1):
+            print(f"Processing batch {batch_number} ({len(batch)} reviews) for {date_str}...")
+            context['sent_reviews'].update((review['reviewId'], review) for review in batch)
+            batch_result = self.extract_topics_with_retry(batch)
             
             # Extract the review_analysis from the batch_result
             if isinstance(batch_result, dict) and 'review_analysis' in batch_result:
@@ -163,5 +888,88 @@ REVIEWS TO ANALYZE:
             elif isinstance(batch_result, list):
                 all_results.extend(batch_result)
         
-        print(f"Completed processing {len(all_results)} reviews for {date_str}")
-        return all_results
+        if self.cascade:
+            all_results = self._escalate(date_str, all_results, context['sent_reviews'])
+        elif all_results:
+            self._tier(self.model)['reviews'] += len(all_results)
+        
+        return self.finalize_daily_results(date_str, local_results, all_results, context)
+    
+    async def process_range_async(self, reviews_by_date, batch_size=10):
+        """Analyze several days with all LLM batches in flight concurrently
+        
+        Every prompt is built from the same snapshot of canonical_topics and
+        new topics are merged afterwards in (date, batch) order, so the result
+        does not depend on which call finishes first. The rate controller
+        decides how many calls are in flight. Returns {date: results} in the
+        order of reviews_by_date.
+        """
+        topics_snapshot = self.prompt_topics(self.canonical_topics)
+        self.reset_stream()
+        
+        days = []
+        for date_str, reviews in reviews_by_date.items():
+            local_results, llm_reviews, context = self.prepare_daily_reviews(date_str, reviews)
+            batches = list(self._batches(date_str, llm_reviews, batch_size, topics_snapshot))
+            for batch in batches:
+                context['sent_reviews'].update((review['reviewId'], review) for review in batch)
+            days.append((date_str, local_results, batches, context))
+        
+        jobs = [batch for _, _, batches, _ in days for batch in batches]
+        print(f"🚀 Dispatching {len(jobs)} batches across {len(days)} days "
+              f"(up to {self.rate_controller.max_limit} in flight)...")
+        
+        # One backend session per event loop; gather keeps results in submission order
+        async with self.backend.session() as client:
+            batch_results = await asyncio.gather(*[
+                self.extract_topics_with_retry_async(client, batch, topics_snapshot) for batch in jobs
+            ])
+            
+            llm_results_by_day = []
+            position = 0
+            for date_str, local_results, batches, context in days:
+                llm_results = []
+                for batch_result in batch_results[position:position + len(batches)]:
+                    llm_results.extend(batch_result.get('review_analysis', []))
+                    if batch_result.get('new_canonical_topics'):
+                        self.canonical_topics.update(batch_result['new_canonical_topics'])
+                position += len(batches)
+                llm_results_by_day.append(llm_results)
+            
+            if self.cascade:
+                llm_results_by_day = await self._escalate_async(client, days, llm_results_by_day, topics_snapshot)
+            else:
+                self._tier(self.model)['reviews'] += sum(len(results) for results in llm_results_by_day)
+        
+        results_by_date = {}
+        for (date_str, local_results, _, context), llm_results in zip(days, llm_results_by_day):
+            results_by_date[date_str] = self.finalize_daily_results(date_str, local_results, llm_results, context)
+        
+        return results_by_date
+    
+    async def _escalate_async(self, client, days, llm_results_by_day, topic_table):
+        """Cascade for the async path: every day's low-confidence reviews go out concurrently"""
+        strong_model = self.config.LLM_CASCADE_STRONG_MODEL
+        day_batches = [
+            self._escalation_batches(self._low_confidence(llm_results, context['sent_reviews']), topic_table)
+            for (_, _, _, context), llm_results in zip(days, llm_results_by_day)
+        ]
+        jobs = [batch for batches in day_batches for batch in batches]
+        if jobs:
+            print(f"⬆️ Escalating {sum(len(batch) for batch in jobs)} low-confidence reviews to {strong_model} "
+                  f"in {len(jobs)} batches...")
+        
+        strong_results = await asyncio.gather(*[
+            self.extract_topics_with_retry_async(client, batch, topic_table, model=strong_model) for batch in jobs
+        ])
+        
+        escalated, position = [], 0
+        for batches, llm_results in zip(day_batches, llm_results_by_day):
+            day_strong = []
+            for result in strong_results[position:position + len(batches)]:
+                day_strong.extend(result.get('review_analysis', []))
+                if result.get('new_canonical_topics'):
+                    self.canonical_topics.update(result['new_canonical_topics'])
+            position += len(batches)
+            escalated.append(self._apply_escalation(llm_results, day_strong))
+        return escalated
@@ -0,0 +1,64 @@
+# src/triage.py - Rule-based triage that labels trivial reviews without the LLM
+import re
+from config import Config
+
+class ReviewTriage:
+    """Label generic praise/complaints locally; everything else goes to the LLM"""
+    
+    def __init__(self, rules=None, generic_words=None, max_words=None):
+        config = Config()
+        self.max_words = max_words or config.TRIAGE_MAX_WORDS
+        self.generic_words = set(generic_words or config.TRIAGE_GENERIC_WORDS)
+        self.rules = [
+            {
+                'regex': re.compile(rule['pattern']),
+                'topic': rule['topic'],
+                'min_score': rule.get('min_score', 1),
+                'max_score': rule.get('max_score', 5),
+                'confidence': rule.get('confidence', 0.8)
+            }
+            for rule in (rules or config.TRIAGE_RULES)
+        ]
+    
+    def classify(self, review):
+        """Return a local analysis for a trivial review, or None to send it to the LLM"""
+        text = review['cleaned_content']
+        words = re.findall(r'[\w-]+', text)
+        if not words or len(words) > self.max_words:
+            return None
+        
+        score = review.get('score') or 0
+        
+        for rule in self.rules:
+            if rule['min_score'] <= score <= rule['max_score'] and rule['regex'].search(text):
+                return self._analysis(review, rule['topic'], rule['confidence'], 'triage_rule')
+        
+        # Star-score heuristic: short reviews made only of generic words carry
+        # no issue beyond their rating
+        if all(word in self.generic_words for word in words):
+            if score >= 4:
+                return self._analysis(review, "App working well", 0.75, 'triage_stars')
+            if score <= 2:
+                return self._analysis(review, "General feedback", 0.6, 'triage_stars')
+        
+        return None
+    
+    def _analysis(self, review, topic, confidence, source):
+        return {
+            'review_id': review['reviewId'],
+            'identified_topics': [topic],
+            'confidence': confidence,
+            'source': source
+        }
+    
+    def split(self, reviews):
+        """Return (local_results, llm_reviews) for a list of reviews"""
+        local_results = []
+        llm_reviews = []
+        for review in reviews:
+            analysis = self.classify(review)
+            if analysis is None:
+                llm_reviews.append(review)
+            else:
+                local_results.append(analysis)
+        return local_results, llm_reviews
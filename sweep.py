@@ -0,0 +1,39 @@
+# sweep.py - Nightly collection sweep over every tracked app and locale
+import argparse
+from datetime import datetime, timedelta
+
+from config import Config
+from src.collection_scheduler import CollectionScheduler
+from src.review_store import SQLiteReviewStore
+
+def main():
+    cfg = Config()
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    
+    parser = argparse.ArgumentParser(description="Collect reviews for all tracked apps and locales")
+    parser.add_argument("--start", default=yesterday, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=yesterday, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=cfg.COLLECTION_WORKERS, help="Concurrent fetches")
+    args = parser.parse_args()
+    
+    print(f"🚀 Sweeping {len(cfg.TRACKED_APPS)} apps × {len(cfg.TRACKED_LOCALES)} locales")
+    print(f"📅 Date range: {args.start} → {args.end}")
+    print("=" * 60)
+    
+    store = SQLiteReviewStore() if cfg.USE_REVIEW_STORE else None
+    scheduler = CollectionScheduler(max_workers=args.workers, store=store)
+    try:
+        results = scheduler.run(args.start, args.end)
+    finally:
+        if store:
+            store.close()
+    
+    total = sum(sum(counts.values()) for counts in results.values())
+    print(f"\n📈 Total reviews collected: {total}")
+    if store:
+        print(f"📁 Data saved in: {store.path}")
+    else:
+        print("📁 Data saved in: data/raw_reviews/<app_id>/<lang>_<country>/")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# test_analyzer_offline.py - Topic analyzer checks on the local stub backend (no network, no API key)
+import asyncio
+import os
+import tempfile
+from collections import Counter
+
+from config import Config
+from offline_helpers import offline_config, sample_reviews
+from src.llm_backend import LLMBackend, StubBackend, build_response
+
+class FailingBackend(LLMBackend):
+    """Counts calls; every call raises, like an endpoint that is down"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def create(self, model, messages, **params):
+        self.calls += 1
+        raise RuntimeError("backend unavailable")
+
+class GarbageBackend(LLMBackend):
+    """Counts calls; every answer arrives but is not JSON"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def create(self, model, messages, **params):
+        self.calls += 1
+        return build_response(model, "I'm sorry, but I can't help with that request.", stream=params.get('stream', False))
+
+class VagueCheapModelBackend(StubBackend):
+    """Stub where the cheap cascade model only ever says 'General feedback'"""
+    
+    def answer(self, model, prompt, structured):
+        answer = super().answer(model, prompt, structured)
+        if model == Config.LLM_CASCADE_CHEAP_MODEL:
+            for entry in answer.get('a', []):
+                entry.update({"t": [], "n": ["General feedback"], "c": 0.5})
+        return answer
+
+def offline_analyzer(backend=None):
+    """Analyzer on the stub backend; tests using it run under offline_config"""
+    from src.topic_analyzer import AgenticTopicAnalyzer
+    
+    return AgenticTopicAnalyzer(backend=backend or StubBackend())
+
+@offline_config()
+def test_empty_day():
+    """An empty list or iterator of reviews is an empty day, not a ZeroDivisionError"""
+    analyzer = offline_analyzer()
+    
+    assert analyzer.process_daily_reviews('2025-01-01', reviews=[]) == []
+    assert analyzer.process_daily_reviews('2025-01-01', reviews=iter([])) == []
+    print("✅ Empty days return no results")
+
+@offline_config()
+def test_failing_backend_is_not_bisected():
+    """A batch whose request raises is not re-sent or split: one call, all fallback"""
+    backend = FailingBackend()
+    analyzer = offline_analyzer(backend)
+    batch = sample_reviews(32)
+    
+    result = analyzer.extract_topics_with_retry(batch)
+    
+    assert backend.calls == 1, backend.calls
+    assert analyzer.retry_stats['splits'] == 0
+    assert len(result['review_analysis']) == 32
+    assert all(analysis['source'] == 'fallback' for analysis in result['review_analysis'])
+    print(f"✅ Failing backend: {backend.calls} call for a 32-review batch")
+
+@offline_config()
+def test_bad_answers_bounded_calls():
+    """Unparseable answers are retried and bisected, but splits use up attempts too"""
+    backend = GarbageBackend()
+    analyzer = offline_analyzer(backend)
+    batch = sample_reviews(32)
+    
+    result = analyzer.extract_topics_with_retry(batch)
+    
+    limit = 2 ** (Config.LLM_BATCH_MAX_RETRIES + 1) - 1
+    assert backend.calls <= limit, (backend.calls, limit)
+    assert len(result['review_analysis']) == 32
+    assert analyzer.retry_stats['fallback_reviews'] == 32
+    print(f"✅ Garbage answers: {backend.calls} calls (limit {limit}), {analyzer.retry_stats['splits']} splits")
+
+def streamed_counts(analyzer):
+    """Attach an on_result that keeps (date, topic) counts the way the report generator does"""
+    counts = Counter()
+    corrections = []
+    
+    def on_result(date_str, analysis, previous_topics):
+        if previous_topics is not None:
+            corrections.append(analysis['review_id'])
+        counts.subtract((date_str, topic) for topic in previous_topics or [])
+        counts.update((date_str, topic) for topic in analysis['identified_topics'])
+    
+    analyzer.on_result = on_result
+    return counts, corrections
+
+def final_counts(results_by_date):
+    return Counter(
+        (date_str, topic) for date_str, results in results_by_date.items()
+        for analysis in results for topic in analysis['identified_topics']
+    )
+
+@offline_config(LLM_CASCADE_ENABLED=True)
+def test_stream_corrections_match_final_results():
+    """Previews replaced by escalation are corrected, so streamed counts equal the final ones"""
+    days = {'2025-01-01': sample_reviews(12, "a"), '2025-01-02': sample_reviews(9, "b")}
+    
+    analyzer = offline_analyzer(VagueCheapModelBackend())
+    counts, corrections = streamed_counts(analyzer)
+    results = asyncio.run(analyzer.process_range_async(days))
+    assert corrections, "escalation should have corrected the cheap-model previews"
+    assert +counts == final_counts(results)
+    
+    # The same analyzer again, serially: the stream starts from scratch
+    counts, corrections = streamed_counts(analyzer)
+    serial = {date_str: analyzer.process_daily_reviews(date_str, reviews=reviews) for date_str, reviews in days.items()}
+    assert +counts == final_counts(serial)
+    print(f"✅ Streamed counts match final results ({len(corrections)} corrections on the serial run)")
+
+def test_dedup_does_not_cache_bad_answers():
+    """A merge answer that fails to parse is not cached, so the next run asks again"""
+    from src.deduplicator import OptimizedTopicDeduplicator
+    from src.llm_cache import LLMResponseCache
+    
+    backend = GarbageBackend()
+    deduplicator = OptimizedTopicDeduplicator(backend=backend)
+    deduplicator.llm_cache = LLMResponseCache(path=os.path.join(tempfile.mkdtemp(), "llm_cache.json"))
+    topics = ["Late delivery", "Delivery delay", "App crash", "Crashes on open", "Refund pending", "Double charge"]
+    
+    assert deduplicator.batch_merge_topics(topics) == {}
+    assert deduplicator.batch_merge_topics(topics) == {}
+    assert backend.calls == 2, backend.calls
+    print("✅ Unparseable merge answers are not cached")
+
+if __name__ == "__main__":
+    test_empty_day()
+    test_failing_backend_is_not_bisected()
+    test_bad_answers_bounded_calls()
+    test_stream_corrections_match_final_results()
+    test_dedup_does_not_cache_bad_answers()
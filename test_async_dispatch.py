@@ -0,0 +1,57 @@
+# test_async_dispatch.py - Concurrent batch dispatch against the local fake OpenAI server
+import asyncio
+import time
+
+from config import Config
+from fake_openai_server import start_server
+from offline_helpers import offline_config, sample_reviews
+from src.llm_backend import OpenAIBackend
+
+DAYS = 30
+REVIEWS_PER_DAY = 12
+LATENCY = 1.0
+JITTER = 0.5
+
+def sample_days():
+    days = {}
+    for day in range(DAYS):
+        date_str = f"2025-03-{day + 1:02d}"
+        days[date_str] = sample_reviews(REVIEWS_PER_DAY, prefix=f"{date_str}-", offset=day)
+    return days
+
+def run_range(base_url):
+    """One async run over all days; returns (results, canonical topics, seconds)"""
+    from src.topic_analyzer import AgenticTopicAnalyzer
+    
+    analyzer = AgenticTopicAnalyzer(backend=OpenAIBackend(api_key="fake", base_url=base_url))
+    start = time.perf_counter()
+    results = asyncio.run(analyzer.process_range_async(sample_days(), batch_size=Config.BATCH_SIZE))
+    return results, sorted(analyzer.canonical_topics), time.perf_counter() - start
+
+@offline_config(TRIAGE_ENABLED=False, NEAR_DUP_ENABLED=False)
+def test_async_results_in_order_and_deterministic():
+    """Jittered latencies reorder completions, but results and topics come out the same"""
+    server, base_url = start_server(latency=LATENCY, jitter=JITTER, seed=1)
+    try:
+        first, first_topics, seconds = run_range(base_url)
+        calls = server.limiter.requests
+        second, second_topics, _ = run_range(base_url)
+    finally:
+        server.shutdown()
+    
+    days = sample_days()
+    assert list(first) == list(days), "days must come back in input order"
+    for date_str, reviews in days.items():
+        assert [analysis['review_id'] for analysis in first[date_str]] == [review['reviewId'] for review in reviews]
+    
+    assert first == second, "results differ between runs"
+    assert first_topics == second_topics, "canonical topics differ between runs"
+    print(f"✅ {DAYS} days in order and identical across runs ({seconds:.2f}s, {len(first_topics)} topics)")
+    
+    # A 30-day run should take about as long as the slowest few calls, not their sum
+    slowest_few = 4 * (LATENCY + JITTER)
+    assert calls >= DAYS and seconds < slowest_few, (calls, seconds, slowest_few)
+    print(f"✅ {calls} calls in {seconds:.2f}s (slowest few calls: {slowest_few:.2f}s, serial ≥{calls * (LATENCY - JITTER):.2f}s)")
+
+if __name__ == "__main__":
+    test_async_results_in_order_and_deterministic()
@@ -0,0 +1,87 @@
+# test_clean_text_parity.py - clean_text / clean_texts must match the original implementation exactly
+import os
+import tempfile
+
+import pandas as pd
+
+from benchmark_clean_text import reference_clean_text, synthetic_reviews
+from src.preprocessor import CleanTextCache, ReviewPreprocessor
+
+EDGE_CASES = [
+    None, "", "ok", "a b c d e f g h",
+    "Visit https://amzn.to/ABC_12?x=%2F%zz now please!!",
+    "see http://example.com/<b>x</b> and HTTP://SHOUTY.COM too",
+    "price was $20 (100%) off... not really; #fail @support",
+    "naïve über café — “smart quotes” and 很好 😀👍🏽",
+    "tabs\tand\nnewlines\r\nand no-break spaces everywhere",
+    "under_score words_and-hyphens re-order e-mail",
+    "<div class='x'>Great <i>app</i></div> <unclosed",
+    "%41%42 http://x.y/%4 https://",
+]
+
+def check(texts, label):
+    expected = [reference_clean_text(text) for text in texts]
+    preprocessor = ReviewPreprocessor()
+    
+    single = [preprocessor.clean_text(text) for text in texts]
+    batch = preprocessor.clean_texts(texts)
+    for i, text in enumerate(texts):
+        assert single[i] == expected[i], f"clean_text differs for {text!r}: {single[i]!r} != {expected[i]!r}"
+        assert batch[i] == expected[i], f"clean_texts differs for {text!r}: {batch[i]!r} != {expected[i]!r}"
+    print(f"✅ {label}: {len(texts)} texts identical to the original clean_text")
+
+def test_edge_cases():
+    check(EDGE_CASES, "Edge cases")
+
+def test_synthetic_reviews():
+    check(synthetic_reviews(20_000), "Synthetic reviews")
+
+def test_series_keeps_index():
+    texts = synthetic_reviews(500, seed=7)
+    series = pd.Series(texts, index=range(1000, 1500), name="content")
+    
+    cleaned = ReviewPreprocessor().clean_texts(series)
+    assert isinstance(cleaned, pd.Series)
+    assert list(cleaned.index) == list(series.index) and cleaned.name == "content"
+    assert list(cleaned) == [reference_clean_text(text) for text in texts]
+    print("✅ pandas Series: same values, index and name")
+
+def test_cached_cleaning():
+    """Cold and warm runs through the persistent cache give the original output"""
+    texts = synthetic_reviews(2_000, seed=11) + EDGE_CASES
+    expected = [reference_clean_text(text) for text in texts]
+    cache_path = os.path.join(tempfile.mkdtemp(), "clean_text.db")
+    
+    cold = ReviewPreprocessor(cache_path=cache_path)
+    assert cold.clean_texts(texts) == expected
+    cold.save_cache()
+    
+    warm = ReviewPreprocessor(cache_path=cache_path)
+    assert warm.clean_texts(texts) == expected
+    assert warm.cache.misses == 0 and warm.cache.hits > 0
+    print(f"✅ Clean text cache: cold and warm runs identical ({warm.cache.hits} warm hits)")
+
+def test_cache_bounded():
+    """Only new texts are written, and the least recently used beyond max_entries are evicted"""
+    cache_path = os.path.join(tempfile.mkdtemp(), "clean_text.db")
+    texts = [f"review number {i} about late delivery" for i in range(10)]
+    
+    cache = CleanTextCache(cache_path, max_entries=5)
+    for text in texts:
+        cache.clean(text)
+    cache.save()
+    assert cache.conn.execute("SELECT COUNT(*) FROM clean_texts").fetchone()[0] == 5
+    cache.close()
+    
+    cache = CleanTextCache(cache_path, max_entries=5)
+    assert [cache.lookup(text) is not None for text in texts] == [False] * 5 + [True] * 5
+    assert cache.clean(texts[-1]) == reference_clean_text(texts[-1]) and not cache.pending
+    cache.close()
+    print("✅ Clean text cache: capped at max_entries, newest kept")
+
+if __name__ == "__main__":
+    test_edge_cases()
+    test_synthetic_reviews()
+    test_series_keeps_index()
+    test_cached_cleaning()
+    test_cache_bounded()
@@ -0,0 +1,95 @@
+# test_fast_classifier.py - Seed topic classifier: training, confident local labels, persistence, label log
+import os
+import random
+import tempfile
+
+from config import Config
+from src.fast_classifier import OTHER_LABEL, SeedTopicClassifier, load_training_data, record_llm_labels
+
+TOPICS = ["Late delivery", "Payment issues", "App crashes frequently"]
+PHRASES = {
+    "Late delivery": ["delivery was very late", "order arrived two hours late", "courier took forever to deliver"],
+    "Payment issues": ["payment failed at checkout", "card was charged twice", "upi payment declined again"],
+    "App crashes frequently": ["app crashes on launch", "keeps crashing when i open cart", "app freezes and crashes"],
+    OTHER_LABEL: ["wish there were more restaurants", "dark mode would be nice", "please add hindi language"],
+}
+FILLERS = ["today", "yesterday", "again", "on sunday", "for my family", "in bangalore", "this week", "as usual"]
+
+def labelled_texts(count, seed):
+    rng = random.Random(seed)
+    texts = []
+    labels = []
+    for i in range(count):
+        label = list(PHRASES)[i % len(PHRASES)]
+        texts.append(f"{rng.choice(PHRASES[label])} {rng.choice(FILLERS)} {rng.choice(FILLERS)}")
+        labels.append(label)
+    return texts, labels
+
+def trained_classifier():
+    texts, labels = labelled_texts(400, seed=1)
+    return SeedTopicClassifier(topics=TOPICS, n_features=2 ** 12).fit(texts, labels, epochs=20)
+
+def test_untrained_sends_everything_to_the_llm():
+    reviews = [{'reviewId': "r1", 'cleaned_content': "delivery was very late"}]
+    local_results, llm_reviews = SeedTopicClassifier(topics=TOPICS, n_features=2 ** 12).split(reviews)
+    assert local_results == [] and llm_reviews == reviews
+    print("✅ Untrained classifier labels nothing locally")
+
+def test_confident_predictions_stay_local():
+    classifier = trained_classifier()
+    texts, labels = labelled_texts(80, seed=2)
+    
+    predictions = classifier.predict(texts)
+    accuracy = sum(label == expected for (label, _), expected in zip(predictions, labels)) / len(labels)
+    assert accuracy >= 0.95, accuracy
+    
+    reviews = [{'reviewId': f"r{i}", 'cleaned_content': text} for i, text in enumerate(texts)]
+    local_results, llm_reviews = classifier.split(reviews)
+    assert len(local_results) + len(llm_reviews) == len(reviews)
+    assert all(analysis['source'] == 'fast_classifier' and analysis['confidence'] >= Config.FAST_CLASSIFIER_THRESHOLD for analysis in local_results)
+    assert all(analysis['identified_topics'][0] in TOPICS for analysis in local_results), "OTHER is never labelled locally"
+    other_ids = {f"r{i}" for i, label in enumerate(labels) if label == OTHER_LABEL}
+    assert other_ids <= {review['reviewId'] for review in llm_reviews}
+    
+    # A threshold nothing can reach sends every review to the LLM
+    assert classifier.split(reviews, threshold=1.01)[0] == []
+    print(f"✅ Accuracy {accuracy:.0%}; {len(local_results)}/{len(reviews)} labelled locally, non-seed reviews left for the LLM")
+
+def test_save_and_load():
+    classifier = trained_classifier()
+    texts, _ = labelled_texts(20, seed=3)
+    path = os.path.join(tempfile.mkdtemp(), "models", "classifier.npz")
+    
+    classifier.save(path)
+    loaded = SeedTopicClassifier.load(path)
+    assert loaded.topics == TOPICS and loaded.trained
+    assert [label for label, _ in loaded.predict(texts)] == [label for label, _ in classifier.predict(texts)]
+    print("✅ Saved model predicts the same after loading")
+
+def test_label_log_round_trip():
+    """Only reviews in reviews_by_id are logged; the latest entry per review wins"""
+    path = os.path.join(tempfile.mkdtemp(), "labels.jsonl")
+    reviews_by_id = {
+        "a": {'reviewId': "a", 'cleaned_content': "payment failed at checkout"},
+        "b": {'reviewId': "b", 'cleaned_content': "dark mode would be nice"},
+    }
+    
+    record_llm_labels([
+        {'review_id': "a", 'identified_topics': ["General feedback"]},
+        {'review_id': "b", 'identified_topics': ["Feature request"]},
+        {'review_id': "missing", 'identified_topics': ["Late delivery"]},
+    ], reviews_by_id, path)
+    record_llm_labels([{'review_id': "a", 'identified_topics': ["Feature request", "Payment issues"]}], reviews_by_id, path)
+    
+    texts, labels = load_training_data(path, topics=TOPICS)
+    assert sorted(zip(texts, labels)) == [
+        ("dark mode would be nice", OTHER_LABEL),
+        ("payment failed at checkout", "Payment issues"),
+    ]
+    print("✅ Label log: unknown reviews skipped, latest entry wins, first seed topic is the label")
+
+if __name__ == "__main__":
+    test_untrained_sends_everything_to_the_llm()
+    test_confident_predictions_stay_local()
+    test_save_and_load()
+    test_label_log_round_trip()
@@ -0,0 +1,125 @@
+# test_llm_cache.py - LLM response cache (keys, TTL, LRU eviction, bypass) and per-review analysis cache
+import os
+import tempfile
+import time
+
+from src.llm_cache import LLMResponseCache, ReviewAnalysisCache
+
+MODEL = "gpt-4o-mini"
+
+def messages(text):
+    return [{"role": "system", "content": "Extract topics."}, {"role": "user", "content": text}]
+
+def temp_path(name):
+    return os.path.join(tempfile.mkdtemp(), name)
+
+def test_keys():
+    """Whitespace and parameter order don't change the key; model, params and content do"""
+    key = LLMResponseCache.make_key(MODEL, messages("late  delivery\n"), temperature=0.1, max_tokens=100)
+    
+    assert key == LLMResponseCache.make_key(MODEL, messages("late delivery"), max_tokens=100, temperature=0.1)
+    assert key != LLMResponseCache.make_key("gpt-4o", messages("late delivery"), temperature=0.1, max_tokens=100)
+    assert key != LLMResponseCache.make_key(MODEL, messages("late delivery"), temperature=0.2, max_tokens=100)
+    assert key != LLMResponseCache.make_key(MODEL, messages("early delivery"), temperature=0.1, max_tokens=100)
+    print("✅ Cache keys normalise whitespace and parameter order")
+
+def test_hit_and_miss():
+    cache = LLMResponseCache(path=temp_path("llm.db"), ttl_seconds=0, max_entries=0, bypass=False)
+    
+    assert cache.get(MODEL, messages("late delivery"), temperature=0.1) is None
+    cache.put(MODEL, messages("late delivery"), '{"a": []}', temperature=0.1)
+    cache.put(MODEL, messages("empty answer"), "", temperature=0.1)
+    
+    assert cache.get(MODEL, messages("late delivery"), temperature=0.1) == '{"a": []}'
+    assert cache.get(MODEL, messages("empty answer"), temperature=0.1) is None, "empty answers are not cached"
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+    cache.close()
+    print("✅ Hits, misses and empty answers")
+
+def test_ttl():
+    """Entries older than the TTL are misses and are dropped on eviction"""
+    cache = LLMResponseCache(path=temp_path("llm.db"), ttl_seconds=60, max_entries=0, bypass=False)
+    cache.put(MODEL, messages("fresh"), "fresh answer")
+    cache.put(MODEL, messages("stale"), "stale answer")
+    
+    stale_key = LLMResponseCache.make_key(MODEL, messages("stale"))
+    cache.conn.execute("UPDATE responses SET created_at = ? WHERE key = ?", (time.time() - 120, stale_key))
+    cache.conn.commit()
+    
+    assert cache.get(MODEL, messages("stale")) is None
+    assert cache.get(MODEL, messages("fresh")) == "fresh answer"
+    assert cache.evict() == 1
+    assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 1
+    cache.close()
+    print("✅ TTL: stale entries missed and evicted")
+
+def test_lru_eviction():
+    """Beyond max_entries the least recently used go first; a hit counts as a use"""
+    cache = LLMResponseCache(path=temp_path("llm.db"), ttl_seconds=0, max_entries=3, bypass=False)
+    texts = [f"review {i}" for i in range(5)]
+    for i, text in enumerate(texts):
+        cache.put(MODEL, messages(text), f"answer {i}")
+        # Pin access times so the order doesn't depend on clock resolution
+        key = LLMResponseCache.make_key(MODEL, messages(text))
+        cache.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (1000.0 + i, key))
+    cache.conn.commit()
+    
+    assert cache.get(MODEL, messages("review 0")) == "answer 0"   # now the most recently used
+    assert cache.evict() == 2
+    
+    kept = [text for text in texts if cache.get(MODEL, messages(text)) is not None]
+    assert kept == ["review 0", "review 3", "review 4"], kept
+    cache.close()
+    print("✅ LRU: capped at max_entries, recently read entries kept")
+
+def test_bypass_still_stores():
+    path = temp_path("llm.db")
+    bypassed = LLMResponseCache(path=path, ttl_seconds=0, max_entries=0, bypass=True)
+    bypassed.put(MODEL, messages("late delivery"), "fresh answer")
+    
+    assert bypassed.get(MODEL, messages("late delivery")) is None
+    assert bypassed.misses == 1 and bypassed.hits == 0
+    bypassed.close()
+    
+    cache = LLMResponseCache(path=path, ttl_seconds=0, max_entries=0, bypass=False)
+    assert cache.get(MODEL, messages("late delivery")) == "fresh answer"
+    cache.close()
+    print("✅ Bypass skips lookups but fresh answers are still stored")
+
+def test_analysis_cache():
+    """Only LLM analyses are stored; edited reviews and other prompt versions are pending again"""
+    cache = ReviewAnalysisCache(path=temp_path("analyses.db"))
+    reviews = [
+        {'reviewId': "a", 'cleaned_content': "delivery was very late"},
+        {'reviewId': "b", 'cleaned_content': "payment failed twice"},
+        {'reviewId': "c", 'cleaned_content': "great app"},
+    ]
+    version = ReviewAnalysisCache.version_key(2, MODEL, ["Late delivery"])
+    
+    cached, pending = cache.split(reviews, version)
+    assert cached == [] and pending == reviews
+    
+    stored = cache.store([
+        {'review_id': "a", 'identified_topics': ["Late delivery"], 'confidence': 0.9, 'source': 'llm'},
+        {'review_id': "b", 'identified_topics': ["Payment issues"], 'confidence': 0.8, 'source': 'llm'},
+        {'review_id': "c", 'identified_topics': ["App working well"], 'confidence': 0.9, 'source': 'triage_rule'},
+    ], {review['reviewId']: review for review in reviews}, version)
+    assert stored == 2
+    
+    edited = dict(reviews[1], cleaned_content="payment failed three times")
+    cached, pending = cache.split([reviews[0], edited, reviews[2]], version)
+    assert cached == [{'identified_topics': ["Late delivery"], 'confidence': 0.9, 'review_id': "a", 'source': 'analysis_cache'}]
+    assert [review['reviewId'] for review in pending] == ["b", "c"]
+    
+    other_version = ReviewAnalysisCache.version_key(3, MODEL, ["Late delivery"])
+    assert cache.split(reviews, other_version)[0] == []
+    cache.close()
+    print("✅ Analysis cache: LLM results reused until the review or prompt version changes")
+
+if __name__ == "__main__":
+    test_keys()
+    test_hit_and_miss()
+    test_ttl()
+    test_lru_eviction()
+    test_bypass_still_stores()
+    test_analysis_cache()
@@ -0,0 +1,81 @@
+# test_malformed_answers.py - Validity and fallback stats for each kind of malformed LLM answer
+from config import Config
+from fake_openai_server import MALFORMED_KINDS, start_server
+from offline_helpers import offline_config, sample_reviews
+from src.llm_backend import OpenAIBackend
+
+BATCH_SIZE = 8
+
+@offline_config()
+def run_batch(kind):
+    """One batch against a server that damages every answer with `kind` (None = clean answers)"""
+    from src.topic_analyzer import AgenticTopicAnalyzer
+    
+    server, base_url = start_server(latency=0.0, malformed_rate=1.0 if kind else 0.0,
+                                    malformed_kinds=[kind] if kind else None, seed=3)
+    try:
+        analyzer = AgenticTopicAnalyzer(backend=OpenAIBackend(api_key="fake", base_url=base_url))
+        result = analyzer.extract_topics_with_retry(sample_reviews(BATCH_SIZE))
+    finally:
+        server.shutdown()
+    
+    fallbacks = sum(analysis.get('source') == 'fallback' for analysis in result['review_analysis'])
+    assert sorted(analysis['review_id'] for analysis in result['review_analysis']) == sorted(
+        review['reviewId'] for review in sample_reviews(BATCH_SIZE)), f"{kind}: every review needs exactly one analysis"
+    assert analyzer.retry_stats['fallback_reviews'] == fallbacks, f"{kind}: fallback stat disagrees with result"
+    
+    calls = server.limiter.requests
+    assert calls <= 2 ** (Config.LLM_BATCH_MAX_RETRIES + 1) - 1, f"{kind}: {calls} calls"
+    return analyzer, fallbacks, calls
+
+def test_clean_answers():
+    analyzer, fallbacks, calls = run_batch(None)
+    assert analyzer.validity_summary() == {'batches': 1, 'valid_batches': 1, 'reviews': BATCH_SIZE, 'returned': BATCH_SIZE}
+    assert fallbacks == 0 and calls == 1
+    print("✅ clean: 1 valid batch, no fallback")
+
+def test_unparseable_answers_fall_back():
+    """Truncated JSON and refusals have nothing to salvage: invalid, retried, then fallback"""
+    for kind in ("truncated", "refusal"):
+        analyzer, fallbacks, calls = run_batch(kind)
+        first = analyzer.batch_validity[0]
+        assert not first['valid'] and first['error'] and first['returned'] == 0, (kind, first)
+        assert analyzer.validity_summary()['valid_batches'] == 0
+        assert fallbacks == BATCH_SIZE, (kind, fallbacks)
+        assert analyzer.retry_stats['splits'] > 0, "outright failures should be bisected"
+        print(f"✅ {kind}: invalid, {calls} calls, {fallbacks}/{BATCH_SIZE} fallback")
+
+def test_off_schema_answers_recovered():
+    """Prose-wrapped JSON and wrong field types fail typed validation but the lenient parse recovers them"""
+    for kind in ("prose", "wrong_types"):
+        analyzer, fallbacks, calls = run_batch(kind)
+        first = analyzer.batch_validity[0]
+        assert not first['valid'] and first['error'], (kind, first)
+        assert first['returned'] == BATCH_SIZE, (kind, first)
+        assert fallbacks == 0 and calls == 1, (kind, fallbacks, calls)
+        print(f"✅ {kind}: invalid but recovered in 1 call ({first['error'][:40]}...)")
+
+def test_missing_entries_requeued():
+    """A valid answer that drops reviews: only the missing ones are re-sent"""
+    analyzer, fallbacks, calls = run_batch("missing")
+    first = analyzer.batch_validity[0]
+    assert first['valid'] and first['returned'] == BATCH_SIZE // 2, first
+    assert all(stats['valid'] for stats in analyzer.batch_validity)
+    # Each re-send only carries what was still missing, never the whole batch
+    assert [stats['reviews'] for stats in analyzer.batch_validity] == sorted(
+        (stats['reviews'] for stats in analyzer.batch_validity), reverse=True)
+    assert analyzer.retry_stats['splits'] == 0
+    assert 0 < fallbacks < BATCH_SIZE, fallbacks
+    print(f"✅ missing: valid, {calls} calls re-sending {[stats['reviews'] for stats in analyzer.batch_validity]}, {fallbacks} fallback")
+
+def test_every_kind_covered():
+    covered = {"truncated", "refusal", "prose", "wrong_types", "missing"}
+    assert covered == set(MALFORMED_KINDS), set(MALFORMED_KINDS) - covered
+    print(f"✅ All {len(MALFORMED_KINDS)} malformed kinds covered")
+
+if __name__ == "__main__":
+    test_clean_answers()
+    test_unparseable_answers_fall_back()
+    test_off_schema_answers_recovered()
+    test_missing_entries_requeued()
+    test_every_kind_covered()
@@ -0,0 +1,78 @@
+# test_near_duplicates.py - MinHash/LSH clustering and fan-out of near-duplicate reviews
+from offline_helpers import SAMPLE_TEXTS
+from src.near_duplicates import NearDuplicateCollapser
+
+# Long enough that changing the last word keeps Jaccard similarity above the 0.8 threshold
+TEMPLATE = ("ordered biryani from the app last night and the delivery partner took more than an hour "
+            "to arrive then the food was cold and the restaurant did not pick up when i called them "
+            "so i asked support for a refund and they said it would take {}")
+
+def make_review(review_id, text):
+    return {'reviewId': review_id, 'cleaned_content': text, 'score': 1}
+
+def sample_day():
+    return [
+        make_review("a", TEMPLATE.format("days")),
+        make_review("b", SAMPLE_TEXTS[1]),
+        make_review("c", TEMPLATE.format("weeks")),
+        make_review("d", TEMPLATE.format("days")),
+        make_review("e", SAMPLE_TEXTS[2]),
+    ]
+
+def test_clusters():
+    """Exact and near duplicates share a cluster rooted at the earliest review; distinct texts stay apart"""
+    collapser = NearDuplicateCollapser(threshold=0.8, num_perm=64, bands=16)
+    texts = [review['cleaned_content'] for review in sample_day()]
+    
+    similarity = collapser.jaccard(collapser.shingles(texts[0]), collapser.shingles(texts[2]))
+    assert similarity >= 0.8, similarity
+    assert collapser.jaccard(collapser.shingles(texts[1]), collapser.shingles(texts[4])) < 0.8
+    
+    assert collapser.cluster(texts) == [[0, 2, 3], [1], [4]]
+    assert NearDuplicateCollapser(threshold=0.8, num_perm=64, bands=16).cluster(texts) == [[0, 2, 3], [1], [4]]
+    print(f"✅ Near duplicates clustered (Jaccard {similarity:.2f}), distinct texts kept apart")
+
+def test_high_threshold_keeps_near_duplicates_apart():
+    collapser = NearDuplicateCollapser(threshold=0.99, num_perm=64, bands=16)
+    texts = [review['cleaned_content'] for review in sample_day()]
+    
+    assert collapser.cluster(texts) == [[0, 3], [1], [2], [4]]
+    print("✅ Threshold 0.99: only exact duplicates collapse")
+
+def test_empty_and_short_texts():
+    collapser = NearDuplicateCollapser(threshold=0.8, num_perm=64, bands=16)
+    
+    assert collapser.cluster([]) == []
+    assert collapser.shingles("") == set() and collapser.shingles("ok fine") == {"ok fine"}
+    assert collapser.cluster(["", "", "late", "late", "cold"]) == [[0, 1], [2, 3], [4]]
+    print("✅ Empty and short texts: only exact matches collapse")
+
+def test_collapse_and_fan_out():
+    """One analysis per cluster goes out; every member gets its own copy back"""
+    collapser = NearDuplicateCollapser(threshold=0.8, num_perm=64, bands=16)
+    representatives, members = collapser.collapse(sample_day())
+    
+    assert [review['reviewId'] for review in representatives] == ["a", "b", "e"]
+    assert {key: [review['reviewId'] for review in value] for key, value in members.items()} == {"a": ["c", "d"]}
+    
+    results = [
+        {'review_id': review['reviewId'], 'identified_topics': [f"Topic {review['reviewId']}"], 'source': 'llm'}
+        for review in representatives
+    ]
+    expanded = collapser.fan_out(results, members)
+    
+    assert [analysis['review_id'] for analysis in expanded] == ["a", "c", "d", "b", "e"]
+    copies = [analysis for analysis in expanded if 'duplicate_of' in analysis]
+    assert [analysis['duplicate_of'] for analysis in copies] == ["a", "a"]
+    assert all(analysis['identified_topics'] == ["Topic a"] and analysis['source'] == 'llm' for analysis in copies)
+    
+    # Copies must not share the topic list with the representative
+    copies[0]['identified_topics'].append("Edited")
+    assert expanded[0]['identified_topics'] == ["Topic a"]
+    print(f"✅ Collapsed {len(sample_day())} reviews to {len(representatives)}, fanned back out to {len(expanded)}")
+
+if __name__ == "__main__":
+    test_clusters()
+    test_high_threshold_keeps_near_duplicates_apart()
+    test_empty_and_short_texts()
+    test_collapse_and_fan_out()
@@ -0,0 +1,152 @@
+# test_rate_controller.py - AIMD concurrency limit, Retry-After handling and slot accounting
+import asyncio
+import time
+
+import httpx
+import openai
+
+from src.rate_controller import AdaptiveConcurrencyController, parse_duration
+
+class FakeRaw:
+    """Stands in for a with_raw_response result"""
+    
+    def __init__(self, headers=None, body="ok", fail_parse=False):
+        self.headers = headers or {}
+        self.body = body
+        self.fail_parse = fail_parse
+    
+    def parse(self):
+        if self.fail_parse:
+            raise ValueError("unparseable body")
+        return self.body
+
+def rate_limit_error(headers):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return openai.RateLimitError("rate limited", response=httpx.Response(429, headers=headers, request=request), body=None)
+
+def controller(initial=4, max_retries=3):
+    return AdaptiveConcurrencyController(initial=initial, min_limit=1, max_limit=8, max_retries=max_retries)
+
+def test_parse_duration():
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("2") == 2.0
+    assert parse_duration("") is None and parse_duration("soon") is None
+    print("✅ Reset durations parsed")
+
+def test_additive_increase():
+    """Each success adds 1/limit, so the limit grows by about one per limit's worth of calls"""
+    rate = controller(initial=4)
+    for _ in range(4):
+        rate.acquire()
+        rate.on_success({})
+    
+    assert 4.9 < rate.limit < 5.0, rate.limit
+    assert rate.in_flight == 0 and rate.successes == 4
+    
+    for _ in range(200):
+        rate.acquire()
+        rate.on_success({})
+    assert rate.limit == 8, "capped at max_limit"
+    print("✅ Additive increase, capped at max_limit")
+
+def test_halves_when_quota_runs_low():
+    rate = controller(initial=8)
+    rate.acquire()
+    rate.on_success({
+        'x-ratelimit-limit-requests': "500", 'x-ratelimit-remaining-requests': "20",
+        'x-ratelimit-limit-tokens': "200000", 'x-ratelimit-remaining-tokens': "150000",
+    })
+    
+    assert rate.limit == 4
+    assert rate.remaining_requests == 20 and rate.remaining_tokens == 150000
+    print("✅ Limit halved when remaining requests drop below the watermark")
+
+def test_throttle_halves_and_honours_retry_after():
+    rate = controller(initial=8)
+    
+    rate.acquire()
+    start = time.monotonic()
+    rate.on_throttle({'retry-after': "2"})
+    assert rate.limit == 4 and rate.throttled == 1 and rate.in_flight == 0
+    assert 1.9 < rate.blocked_until - start <= 2.01
+    assert rate._try_acquire(0) > 1.5, "callers wait out Retry-After"
+    
+    rate.blocked_until = 0.0
+    rate.acquire()
+    start = time.monotonic()
+    rate.on_throttle({'retry-after-ms': "250", 'retry-after': "30"})
+    assert rate.limit == 2
+    assert rate.blocked_until - start < 0.3, "retry-after-ms wins over retry-after"
+    
+    rate.blocked_until = 0.0
+    rate.acquire()
+    rate.on_throttle({}, attempt=3)
+    assert rate.limit == 1 and rate.blocked_until - time.monotonic() > 7, "no header: exponential backoff"
+    
+    rate.blocked_until = 0.0
+    rate.acquire()
+    rate.on_throttle({}, attempt=3)
+    assert rate.limit == 1, "never below min_limit"
+    print("✅ Throttles halve the limit and pause callers for Retry-After")
+
+def test_admission_respects_limit():
+    rate = controller(initial=2)
+    rate.acquire()
+    rate.acquire()
+    
+    assert rate._try_acquire(0) is not None, "third request must wait"
+    rate.on_error()
+    assert rate._try_acquire(0) is None
+    print("✅ In-flight requests capped at the limit")
+
+def test_call_retries_throttles():
+    rate = controller(initial=4, max_retries=3)
+    attempts = []
+    
+    def create():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise rate_limit_error({'retry-after-ms': "10"})
+        return FakeRaw(body="answer")
+    
+    assert rate.call(create) == "answer"
+    assert len(attempts) == 3 and rate.retries == 2 and rate.throttled == 2 and rate.successes == 1
+    assert rate.in_flight == 0 and rate.limit == 2, "halved twice to 1, then +1/1"
+    
+    def always_throttled():
+        raise rate_limit_error({'retry-after-ms': "10"})
+    
+    try:
+        controller(max_retries=1).call(always_throttled)
+        raise AssertionError("expected the last RateLimitError to be raised")
+    except openai.RateLimitError:
+        pass
+    print("✅ call() retries throttled requests, then gives up after max_retries")
+
+def test_failed_parse_releases_slot():
+    """A request that succeeds but can't be parsed still gives its slot back"""
+    rate = controller(initial=1)
+    
+    for run in (lambda: rate.call(lambda: FakeRaw(fail_parse=True), tokens=100),
+                lambda: asyncio.run(rate.call_async(lambda: asyncio.sleep(0, FakeRaw(fail_parse=True)), tokens=100))):
+        try:
+            run()
+            raise AssertionError("expected the parse error to propagate")
+        except ValueError:
+            pass
+    
+    assert rate.in_flight == 0 and rate.reserved_tokens == 0
+    assert rate.metrics()['errors'] == 2
+    assert rate.call(lambda: FakeRaw(body="next")) == "next", "the slot is free again"
+    print("✅ Parse failures release the slot and count as errors")
+
+if __name__ == "__main__":
+    test_parse_duration()
+    test_additive_increase()
+    test_halves_when_quota_runs_low()
+    test_throttle_halves_and_honours_retry_after()
+    test_admission_respects_limit()
+    test_call_retries_throttles()
+    test_failed_parse_releases_slot()
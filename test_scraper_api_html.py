@@ -0,0 +1,95 @@
+# test_scraper_api_html.py - ScraperAPI path parses a saved rendered Play Store page (no network)
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from offline_helpers import config_overrides
+
+FIXTURE = "data/fixtures/play_store_reviews.html"
+
+def load_fixture():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+def make_collector():
+    from src.data_collector import ReviewDataCollector
+    
+    return ReviewDataCollector()
+
+def test_parse_reviews_html():
+    """Only cards dated date_str come back, in the raw review record shape"""
+    reviews = make_collector().parse_reviews_html(load_fixture(), "2025-07-24")
+    
+    assert [review['reviewId'] for review in reviews] == ["gp:AOqpTOE-1111", "gp:AOqpTOE-2222", "gp:AOqpTOE-3333"]
+    assert reviews[0] == {
+        'date': "2025-07-24",
+        'content': "Delivery partner was rude and the order arrived 45 minutes late. Food was cold & the packaging leaked.",
+        'score': 1,
+        'userName': "Priya Sharma",
+        'reviewId': "gp:AOqpTOE-1111",
+        'thumbsUpCount': 1234
+    }
+    assert reviews[1]['score'] == 4 and reviews[1]['thumbsUpCount'] == 3
+    assert reviews[1]['content'].startswith("Good app overall but the")
+    assert reviews[2]['content'] == "Très bien! Fast delivery 😀" and reviews[2]['thumbsUpCount'] == 0
+    print(f"✅ Parsed {len(reviews)} reviews for 2025-07-24 from the fixture")
+
+def test_parse_reviews_html_other_dates():
+    collector = make_collector()
+    html = load_fixture()
+    
+    older = collector.parse_reviews_html(html, "2025-07-23")
+    assert [review['reviewId'] for review in older] == ["gp:AOqpTOE-4444"] and older[0]['thumbsUpCount'] == 12
+    assert collector.parse_reviews_html(html, "2025-07-25") == []
+    print("✅ Other dates filtered; undated and placeholder cards skipped")
+
+class FakeScraperAPI(BaseHTTPRequestHandler):
+    """Serves the fixture like api.scraperapi.com, failing the first `failures` requests with 503"""
+    failures = 0
+    requests_seen = []
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        type(self).requests_seen.append(parse_qs(urlparse(self.path).query))
+        if type(self).failures > 0:
+            type(self).failures -= 1
+            self.send_error(503)
+            return
+        data = load_fixture().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+@config_overrides(SCRAPER_API_BACKOFF=0.0)
+def test_scraper_api_single_fetch_with_retry():
+    """One rendered page per day, retried on 503, and no second fetch through google-play-scraper"""
+    FakeScraperAPI.failures = 1
+    FakeScraperAPI.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeScraperAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    collector = make_collector()
+    collector.scraper_api_base = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    def second_fetch(*args):
+        raise AssertionError("fell back to a second fetch through google-play-scraper")
+    collector.collect_daily_reviews_gps = second_fetch
+    try:
+        reviews = collector.collect_reviews_with_scraper_api("com.application.zomato", "2025-07-24")
+    finally:
+        server.shutdown()
+    
+    assert len(reviews) == 3
+    assert len(FakeScraperAPI.requests_seen) == 2, "expected one 503 and one retried request"
+    query = FakeScraperAPI.requests_seen[-1]
+    assert query['render'] == ['true'] and "id=com.application.zomato" in query['url'][0]
+    print(f"✅ ScraperAPI path: {len(reviews)} reviews from one page, 503 retried once")
+
+if __name__ == "__main__":
+    test_parse_reviews_html()
+    test_parse_reviews_html_other_dates()
+    test_scraper_api_single_fetch_with_retry()
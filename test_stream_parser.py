@@ -0,0 +1,87 @@
+# test_stream_parser.py - Incremental array parsing of streamed answers, however the text is chunked
+import json
+import random
+
+from src.stream_parser import IncrementalArrayParser
+
+FULL_ANSWER = {
+    "review_analysis": [
+        {"review_id": "r1", "identified_topics": ["Late delivery"], "confidence": 0.9},
+        {"review_id": "r2", "identified_topics": ["Said \"never again\" {angry}"], "confidence": 0.7},
+        {"review_id": "r3", "identified_topics": ["Path C:\\orders\\ [refund]"], "confidence": 0.8},
+        {"review_id": "r4", "identified_topics": ["Emoji 😀 and } ] { ["], "confidence": 0.6},
+    ],
+    "new_topics_created": ["Said \"never again\" {angry}"],
+}
+COMPACT_ANSWER = '{"a": [[1, [3], 0.9], [2, ["App crash"], 0.6], {"r": 3, "t": [], "n": ["x]y"], "c": 0.5}]}'
+
+def feed_chunks(text, sizes):
+    """Feed text in chunks of the given sizes (cycled); return (elements, elements per feed)"""
+    parser = IncrementalArrayParser()
+    elements, per_feed = [], []
+    position, i = 0, 0
+    while position < len(text):
+        size = sizes[i % len(sizes)]
+        got = parser.feed(text[position:position + size])
+        elements.extend(got)
+        per_feed.append(len(got))
+        position += size
+        i += 1
+    return elements, per_feed
+
+def test_whole_answer():
+    text = json.dumps(FULL_ANSWER, ensure_ascii=False)
+    elements, _ = feed_chunks(text, [len(text)])
+    assert elements == FULL_ANSWER["review_analysis"]
+    print("✅ Whole answer in one chunk")
+
+def test_split_across_chunks():
+    """Every chunking, down to one character at a time, yields the same elements"""
+    text = json.dumps(FULL_ANSWER, ensure_ascii=False, indent=2)
+    expected = FULL_ANSWER["review_analysis"]
+    
+    elements, per_feed = feed_chunks(text, [1])
+    assert elements == expected
+    assert sum(1 for count in per_feed if count) == len(expected), "each element yielded as soon as it closes"
+    
+    rng = random.Random(5)
+    for _ in range(200):
+        sizes = [rng.randint(1, 40) for _ in range(10)]
+        assert feed_chunks(text, sizes)[0] == expected, sizes
+    print("✅ Entries split across chunks (1-char and 200 random chunkings)")
+
+def test_escapes_at_chunk_boundaries():
+    """A backslash or quote that ends a chunk doesn't confuse string tracking"""
+    text = json.dumps(FULL_ANSWER, ensure_ascii=False)
+    boundaries = [i for i, char in enumerate(text) if char in '\\"{}[]']
+    
+    for boundary in boundaries:
+        parser = IncrementalArrayParser()
+        elements = parser.feed(text[:boundary + 1]) + parser.feed(text[boundary + 1:])
+        assert elements == FULL_ANSWER["review_analysis"], (boundary, text[boundary - 10:boundary + 10])
+    print(f"✅ Escaped quotes and braces inside strings, split at all {len(boundaries)} boundaries")
+
+def test_compact_key_and_array_end():
+    elements, _ = feed_chunks(COMPACT_ANSWER, [3])
+    assert elements == json.loads(COMPACT_ANSWER)["a"]
+    
+    parser = IncrementalArrayParser()
+    assert parser.feed('{"review_analysis": [{"review_id": "r1"}], "more": [{"x": 1}]}') == [{"review_id": "r1"}]
+    assert parser.done and parser.feed('{"review_id": "r2"}') == [], "nothing after the array is yielded"
+    print("✅ Compact \"a\" key; parsing stops at the end of the array")
+
+def test_preamble_and_bad_elements():
+    """Text before the key is skipped and an element that doesn't decode is dropped"""
+    parser = IncrementalArrayParser()
+    assert parser.feed("Sure! Here is the JSON:\n```json\n{\"review_") == []
+    assert parser.feed('analysis": [{"review_id": "r1"}, {"review_id": r2}, ') == [{"review_id": "r1"}]
+    assert parser.feed('{"review_id": "r3"}]}\n```') == [{"review_id": "r3"}]
+    assert IncrementalArrayParser().feed('{"other": [1, 2]}') == []
+    print("✅ Preamble skipped, undecodable element dropped")
+
+if __name__ == "__main__":
+    test_whole_answer()
+    test_split_across_chunks()
+    test_escapes_at_chunk_boundaries()
+    test_compact_key_and_array_end()
+    test_preamble_and_bad_elements()
@@ -0,0 +1,81 @@
+# test_token_budget.py - Local token estimates, truncation and token-budget request packing
+from offline_helpers import sample_reviews
+from src.token_budget import TokenBudgetPacker, count_tokens, truncate_to_tokens
+
+def test_count_tokens():
+    assert count_tokens(None) == 0 and count_tokens("") == 0
+    assert count_tokens("late order") == 2
+    assert count_tokens("late delivery") == 3, "an 8-letter word already costs two"
+    assert count_tokens("internationalization") == 3, "long words cost 1 + len // 8"
+    assert count_tokens("late!!") == 3, "each punctuation mark is a token"
+    assert count_tokens("😀") == 2 and count_tokens("नमस्ते") == 6, "non-ASCII counted by UTF-8 bytes"
+    print("✅ Token estimates for words, punctuation and non-ASCII text")
+
+def test_truncate_to_tokens():
+    text = "the delivery partner was rude and the food arrived cold"
+    
+    assert truncate_to_tokens(text, 100) == text
+    assert truncate_to_tokens("", 5) == "" and truncate_to_tokens(None, 5) is None
+    short = truncate_to_tokens(text, 4)
+    assert short == "the delivery partner" and count_tokens(short) <= 4
+    assert text.startswith(short)
+    print(f"✅ Truncated at a word boundary: {short!r}")
+
+def packer(**limits):
+    settings = dict(request_budget=400, max_output_tokens=2000, output_tokens_per_review=20,
+                    review_overhead_tokens=10, max_review_tokens=256, max_reviews=50)
+    settings.update(limits)
+    return TokenBudgetPacker(**settings)
+
+def check_batches(token_packer, reviews, overhead):
+    batches = list(token_packer.pack(iter(reviews), overhead_tokens=overhead))
+    
+    packed = [review for batch, _ in batches for review in batch]
+    assert packed == reviews, "every review packed once, in order"
+    for batch, prompt_tokens in batches:
+        assert prompt_tokens == overhead + sum(token_packer.review_cost(review) for review in batch)
+        if len(batch) > 1:
+            assert prompt_tokens + len(batch) * token_packer.output_tokens_per_review <= token_packer.request_budget
+            assert len(batch) * token_packer.output_tokens_per_review <= token_packer.max_output_tokens
+        assert len(batch) <= token_packer.max_reviews
+    return batches
+
+def test_pack_fills_budget():
+    reviews = sample_reviews(40)
+    token_packer = packer()
+    
+    batches = check_batches(token_packer, reviews, overhead=100)
+    assert len(batches) > 1
+    # A full batch could not have taken the next review as well
+    for (batch, prompt_tokens), (next_batch, _) in zip(batches, batches[1:]):
+        extra = token_packer.review_cost(next_batch[0]) + (len(batch) + 1) * token_packer.output_tokens_per_review
+        assert prompt_tokens + extra > token_packer.request_budget
+    print(f"✅ 40 reviews packed into {len(batches)} requests of {[len(batch) for batch, _ in batches]}")
+
+def test_pack_caps():
+    reviews = sample_reviews(40)
+    
+    assert [len(batch) for batch, _ in check_batches(packer(request_budget=100000, max_reviews=8), reviews, 0)] == [8] * 5
+    assert [len(batch) for batch, _ in check_batches(packer(request_budget=100000, max_output_tokens=200), reviews, 0)] == [10] * 4
+    print("✅ max_reviews and max_output_tokens cap a batch before the token budget does")
+
+def test_long_reviews():
+    """Long reviews are shortened; one that still overflows the budget goes out alone"""
+    long_review = {'reviewId': "long", 'cleaned_content': "late " * 1000, 'score': 1}
+    token_packer = packer(request_budget=200, max_review_tokens=256)
+    
+    assert count_tokens(token_packer.review_text(long_review)) == 256
+    assert token_packer.review_cost(long_review) == 256 + 10
+    
+    reviews = sample_reviews(3) + [long_review] + sample_reviews(3, prefix="s")
+    batches = check_batches(token_packer, reviews, overhead=0)
+    assert [batch for batch, _ in batches if long_review in batch] == [[long_review]]
+    assert list(token_packer.pack([])) == []
+    print(f"✅ Oversized review shortened and sent alone ({len(batches)} requests)")
+
+if __name__ == "__main__":
+    test_count_tokens()
+    test_truncate_to_tokens()
+    test_pack_fills_budget()
+    test_pack_caps()
+    test_long_reviews()
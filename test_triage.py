@@ -0,0 +1,72 @@
+# test_triage.py - Rule-based triage labels only trivial reviews and leaves real issues to the LLM
+from offline_helpers import sample_reviews
+from src.triage import ReviewTriage
+
+def make_review(text, score, review_id="t1"):
+    return {'reviewId': review_id, 'cleaned_content': text, 'score': score}
+
+def test_rules():
+    triage = ReviewTriage()
+    
+    assert triage.classify(make_review("great app!", 5)) == {
+        'review_id': "t1", 'identified_topics': ["App working well"], 'confidence': 0.9, 'source': 'triage_rule'
+    }
+    assert triage.classify(make_review("i really love this app", 4))['source'] == 'triage_rule'
+    
+    worst = triage.classify(make_review("worst app ever", 1))
+    assert worst['identified_topics'] == ["General feedback"] and worst['confidence'] == 0.7
+    print("✅ Praise and generic complaints matched by rule")
+
+def test_rules_respect_score_range():
+    """Praise with a 1-star rating skips the praise rule and falls to the star heuristic"""
+    triage = ReviewTriage()
+    
+    analysis = triage.classify(make_review("great app", 1))
+    assert analysis['identified_topics'] == ["General feedback"] and analysis['source'] == 'triage_stars'
+    assert triage.classify(make_review("worst app ever", 5))['identified_topics'] == ["App working well"]
+    print("✅ Rules only fire inside their score range")
+
+def test_star_heuristic():
+    triage = ReviewTriage()
+    
+    good = triage.classify(make_review("ok thanks", 5))
+    assert good['identified_topics'] == ["App working well"] and good['source'] == 'triage_stars'
+    assert good['confidence'] == 0.75
+    assert triage.classify(make_review("ok thanks", 2))['identified_topics'] == ["General feedback"]
+    assert triage.classify(make_review("ok thanks", 3)) is None, "a neutral rating says nothing"
+    print("✅ Generic-word reviews labelled from their star rating")
+
+def test_real_issues_go_to_the_llm():
+    triage = ReviewTriage()
+    
+    assert triage.classify(make_review("app crashes", 1)) is None
+    assert triage.classify(make_review("great app but refund pending", 5)) is None
+    assert triage.classify(make_review("good good good good good good good", 5)) is None, "too long for triage"
+    assert triage.classify(make_review("", 5)) is None
+    assert all(triage.classify(review) is None for review in sample_reviews(12))
+    print("✅ Specific, long and empty reviews left for the LLM")
+
+def test_split_and_custom_rules():
+    triage = ReviewTriage(rules=[{"pattern": r"^slow\b", "topic": "Performance", "max_score": 3}],
+                          generic_words=["ok"], max_words=4)
+    reviews = [
+        make_review("slow app", 2, "a"),
+        make_review("great app", 5, "b"),
+        make_review("ok", 5, "c"),
+        make_review("slow and it keeps crashing", 2, "d"),
+    ]
+    
+    local_results, llm_reviews = triage.split(reviews)
+    assert [(analysis['review_id'], analysis['identified_topics']) for analysis in local_results] == [
+        ("a", ["Performance"]), ("c", ["App working well"])
+    ]
+    assert local_results[0]['confidence'] == 0.8, "rules default to 0.8 confidence"
+    assert [review['reviewId'] for review in llm_reviews] == ["b", "d"]
+    print("✅ split() partitions in order; custom rules, words and length honoured")
+
+if __name__ == "__main__":
+    test_rules()
+    test_rules_respect_score_range()
+    test_star_heuristic()
+    test_real_issues_go_to_the_llm()
+    test_split_and_custom_rules()
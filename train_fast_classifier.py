@@ -0,0 +1,61 @@
+# train_fast_classifier.py - Retrain the local seed topic classifier and benchmark it against the LLM
+import argparse
+import random
+import time
+
+from config import Config
+from src.fast_classifier import OTHER_LABEL, SeedTopicClassifier, load_training_data
+
+def main():
+    cfg = Config()
+    
+    parser = argparse.ArgumentParser(description="Train the fast-path seed topic classifier from stored LLM labels")
+    parser.add_argument("--labels", default=cfg.LLM_LABELS_PATH, help="LLM label log (JSONL)")
+    parser.add_argument("--output", default=cfg.FAST_CLASSIFIER_PATH, help="Where to save the model")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for the agreement benchmark")
+    parser.add_argument("--threshold", type=float, default=cfg.FAST_CLASSIFIER_THRESHOLD, help="Confidence threshold")
+    args = parser.parse_args()
+    
+    texts, labels = load_training_data(args.labels)
+    if len(texts) < 10:
+        print(f"⚠️ Only {len(texts)} labelled reviews in {args.labels}; run the LLM pipeline first")
+        return
+    
+    pairs = list(zip(texts, labels))
+    random.Random(0).shuffle(pairs)
+    split = int(len(pairs) * (1 - args.holdout))
+    train, test = pairs[:split], pairs[split:]
+    
+    print(f"📊 {len(pairs)} labelled reviews ({len(train)} train / {len(test)} held out)")
+    print("-" * 60)
+    
+    # Offline benchmark: agreement with the LLM on held-out reviews
+    model = SeedTopicClassifier()
+    start = time.perf_counter()
+    model.fit([t for t, _ in train], [l for _, l in train])
+    print(f"⏱️ Training: {time.perf_counter() - start:.2f} s")
+    
+    test_texts = [t for t, _ in test]
+    start = time.perf_counter()
+    predictions = model.predict(test_texts)
+    seconds = time.perf_counter() - start
+    
+    agree = sum(pred == gold for (pred, _), (_, gold) in zip(predictions, test))
+    confident = [
+        (pred, gold) for (pred, conf), (_, gold) in zip(predictions, test)
+        if pred != OTHER_LABEL and conf >= args.threshold
+    ]
+    confident_agree = sum(pred == gold for pred, gold in confident)
+    
+    print(f"🎯 Top-1 agreement with LLM: {agree / max(len(test), 1):.1%}")
+    print(f"⚡ Handled locally at threshold {args.threshold}: {len(confident) / max(len(test), 1):.1%} of reviews")
+    print(f"✅ Agreement on locally handled reviews: {confident_agree / max(len(confident), 1):.1%}")
+    print(f"🚀 Throughput: {len(test_texts) / max(seconds, 1e-9):,.0f} reviews/s")
+    
+    # Final model uses every label
+    model = SeedTopicClassifier().fit(texts, labels)
+    model.save(args.output)
+    print(f"💾 Model saved → {args.output}")
+
+if __name__ == "__main__":
+    main()